@@ -0,0 +1,130 @@
+import threading
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QApplication
+from safekey.database import DatabaseManager, OperationCancelled
+
+
+class DatabaseTask(QObject):
+    """
+    一次排队执行的数据库操作。
+    finished(结果)、failed(异常)、cancelled()、progress(已处理数, 总数) 信号总是在 GUI 线程中发出，
+    可以直接连接到 lambda 或界面控件。
+    """
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    progress = pyqtSignal(int, object)
+
+    def __init__(self, method, args, kwargs, reports_progress=False):
+        super().__init__()
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.reports_progress = reports_progress
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """请求取消：尚未开始的任务不再执行，进行中的任务在下一次报告进度时中止"""
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+
+class DatabaseWorker(QObject):
+    """在工作线程中依次执行数据库操作，持有自己的数据库连接"""
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, object)
+    cancelled = pyqtSignal(object)
+    progress = pyqtSignal(object, int, object)
+    reported = pyqtSignal(str, str)
+
+    def __init__(self, db_name, settings=None):
+        super().__init__()
+        self.db_name = db_name
+        self.settings = settings
+        self.db = None
+
+    @pyqtSlot(object)
+    def run(self, task):
+        if task.is_cancelled():
+            self.cancelled.emit(task)
+            return
+
+        def report(done, total=None):
+            if task.is_cancelled():
+                raise OperationCancelled()
+            self.progress.emit(task, done, total)
+
+        kwargs = dict(task.kwargs)
+        if task.reports_progress:
+            kwargs["progress"] = report
+        try:
+            if self.db is None:
+                self.db = DatabaseManager(self.db_name, settings=self.settings, reporter=self.reported.emit)
+            result = getattr(self.db, task.method)(*task.args, **kwargs)
+        except OperationCancelled:
+            self.cancelled.emit(task)
+        except Exception as e:
+            # 数据层不负责提示，错误原样交给界面处理
+            self.failed.emit(task, e)
+        else:
+            self.finished.emit(task, result)
+
+
+class DatabaseController(QObject):
+    """
+    数据库后台执行器：界面通过 submit() 提交 DatabaseManager 的方法调用，
+    调用在工作线程中按提交顺序执行，界面线程不会被导入、导出、搜索等操作阻塞。
+    数据层的事件通知通过 reported(level, message) 信号在 GUI 线程中发出。
+    """
+    requested = pyqtSignal(object)
+    reported = pyqtSignal(str, str)
+
+    def __init__(self, db_name, parent=None, settings=None):
+        super().__init__(parent)
+        self._tasks = set()  # 尚未完成的任务，完成前保持引用
+
+        self._thread = QThread(self)
+        self._worker = DatabaseWorker(db_name, settings)
+        self._worker.moveToThread(self._thread)
+        self.requested.connect(self._worker.run)
+        self._worker.finished.connect(self._on_finished)
+        self._worker.failed.connect(self._on_failed)
+        self._worker.cancelled.connect(self._on_cancelled)
+        self._worker.progress.connect(self._on_progress)
+        self._worker.reported.connect(self.reported)
+        self._thread.start()
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
+
+    def submit(self, method, *args, progress=False, **kwargs):
+        """
+        排队执行 DatabaseManager.method(*args, **kwargs)，返回 DatabaseTask。
+        progress 为 True 时向方法传入进度回调，任务可以通过 cancel() 中止。
+        """
+        task = DatabaseTask(method, args, kwargs, reports_progress=progress)
+        self._tasks.add(task)
+        self.requested.emit(task)
+        return task
+
+    def shutdown(self):
+        """取消所有未完成的任务并等待工作线程退出"""
+        for task in self._tasks:
+            task.cancel()
+        self._thread.quit()
+        self._thread.wait()
+
+    def _on_finished(self, task, result):
+        self._tasks.discard(task)
+        task.finished.emit(result)
+
+    def _on_failed(self, task, error):
+        self._tasks.discard(task)
+        task.failed.emit(error)
+
+    def _on_cancelled(self, task):
+        self._tasks.discard(task)
+        task.cancelled.emit()
+
+    def _on_progress(self, task, done, total):
+        task.progress.emit(done, total)
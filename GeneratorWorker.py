@@ -0,0 +1,85 @@
+import os
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+from safekey.breach import BreachIndex
+from safekey.generator import generate_parallel, write_batches
+from safekey.strength import score_batch
+
+# 最多对这么多个生成的密码评分，同一生成器的密码强度分布相同，生成到文件时评估前面的一部分即可
+SCORE_LIMIT = 100000
+
+
+class GeneratorTask(QObject):
+    """
+    在后台线程中驱动多进程批量生成，界面不会被阻塞。信号与 DatabaseTask 一致：
+    finished(结果)、failed(异常)、cancelled()、progress(已生成数, 总数)，都在 GUI 线程中处理。
+    path 为 None 时结果为密码列表，否则密码逐批写入 path，结果为写入的数量，取消或失败时删除未完成的文件。
+    完成时 distribution 为前 SCORE_LIMIT 个密码的强度分布（StrengthDistribution）。
+    给出 breach_index（索引文件路径）时丢弃出现在泄露密码库中的密码，数量由后续生成的密码补足。
+    """
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    progress = pyqtSignal(int, object)
+
+    def __init__(self, generator, count, path=None, unique=True, breach_index=None, parent=None):
+        super().__init__(parent)
+        self.generator = generator
+        self.count = count
+        self.path = path
+        self.unique = unique
+        self.breach_index = breach_index
+        self.distribution = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """请求取消，在下一批结果到达时生效，尚未开始的分片不再生成"""
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def _batches(self):
+        done = 0
+        index = BreachIndex(self.breach_index) if self.breach_index else None
+        batches = generate_parallel(self.generator, self.count, self.unique, reject=index.check if index else None)
+        try:
+            for batch in batches:
+                if self.is_cancelled():
+                    return
+                if done < SCORE_LIMIT:
+                    self.distribution = score_batch(batch[:SCORE_LIMIT - done], self.distribution)
+                yield batch
+                done += len(batch)
+                self.progress.emit(done, self.count)
+        finally:
+            # 关闭生成器，取消进程池中剩余的分片
+            batches.close()
+            if index:
+                index.close()
+
+    def _run(self):
+        try:
+            if self.path is None:
+                result = [p for batch in self._batches() for p in batch]
+            else:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    result = write_batches(f, self._batches())
+        except Exception as e:
+            self._remove_partial()
+            self.failed.emit(e)
+            return
+        if self.is_cancelled():
+            self._remove_partial()
+            self.cancelled.emit()
+        else:
+            self.finished.emit(result)
+
+    def _remove_partial(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
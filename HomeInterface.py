@@ -1,19 +1,42 @@
-from PyQt5.QtWidgets import (QFrame, QVBoxLayout, QHeaderView, QHBoxLayout, QTableWidgetItem, QApplication,
-                            QFileDialog)
-from qfluentwidgets import (SubtitleLabel, setFont, TableWidget, PrimaryPushButton, MessageBoxBase,
+from PyQt5.QtWidgets import (QFrame, QVBoxLayout, QHeaderView, QHBoxLayout, QAbstractItemView,
+                            QFileDialog, QApplication)
+from qfluentwidgets import (SubtitleLabel, setFont, TableView, PrimaryPushButton, MessageBoxBase,
                             SearchLineEdit, LineEdit, CaptionLabel, StrongBodyLabel, PasswordLineEdit,
                             MessageBox, PushButton, ComboBox, InfoBar, InfoBarPosition, DropDownToolButton,
-                            RoundMenu, Action)
+                            RoundMenu, Action, StateToolTip)
 from PyQt5.QtGui import QColor
 from PyQt5.QtCore import QUrl
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QModelIndex, QPersistentModelIndex
 from qfluentwidgets import FluentIcon as FIF
-import sqlite3
-from Database import DatabaseManager
-from config import cfg
+from safekey.database import DEFAULT_DB_NAME
+from DatabaseWorker import DatabaseController
+from PasswordTableModel import PasswordTableModel
+from SearchController import SearchController
+from safekey.backupcontainer import is_container
+from safekey.breach import BreachIndex
+from safekey.fieldcrypto import SealedField, reveal
+from safekey.settings import WARNING
+from config import cfg, ConfigSettings
 import os
 
+# 筛选出现在泄露密码索引中的记录，不属于健康检查，每次都在后台重新检查全部密码
+BREACHED = "breached"
+# 筛选框的选项：(显示名称, 健康检查的问题)，None 表示显示全部记录
+AUDIT_FILTERS = [
+    ("全部记录", None),
+    ("弱密码", "weak"),
+    ("过短的密码", "short"),
+    ("重复使用的密码", "reused"),
+    ("相似的密码", "similar"),
+    ("已泄露的密码", BREACHED),
+]
+# 点击表头可排序的列：表格列号 -> query_passwords 的排序列，密码不可排序
+SORT_SECTIONS = {1: "website", 2: "username", 4: "notes"}
+
 class HomeInterface(QFrame):
+    # 每次 load_data() 的第一屏数据显示后（或读取失败后）发出
+    loaded = pyqtSignal()
+
     def __init__(self, text: str, parent=None):
         super().__init__(parent=parent)
         self.label = SubtitleLabel(text, self)
@@ -24,8 +47,20 @@ class HomeInterface(QFrame):
         self.fileButton = DropDownToolButton(FIF.FOLDER)
         self.fileMenu = RoundMenu(parent=self.fileButton)
         self.searchLineEdit = SearchLineEdit(self)
-        self.passwordTable =TableWidget(self)
-        self.db = DatabaseManager()
+        self.filterComboBox = ComboBox(self)
+        self.passwordTable = TableView(self)
+        self.tableModel = PasswordTableModel(self)
+        # 数据库连接只在后台线程中：解锁、分页读取、写入、导入导出和搜索都通过 self.database 提交
+        self.settings = ConfigSettings()
+        self._loadTask = None
+        self.auditIssue = None  # 当前筛选的健康检查问题
+        self.sortColumn = "website"  # 浏览全部记录时的排序，点击表头切换
+        self.sortDescending = False
+        self._breachIndex = None
+        self._breachIndexPath = None  # 最近一次尝试打开的索引路径，打开失败时不再重复尝试
+        self.database = DatabaseController(DEFAULT_DB_NAME, self, self.settings)
+        self.database.reported.connect(self.show_report)
+        self.searchController = SearchController(self.database, self)
         self.__initWidget(text)
         self.__initLayout(text)
         self.load_data()
@@ -35,17 +70,23 @@ class HomeInterface(QFrame):
         self.hBoxLayout.setContentsMargins(0, 0, 0, 0)
         self.hBoxLayout.setSpacing(15)
         self.searchLineEdit.setPlaceholderText('搜索网站')
-        self.passwordTable.setColumnCount(5)
+        self.filterComboBox.addItems([name for name, _ in AUDIT_FILTERS])
+        self.tableModel.edit_handler = self.on_cell_changed
+        self.passwordTable.setModel(self.tableModel)
         self.passwordTable.setBorderVisible(True)
         self.passwordTable.setBorderRadius(8)
         self.passwordTable.setWordWrap(False)
-        self.passwordTable.setHorizontalHeaderLabels(['ID', '网站','用户名', '密码', '备注'])
+        self.passwordTable.setEditTriggers(QAbstractItemView.DoubleClicked)
         self.passwordTable.horizontalHeader().setVisible(True)
         self.passwordTable.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.passwordTable.horizontalHeader().setSectionsClickable(True)
+        self.passwordTable.horizontalHeader().setSortIndicatorShown(True)
+        self.passwordTable.horizontalHeader().setSortIndicator(1, Qt.AscendingOrder)
         self.passwordTable.verticalHeader().setVisible(False)
         self.passwordTable.setColumnHidden(0, True)  
         self.passwordTable.setSelectionBehavior(self.passwordTable.SelectRows)
         self.passwordTable.setSelectionMode(self.passwordTable.ExtendedSelection)
+        self.passwordTable.setContextMenuPolicy(Qt.CustomContextMenu)
         self.fileButton.setMenu(self.fileMenu)
         self.fileMenu.addAction(Action(FIF.FOLDER_ADD, '导入', triggered=lambda: self.import_pass()))
         self.fileMenu.addAction(Action(FIF.SAVE, '导出', triggered=lambda: self.export_pass()))
@@ -61,18 +102,26 @@ class HomeInterface(QFrame):
         # 信号连接
         self.uploadButton.clicked.connect(self.upload_pass)
         self.deleteButton.clicked.connect(self.delete_pass)
-        self.passwordTable.cellDoubleClicked.connect(self.on_cell_double_clicked)
-        self.passwordTable.cellChanged.connect(self.on_cell_changed)
         self.searchLineEdit.searchSignal.connect(self.search_passwords)
         self.searchLineEdit.clearSignal.connect(self.handle_clear)
         self.searchLineEdit.textChanged.connect(self.handle_realtime_search)
-        self.editing_enabled = False 
+        # 双击在编辑器打开之前触发，加密单元格需要先解锁
+        self.passwordTable.doubleClicked.connect(self.handle_double_click)
+        self.passwordTable.customContextMenuRequested.connect(self.show_context_menu)
+        self.filterComboBox.currentIndexChanged.connect(self.filter_passwords)
+        self.passwordTable.horizontalHeader().sortIndicatorChanged.connect(self.sort_changed)
+        self.searchController.resultsReady.connect(self.tableModel.set_rows)
+        self.searchController.cleared.connect(self.load_data)
+        self.searchController.searchFailed.connect(
+            lambda message: MessageBox("错误", f"搜索失败: {message}", self).exec_()
+        )
 
     def __initLayout(self, text):
         self.hBoxLayout.addWidget(self.label, 0, Qt.AlignLeft)
         self.hBoxLayout.addWidget(self.uploadButton, 0, Qt.AlignLeft)
         self.hBoxLayout.addWidget(self.deleteButton, 0, Qt.AlignLeft)
         self.hBoxLayout.addWidget(self.searchLineEdit, 0, Qt.AlignLeft)
+        self.hBoxLayout.addWidget(self.filterComboBox, 0, Qt.AlignLeft)
         self.hBoxLayout.addWidget(self.fileButton, 0, Qt.AlignLeft)
         self.hBoxLayout.addStretch(1)
         self.vBoxLayout.addLayout(self.hBoxLayout)
@@ -99,99 +148,337 @@ class HomeInterface(QFrame):
             table.setColumnWidth(col, int(available_width * ratio))
         table.viewport().update()
 
-    def on_cell_double_clicked(self, row, col):
-        """处理单元格双击事件"""
-        QApplication.instance().processEvents()
-        # 网站、用户名、密码、备注
-        if col in [1, 2, 3, 4]:            
-            self.editing_enabled = True
-            self.passwordTable.editItem(self.passwordTable.item(row, col))
-    
-    def on_cell_changed(self, row, col):
-        """处理单元格内容修改"""
-        if not self.editing_enabled:
+    def on_cell_changed(self, record, column, new_value):
+        """处理单元格内容修改，在后台写入数据库，完成后只更新该行"""
+        if column != "notes" and not new_value:
+            MessageBox("警告", "网站、用户名及密码不能为空", self.mainWindow).exec_()
             return
-        new_value = self.passwordTable.item(row, col).text().strip()
-        record_id = int(self.passwordTable.item(row, 0).text())
-        column_mapping = {
-            1: "website",
-            2: "username",
-            3: "password",
-            4: "notes"
-        }
-        
-        if col not in column_mapping:
+
+        task = self.database.submit("update_password", record[0], **{column: new_value})
+        task.finished.connect(lambda updated: self.on_record_updated(record, updated))
+        task.failed.connect(
+            lambda e: MessageBox("错误", f"数据库更新失败: {str(e)}", self.mainWindow).exec_()
+        )
+
+    def on_record_updated(self, record, updated):
+        if updated is None:
             return
+        self.searchController.invalidate()
+        self.tableModel.replace_record(record, updated)
+        self.refresh_filter()
+
+    def track_task(self, task, title):
+        """在右上角显示后台任务的进度，点击关闭按钮可取消任务"""
+        tooltip = StateToolTip(title, "正在准备...", self.mainWindow)
+        tooltip.move(tooltip.getSuitablePos())
+        tooltip.show()
+        tooltip.closedSignal.connect(task.cancel)
+
+        def on_progress(done, total):
+            tooltip.setContent(f"已处理 {done} / {total} 条" if total else f"已处理 {done} 条")
+
+        def on_done(text):
+            tooltip.setContent(text)
+            tooltip.setState(True)
+
+        task.progress.connect(on_progress)
+        task.finished.connect(lambda _: on_done("已完成"))
+        task.failed.connect(lambda _: on_done("已失败"))
+        task.cancelled.connect(lambda: on_done("已取消"))
+
+    def show_info(self, title, content, error=False):
+        w = (InfoBar.error if error else InfoBar.success)(
+            title = title,
+            content=content,
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+        w.show()
 
-        if col in [1, 2, 3] and not new_value: 
-            MessageBox("警告", "网站、用户名及密码不能为空", self.mainWindow).exec_()
-            self.load_data()  
+    def show_report(self, level, message):
+        """数据层的事件通知，可能在窗口显示之前发出，推迟到事件循环中显示"""
+        QTimer.singleShot(0, lambda: (InfoBar.warning if level == WARNING else InfoBar.info)(
+            title='警告' if level == WARNING else '提示',
+            content=message,
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=3000,
+            parent=self.mainWindow
+        ).show())
+
+    def ensure_unlocked(self, then, otherwise=None):
+        """
+        确认可以访问明文后调用 then()：加密的密码库未解锁时请求输入主口令，取消或口令错误时调用 otherwise()。
+        检查和解锁（scrypt 密钥派生）都在后台线程中执行，界面不会被阻塞。
+        """
+        otherwise = otherwise or (lambda: None)
+        task = self.database.submit("is_unlocked")
+        task.finished.connect(lambda unlocked: then() if unlocked else self.request_unlock(then, otherwise))
+        task.failed.connect(lambda e: (self.show_info("错误", str(e), error=True), otherwise()))
+
+    def request_unlock(self, then, otherwise):
+        box = PassphraseMessageBox(self.mainWindow, '解锁密码库', '输入主口令', '解锁')
+        if not box.exec_():
+            otherwise()
             return
-        
-        try:
-            self.db.update_password(
-                record_id=record_id,
-                **{column_mapping[col]: new_value}
-            )
-        except sqlite3.Error as e:
-            MessageBox("错误", f"数据库更新失败: {str(e)}", self.mainWindow).exec_()
-            self.load_data()  
+        task = self.database.submit("unlock", box.passphraseLineEdit.text())
+        task.finished.connect(lambda _: then())
+        task.failed.connect(lambda e: (self.show_info("错误", str(e), error=True), otherwise()))
+
+    def handle_double_click(self, index):
+        """双击锁定的加密单元格时先解锁，解锁后打开编辑器，其中显示解密后的内容"""
+        value = self.tableModel.record(index.row())[index.column()]
+        if isinstance(value, SealedField) and not value.owner.is_unlocked():
+            # 解锁期间表格可能已重新加载，只有原单元格仍然存在时才打开编辑器
+            target = QPersistentModelIndex(index)
+            self.ensure_unlocked(lambda: self.passwordTable.edit(QModelIndex(target)) if target.isValid() else None)
+
+    def show_context_menu(self, pos):
+        """右键菜单：复制单元格内容，加密字段在复制时才解密"""
+        index = self.passwordTable.indexAt(pos)
+        if not index.isValid():
+            return
+        menu = RoundMenu(parent=self)
+        menu.addAction(Action(FIF.COPY, '复制', triggered=lambda: self.copy_cell(index)))
+        menu.exec_(self.passwordTable.viewport().mapToGlobal(pos))
+
+    def copy_cell(self, index):
+        value = self.tableModel.record(index.row())[index.column()]
+        if isinstance(value, SealedField):
+            self.ensure_unlocked(lambda: self.copy_value(value))
+        else:
+            self.copy_value(value)
+
+    def copy_value(self, value):
+        QApplication.clipboard().setText("" if value is None else str(reveal(value)))
+        w = InfoBar.success(
+            title = "成功",
+            content="已复制到剪贴板",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+        w.show()
 
-        self.editing_enabled = False  
+    def on_record_added(self, record, deleted_ids):
+        """新增记录后只更新受影响的行"""
+        if record is None:
+            self.show_info("提示", "该记录已存在，已跳过")
+            return
+        self.show_info("成功", "已成功添加密码")
+        self.searchController.invalidate()
+        if self.auditIssue is not None:
+            self.refresh_filter()
+            return
+        if not self.tableModel.is_browsing():
+            # 正在显示搜索结果，新记录是否匹配交给搜索重新判断
+            self.search_passwords(self.searchLineEdit.text())
+            return
+        self.tableModel.remove_records([(record_id,) + tuple(record[1:]) for record_id in deleted_ids])
+        self.tableModel.insert_record(record)
 
     def handle_realtime_search(self):
-        """ 实时搜索处理 """
+        """ 实时搜索处理：防抖后在后台线程查询 """
         keyword = self.searchLineEdit.text().strip()
-        self.search_passwords(keyword)
+        self.searchController.search(keyword, self.search_fields())
 
     def search_passwords(self, keyword):
-        """根据关键词搜索密码记录"""
-        try:
-            records = self.db.search_passwords(keyword)
-            self._update_table_data(records)
-        except sqlite3.Error as e:
-            MessageBox("错误", f"搜索失败: {str(e)}", self).exec_()
-    
+        """根据关键词立即搜索密码记录"""
+        self.searchController.search(keyword.strip(), self.search_fields(), immediate=True)
+
+    def search_fields(self):
+        """根据设置返回搜索时匹配的字段"""
+        if cfg.get(cfg.searchScope) == "All":
+            return ("website", "username", "notes")
+        return ("website",)
+
     def handle_clear(self):
-        """清空搜索框"""
+        """清空搜索框，同时取消尚未完成的搜索"""
+        self.searchController.search("", self.search_fields(), immediate=True)
+
+    def page_fetcher(self, method, *args):
+        """
+        表格模型的分页获取函数：每页作为 method(*args, after, limit) 提交到后台线程，
+        读取完成后回调 callback(rows)，失败时提示并回调 callback(None)
+        """
+        def fetch(after, limit, callback):
+            task = self.database.submit(method, *args, after, limit)
+            task.finished.connect(callback)
+            task.failed.connect(lambda e: (self.show_info('加载失败', str(e), error=True), callback(None)))
+        return fetch
+
+    def breach_index(self):
+        """设置中选择的泄露密码索引，第一次使用时才打开；未设置或无法打开时返回 None"""
+        path = cfg.get(cfg.breachIndex)
+        if path == self._breachIndexPath:
+            return self._breachIndex
+        if self._breachIndex is not None:
+            self._breachIndex.close()
+            self._breachIndex = None
+        self._breachIndexPath = path
+        if path:
+            try:
+                self._breachIndex = BreachIndex(path)
+            except (OSError, ValueError) as e:
+                self.show_info("错误", f"无法打开泄露密码索引: {str(e)}", error=True)
+        return self._breachIndex
+
+    def load_data(self, progress=False):
+        """
+        重新加载数据：第一屏在后台线程读取，之后的页由表格按需分页获取，浏览全部记录时按表头选择的列排序。
+        选择了健康检查筛选时只加载存在该问题的记录；筛选已泄露的密码时一次读取全部结果，
+        progress 为 True 时检查可以取消。
+        """
+        self.searchController.cancel()
+        self.searchController.invalidate()
+        if self._loadTask is not None:
+            self._loadTask.cancel()
+        issue = self.auditIssue
+        order = ("website", False)
+        if issue == BREACHED:
+            task = self.database.submit("find_breached", progress=progress)
+            fetcher = None
+        elif issue is None:
+            order = sort, descending = self.sortColumn, self.sortDescending
+            task = self.database.submit("query_passwords", sort, descending, None, self.tableModel.page_size)
+            fetcher = self.page_fetcher("query_passwords", sort, descending)
+        else:
+            task = self.database.submit("get_audit_page", issue, None, self.tableModel.page_size)
+            fetcher = self.page_fetcher("get_audit_page", issue)
+        self._loadTask = task
+        task.finished.connect(lambda rows: self.on_first_page(task, rows, fetcher, order=order))
+        task.failed.connect(lambda e: self.on_first_page(task, None, fetcher, e))
+
+    def on_first_page(self, task, rows, fetcher, error=None, order=("website", False)):
+        if task is not self._loadTask:
+            return  # 已被更新的加载请求取代
+        self._loadTask = None
+        if error is not None:
+            self.show_info('加载失败', str(error), error=True)
+        elif fetcher is None:
+            self.tableModel.set_rows(rows)
+        else:
+            self.tableModel.set_fetcher(fetcher, rows, *order)
+        self.loaded.emit()
+
+    def sort_changed(self, section, order):
+        """点击表头后按该列重新分页加载全部记录；筛选和搜索结果不支持排序"""
+        column = SORT_SECTIONS.get(section)
+        if column is None:
+            self.show_sort_indicator()
+            return
+        if self.auditIssue is not None or self.searchLineEdit.text().strip():
+            self.show_info("提示", "只有浏览全部记录时可以排序")
+            self.show_sort_indicator()
+            return
+        previous = self.sortColumn, self.sortDescending
+        self.sortColumn, self.sortDescending = column, order == Qt.DescendingOrder
+        self.load_data()
+        # 无法按该列排序时（如加密存储时的备注）on_first_page 已提示原因，恢复之前的排序，表格内容不变
+        self._loadTask.failed.connect(lambda _: self.restore_sort(previous))
+
+    def restore_sort(self, order):
+        self.sortColumn, self.sortDescending = order
+        self.show_sort_indicator()
+
+    def show_sort_indicator(self):
+        """表头的排序标记恢复为当前的排序"""
+        section = next(s for s, column in SORT_SECTIONS.items() if column == self.sortColumn)
+        header = self.passwordTable.horizontalHeader()
+        header.blockSignals(True)
+        header.setSortIndicator(section, Qt.DescendingOrder if self.sortDescending else Qt.AscendingOrder)
+        header.blockSignals(False)
+
+    def filter_passwords(self, index):
+        """按健康检查结果筛选：先在后台增量检查新增和修改过的记录，再分页显示存在该问题的记录"""
+        issue = AUDIT_FILTERS[index][1]
+        if issue is None:
+            self.auditIssue = None
+            self.load_data()
+            return
+        if issue == BREACHED and not cfg.get(cfg.breachIndex):
+            self.show_info("提示", "请先在设置中选择泄露密码索引")
+            self.reset_filter()
+            return
+        self.ensure_unlocked(lambda: self.apply_filter(index), self.reset_filter)
+
+    def apply_filter(self, index):
+        if index != self.filterComboBox.currentIndex():
+            return  # 解锁期间已切换到其他筛选
+        issue = AUDIT_FILTERS[index][1]
+        self.auditIssue = issue
+        if issue == BREACHED:
+            self.check_breached()
+        else:
+            self.run_audit(issue, interactive=True)
+
+    def check_breached(self):
+        """在后台用泄露密码索引检查全部密码，显示进度（可取消），完成后显示密码已泄露的记录"""
+        self.load_data(progress=True)
+        task = self._loadTask
+        self.track_task(task, "正在检查泄露的密码")
+        task.finished.connect(lambda rows: self.show_info("检查完成", f"已泄露的密码：{len(rows)} 条"))
+        task.failed.connect(lambda _: self.reset_filter())
+        task.cancelled.connect(self.reset_filter)
+
+    def run_audit(self, issue, interactive):
+        """interactive 为 True 时显示进度（可取消）并在完成后提示问题记录数"""
+        task = self.database.submit("audit_passwords", progress=interactive)
+        if interactive:
+            self.track_task(task, "正在检查密码")
+        task.finished.connect(lambda _: self.on_audited(issue, interactive))
+        task.failed.connect(lambda e: (self.show_info("错误", f"检查失败: {str(e)}", error=True), self.reset_filter()))
+        task.cancelled.connect(self.reset_filter)
+
+    def on_audited(self, issue, interactive):
+        if issue != self.auditIssue:
+            return  # 检查期间已切换到其他筛选
+        self.load_data()
+        if not interactive:
+            return
+        task = self.database.submit("audit_summary")
+        task.finished.connect(lambda summary: self.show_info(
+            "检查完成", f"{self.filterComboBox.currentText()}：{summary[issue]} 条"
+        ) if issue == self.auditIssue else None)
+
+    def refresh_filter(self):
+        """记录变化后增量检查并刷新筛选结果（通常只需几毫秒），未筛选时不做任何事"""
+        if self.auditIssue == BREACHED:
+            self.load_data()
+        elif self.auditIssue is not None:
+            self.run_audit(self.auditIssue, interactive=False)
+
+    def reset_filter(self):
+        """回到显示全部记录"""
+        self.auditIssue = None
+        self.filterComboBox.blockSignals(True)
+        self.filterComboBox.setCurrentIndex(0)
+        self.filterComboBox.blockSignals(False)
         self.load_data()
-
-    def _update_table_data(self, records):
-        """通用表格更新方法"""
-        self.passwordTable.clearContents()
-        self.passwordTable.setRowCount(len(records))
-        
-        for row, record in enumerate(records):
-            for col, data in enumerate(record):
-                item = QTableWidgetItem(str(data))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.passwordTable.setItem(row, col, item)
-
-    def load_data(self):
-        """加载全部数据（重构成通用方法）"""
-        try:
-            records = self.db.get_all_passwords()
-            self._update_table_data(records)
-        except sqlite3.Error as e:
-            MessageBox("错误", f"数据加载失败: {str(e)}", self).exec_()
 
     def upload_pass(self):
         """显示添加密码的消息框"""
-        w = UpdateMessageBox(self.mainWindow, self)
-        w.show()
+        self.ensure_unlocked(lambda: UpdateMessageBox(self.mainWindow, self).show())
 
     def get_selected_ids(self):
         """获取选中的ID"""
-        selected_items = self.passwordTable.selectedItems()
-        rows = {item.row() for item in selected_items}
-        ids = []
-        for row in rows:
-            ids.append(int(self.passwordTable.item(row, 0).text()))
-        return ids
+        return [record[0] for record in self.get_selected_records()]
+
+    def get_selected_records(self):
+        """获取选中的记录"""
+        rows = self.passwordTable.selectionModel().selectedRows()
+        return [self.tableModel.record(index.row()) for index in rows]
 
     def delete_pass(self):
         """删除密码记录"""
-        selected_ids = self.get_selected_ids()
+        selected_records = self.get_selected_records()
+        selected_ids = [record[0] for record in selected_records]
         if not selected_ids:
             MessageBox("提示", "请先选择要删除的记录", self.mainWindow).exec_()
             return
@@ -203,63 +490,47 @@ class HomeInterface(QFrame):
         )
         if box.exec_():
             # 执行删除
-            if self.db.delete_passwords(selected_ids):
-                self.load_data()  
-                w = InfoBar.success(
-                    title = "成功",
-                    content="已成功删除所选的密码",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.mainWindow
-                )
-                w.show()
-            else:
-                w = InfoBar.error(
-                    title = "错误",
-                    content="删除失败",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.mainWindow
-                )
-                w.show()
+            task = self.database.submit("delete_passwords", selected_ids)
+            task.finished.connect(lambda deleted_ids: self.on_records_deleted(selected_records, deleted_ids))
+            task.failed.connect(lambda e: self.show_info("错误", f"删除失败: {str(e)}", error=True))
+
+    def on_records_deleted(self, records, deleted_ids):
+        deleted_ids = set(deleted_ids)
+        if not deleted_ids:
+            self.show_info("错误", "删除失败", error=True)
+            return
+        self.searchController.invalidate()
+        self.tableModel.remove_records([r for r in records if r[0] in deleted_ids])
+        self.show_info("成功", "已成功删除所选的密码")
+        self.refresh_filter()
 
     def export_pass(self):
         """显示导出密码的消息框"""
-        w = ExportMessageBox(self.mainWindow, self)
-        w.show()
+        self.ensure_unlocked(lambda: ExportMessageBox(self.mainWindow, self).show())
 
     def import_pass(self):
         """导入密码"""
-        w = QFileDialog.getOpenFileName(self, "选择文件", "", "CSV Files (*.csv);;JSON Files (*.json);;AES Files (*.aes)")
+        w = QFileDialog.getOpenFileName(self, "选择文件", "", "CSV Files (*.csv);;JSON Files (*.json);;NDJSON Files (*.ndjson);;AES Files (*.aes)")
         
         if w[0]:
-            try:
-                print(w[0], w[1].split()[0].lower())
-                self.db.import_passwords(w[0], w[1].split()[0].lower())
-                self.load_data()
-                w = InfoBar.success(
-                    title = "成功",
-                    content="密码已导入",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.mainWindow
-                )
-            except sqlite3.Error as e:
-                w = InfoBar.error(
-                    title = "错误",
-                    content=f"导入失败: {str(e)}",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.mainWindow
-                )
+            self.ensure_unlocked(lambda: self.start_import(w[0], w[1].split()[0].lower()))
+
+    def start_import(self, path, fmt):
+        passphrase = None
+        if fmt == 'aes' and is_container(path):
+            box = PassphraseMessageBox(self.mainWindow)
+            if not box.exec_():
+                return
+            passphrase = box.passphraseLineEdit.text()
+        task = self.database.submit("import_passwords", path, fmt, passphrase, progress=True)
+        self.track_task(task, "正在导入")
+        task.finished.connect(self.on_imported)
+        task.failed.connect(lambda e: self.show_info("错误", f"导入失败: {str(e)}", error=True))
+        task.cancelled.connect(lambda: self.show_info("提示", "导入已取消，未写入任何记录"))
+
+    def on_imported(self, stats):
+        self.load_data()
+        self.show_info("成功", f"已导入 {stats['inserted']} 条密码（{stats['rows_per_sec']:.0f} 条/秒）")
             
 class UpdateMessageBox(MessageBoxBase):
     def __init__(self, parent=None, interface=None):
@@ -275,6 +546,7 @@ class UpdateMessageBox(MessageBoxBase):
         self.notesLabel = StrongBodyLabel('输入备注（可选）', self)
         self.notesLineEdit = LineEdit(self)
         self.warningLabel = CaptionLabel("网站，用户名和密码不能为空")
+        self.breachLabel = CaptionLabel("该密码出现在已泄露的密码库中，建议更换")
         self.__initWidget()
         self.__initLayout()
         
@@ -290,12 +562,15 @@ class UpdateMessageBox(MessageBoxBase):
         self.notesLineEdit.setClearButtonEnabled(True)
         self.warningLabel.setTextColor("#cf1010", QColor(255, 28, 32))
         self.warningLabel.hide()
+        self.breachLabel.setTextColor("#cf1010", QColor(255, 28, 32))
+        self.breachLabel.hide()
         self.widget.setMinimumWidth(350)
         self.yesButton.setText('添加')
         self.cancelButton.setText('取消')
 
         # 信号连接
         self.yesButton.clicked.connect(self._handle_add_password)
+        self.passwordLineEdit.textChanged.connect(self._check_breached)
 
     def __initLayout(self):
         self.viewLayout.addWidget(self.titleLabel)
@@ -305,6 +580,7 @@ class UpdateMessageBox(MessageBoxBase):
         self.viewLayout.addWidget(self.usernameLineEdit)
         self.viewLayout.addWidget(self.passwordLabel)
         self.viewLayout.addWidget(self.passwordLineEdit)
+        self.viewLayout.addWidget(self.breachLabel)
         self.viewLayout.addWidget(self.notesLabel)
         self.viewLayout.addWidget(self.notesLineEdit)
         self.viewLayout.addWidget(self.warningLabel)
@@ -323,30 +599,20 @@ class UpdateMessageBox(MessageBoxBase):
             password = self.passwordLineEdit.text().strip()
             notes = self.notesLineEdit.text().strip()
 
-            try:
-                self.parent_interface.db.add_password(
-                    website=web,
-                    username=username,
-                    password=password,
-                    notes=notes,
-                    override=override
-                )
-                self._clear_inputs()
-                self.accept()
-                w = InfoBar.success(
-                    title = "成功",
-                    content="已成功添加密码",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.parent_interface.mainWindow
-                )
-                w.show()
-                self.parent_interface.load_data()
-            except sqlite3.Error as e:
-                self._show_error_message(f"数据库错误: {str(e)}")
+            interface = self.parent_interface
+            task = interface.database.submit(
+                "add_password", website=web, username=username, password=password, notes=notes, override=override
+            )
+            task.finished.connect(lambda result: interface.on_record_added(*result))
+            task.failed.connect(lambda e: interface.show_info("错误", f"添加失败: {str(e)}", error=True))
+            self._clear_inputs()
+            self.accept()
     
+    def _check_breached(self, text):
+        """输入密码时查询泄露密码索引（只读取几个页面，不会卡顿），只提示，不阻止添加"""
+        index = self.parent_interface.breach_index() if text.strip() else None
+        self.breachLabel.setVisible(index is not None and text.strip() in index)
+
     def _clear_inputs(self):
         """清空输入框内容"""
         self.webLineEdit.clear()
@@ -372,6 +638,22 @@ class UpdateMessageBox(MessageBoxBase):
         self.warningLabel.setHidden(isValid)
         return isValid    
 
+class PassphraseMessageBox(MessageBoxBase):
+    """输入口令的对话框：导入加密备份或解锁密码库"""
+    def __init__(self, parent=None, title='输入备份口令', placeholder='输入导出时设置的口令', button='导入'):
+        super().__init__(parent)
+        self.titleLabel = SubtitleLabel(title, self)
+        self.passphraseLineEdit = PasswordLineEdit(self)
+        self.passphraseLineEdit.setPlaceholderText(placeholder)
+        self.widget.setMinimumWidth(350)
+        self.yesButton.setText(button)
+        self.cancelButton.setText('取消')
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.passphraseLineEdit)
+
+    def validate(self):
+        return bool(self.passphraseLineEdit.text())
+
 class ExportMessageBox(MessageBoxBase):
     def __init__(self, parent=None, interface=None):
         super().__init__(parent)
@@ -387,6 +669,9 @@ class ExportMessageBox(MessageBoxBase):
         self.browseButton = PushButton(FIF.FOLDER, '浏览文件夹', self)
         self.fileLabel = StrongBodyLabel('文件名：', self)
         self.fileLineEdit = LineEdit(self)
+        self.passphraseLabel = StrongBodyLabel('备份口令：', self)
+        self.passphraseLineEdit = PasswordLineEdit(self)
+        self.confirmLineEdit = PasswordLineEdit(self)
         self.warningLabel = CaptionLabel("路径、文件名及格式不能为空")
         self.__initWidget()
         self.__initLayout()
@@ -395,13 +680,16 @@ class ExportMessageBox(MessageBoxBase):
         self.viewLayout.setSpacing(20)
         self.pathLineEdit.resize(400, 30)
         self.pathLineEdit.setText(cfg.get(cfg.exportDir))
-        items = ['CSV', 'JSON', 'AES']
+        items = ['CSV', 'JSON', 'NDJSON', 'AES']
         self.fmtCombo.addItems(items)
         self.fmtCombo.setPlaceholderText('选择导出格式')
         self.fmtCombo.setMaximumWidth(200)
         self.fmtCombo.setCurrentIndex(-1)
         self.fileLineEdit.setPlaceholderText('输入文件名（不含后缀）')
         self.fileLineEdit.setClearButtonEnabled(True)
+        self.passphraseLineEdit.setPlaceholderText('设置口令，导入时需要输入')
+        self.confirmLineEdit.setPlaceholderText('再次输入口令')
+        self._update_passphrase_visible()
         self.warningLabel.setTextColor("#cf1010", QColor(255, 28, 32))
         self.warningLabel.hide()
         self.widget.setMinimumWidth(500)
@@ -412,6 +700,7 @@ class ExportMessageBox(MessageBoxBase):
         self.yesButton.clicked.disconnect()
         self.yesButton.clicked.connect(self._handle_export_passwords)
         self.browseButton.clicked.connect(self._handle_browse)
+        self.fmtCombo.currentTextChanged.connect(self._update_passphrase_visible)
 
     def __initLayout(self):
         self.viewLayout.addWidget(self.titleLabel)
@@ -426,7 +715,17 @@ class ExportMessageBox(MessageBoxBase):
         self.hboxLayout3.addWidget(self.fileLabel)
         self.hboxLayout3.addWidget(self.fileLineEdit)
         self.viewLayout.addLayout(self.hboxLayout3)
+        self.viewLayout.addWidget(self.passphraseLabel)
+        self.viewLayout.addWidget(self.passphraseLineEdit)
+        self.viewLayout.addWidget(self.confirmLineEdit)
         self.viewLayout.addWidget(self.warningLabel)
+
+    def _update_passphrase_visible(self):
+        """只有 AES 格式需要设置口令"""
+        visible = self.fmtCombo.currentText() == 'AES'
+        self.passphraseLabel.setVisible(visible)
+        self.passphraseLineEdit.setVisible(visible)
+        self.confirmLineEdit.setVisible(visible)
     
     def _handle_browse(self):
         """处理浏览文件夹逻辑"""
@@ -441,21 +740,13 @@ class ExportMessageBox(MessageBoxBase):
             fmt = self.fmtCombo.currentText()
             file_name = self.fileLineEdit.text().strip()
             full_path = f"{path}/{file_name}.{fmt.lower()}"
-            try:
-                self.interface.db.export_passwords(full_path, fmt.lower())
-                self.accept()
-                w = InfoBar.success(
-                    title = "成功",
-                    content="密码已导出到文件",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.interface.mainWindow
-                )
-                w.show()
-            except sqlite3.Error as e:
-                MessageBox("错误", f"导出失败: {str(e)}", self).exec_()
+            passphrase = self.passphraseLineEdit.text() if fmt == 'AES' else None
+            interface = self.interface
+            task = interface.database.submit("export_passwords", full_path, fmt.lower(), passphrase, progress=True)
+            interface.track_task(task, "正在导出")
+            task.finished.connect(lambda _: interface.show_info("成功", "密码已导出到文件"))
+            task.failed.connect(lambda e: interface.show_info("错误", f"导出失败: {str(e)}", error=True))
+            self.accept()
 
     def validate(self):
         """验证输入"""
@@ -474,6 +765,17 @@ class ExportMessageBox(MessageBoxBase):
             self.warningLabel.setText("目录路径无效")
             self.warningLabel.show()
             return False
+
+        # 加密备份的口令检查
+        if fmt == 'AES':
+            if not self.passphraseLineEdit.text():
+                self.warningLabel.setText("导出加密备份需要设置口令")
+                self.warningLabel.show()
+                return False
+            if self.passphraseLineEdit.text() != self.confirmLineEdit.text():
+                self.warningLabel.setText("两次输入的口令不一致")
+                self.warningLabel.show()
+                return False
         
         # 检查是否存在同名文件
         if os.path.exists(f"{path}/{name}.{fmt.lower()}"):
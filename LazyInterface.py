@@ -0,0 +1,40 @@
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QWidget, QVBoxLayout
+
+
+class LazyInterface(QWidget):
+    """
+    导航页的占位控件：真正的页面在第一次显示时构造，或由 build_when_idle() 在空闲时提前构造，
+    不参与启动时第一次绘制。factory() 返回页面控件，页面会被放进占位控件中。
+    """
+
+    def __init__(self, factory, object_name, parent=None):
+        super().__init__(parent=parent)
+        self.setObjectName(object_name)
+        self._factory = factory
+        self.widget = None
+        self.vBoxLayout = QVBoxLayout(self)
+        self.vBoxLayout.setContentsMargins(0, 0, 0, 0)
+
+    def is_built(self):
+        return self.widget is not None
+
+    def ensure_built(self):
+        """构造页面（只构造一次），返回页面控件"""
+        if self.widget is None:
+            self.widget = self._factory()
+            self.vBoxLayout.addWidget(self.widget)
+        return self.widget
+
+    def showEvent(self, e):
+        self.ensure_built()
+        super().showEvent(e)
+
+
+def build_when_idle(interfaces, interval=0):
+    """每次事件循环空闲时构造一个页面，避免一次性构造全部页面阻塞界面"""
+    pending = [interface for interface in interfaces if not interface.is_built()]
+    if not pending:
+        return
+    pending[0].ensure_built()
+    QTimer.singleShot(interval, lambda: build_when_idle(pending[1:], interval))
@@ -0,0 +1,231 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from safekey.database import page_key
+from safekey.fieldcrypto import SealedField, VaultLockedError
+from safekey.profiling import profiler
+
+
+class PasswordTableModel(QAbstractTableModel):
+    """
+    密码表格的数据模型。
+    行数据以元组形式紧凑存储，视图只为可见行请求显示内容；
+    数据按页增量获取（canFetchMore/fetchMore），打开大型密码库时无需一次性加载全部记录；
+    每页由 fetcher 在后台线程读取，到达后才追加到表格，界面线程不会等待数据库。
+    加密字段以 SealedField 保存，显示时只显示掩码，进入编辑时才解密该单元格。
+    """
+    HEADERS = ['ID', '网站', '用户名', '密码', '备注']
+    COLUMNS = {1: "website", 2: "username", 3: "password", 4: "notes"}
+
+    def __init__(self, parent=None, page_size=256):
+        super().__init__(parent)
+        self.page_size = page_size
+        self._rows = []         # 已获取的行
+        self._visible = 0       # 已提供给视图的行数
+        self._fetcher = None    # fetcher(after, limit, callback)，读取完成后调用 callback(rows)，失败时 rows 为 None
+        self._exhausted = True
+        self._pending = False   # 是否有尚未返回的页
+        self._generation = 0    # 数据源每次更换时加一，忽略旧数据源迟到的页
+        self.sort_column = "website"  # 分页浏览时行的顺序，见 set_fetcher
+        self.descending = False
+        self.edit_handler = None  # edit_handler(record, column, value)，异步写入后调用 replace_record
+
+    def set_fetcher(self, fetcher, first_page=None, sort_column="website", descending=False):
+        """
+        使用分页获取函数作为数据源，first_page 为已经读取好的第一页（如在后台线程中读取）。
+        fetcher 返回的行按 (sort_column, id) 排序（见 DatabaseManager.query_passwords）。
+        """
+        self.beginResetModel()
+        self._reset_source()
+        self.sort_column = sort_column
+        self.descending = descending
+        self._rows = list(first_page or [])
+        self._visible = len(self._rows)
+        self._fetcher = fetcher
+        self._exhausted = first_page is not None and len(self._rows) < self.page_size
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        """使用已有的结果集（如搜索结果）作为数据源，仍按页逐步展示"""
+        self.beginResetModel()
+        self._reset_source()
+        self._rows = list(rows)
+        self._visible = min(len(self._rows), self.page_size)
+        self._fetcher = None
+        self._exhausted = True
+        self.endResetModel()
+
+    def _reset_source(self):
+        self._generation += 1
+        self._pending = False
+
+    def sort_key(self, row):
+        """分页使用的排序键：(排序列, id)"""
+        return page_key(row, self.sort_column)
+
+    def _bisect(self, key):
+        """按当前排序方向二分查找 key 的插入位置"""
+        lo, hi = 0, len(self._rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self.sort_key(self._rows[mid])
+            if (current > key) if self.descending else (current < key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def record_id(self, row):
+        return self._rows[row][0]
+
+    def record(self, row):
+        return self._rows[row]
+
+    def is_browsing(self):
+        """是否处于分页浏览模式（行按 (排序列, id) 有序）"""
+        return self._fetcher is not None
+
+    def insert_record(self, record):
+        """按排序位置插入一条新记录，只在分页浏览模式下使用"""
+        pos = self._bisect(self.sort_key(record))
+        if pos == len(self._rows) and not self._exhausted:
+            # 位于尚未获取的范围内，之后翻页时自然会取到
+            return
+        self._rows.insert(pos, record)
+        if pos < self._visible or self._exhausted and pos == self._visible:
+            self.beginInsertRows(QModelIndex(), pos, pos)
+            self._visible += 1
+            self.endInsertRows()
+
+    def remove_records(self, records):
+        """移除已删除的记录"""
+        for record in records:
+            pos = self._locate(record)
+            if pos < 0:
+                continue
+            if pos < self._visible:
+                self.beginRemoveRows(QModelIndex(), pos, pos)
+                del self._rows[pos]
+                self._visible -= 1
+                self.endRemoveRows()
+            else:
+                del self._rows[pos]
+
+    def _locate(self, record):
+        """查找记录所在的行：浏览模式下二分查找，搜索结果中（或记录的排序列已改变时）按 ID 查找"""
+        if self.is_browsing():
+            key = self.sort_key(record)
+            pos = self._bisect(key)
+            if pos < len(self._rows) and self.sort_key(self._rows[pos]) == key:
+                return pos
+        for pos, row in enumerate(self._rows):
+            if row[0] == record[0]:
+                return pos
+        return -1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._visible
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            value = self._rows[index.row()][index.column()]
+            if role == Qt.EditRole:
+                return self._plaintext(value)
+            return "" if value is None else str(value)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    @staticmethod
+    def _plaintext(value):
+        """单元格的明文内容，加密字段无法解密时返回 None"""
+        if isinstance(value, SealedField):
+            try:
+                return value.reveal()
+            except VaultLockedError:
+                return None
+        return "" if value is None else str(value)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() in self.COLUMNS:
+            value = self._rows[index.row()][index.column()]
+            # 密码库锁定时加密字段不可编辑
+            if not isinstance(value, SealedField) or value.owner.is_unlocked():
+                flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """单元格编辑完成后交给 edit_handler 写入数据库，写入完成后由 replace_record 更新该行"""
+        if role != Qt.EditRole or index.column() not in self.COLUMNS or self.edit_handler is None:
+            return False
+        value = str(value).strip()
+        record = self._rows[index.row()]
+        if value == self._plaintext(record[index.column()]):
+            return False
+        self.edit_handler(record, self.COLUMNS[index.column()], value)
+        return True
+
+    def replace_record(self, record, updated):
+        """用更新后的记录替换原记录，排序键改变时移动到新的位置"""
+        updated = tuple(updated)
+        pos = self._locate(record)
+        if pos < 0:
+            return
+        if self.is_browsing() and self.sort_key(updated) != self.sort_key(record):
+            self.remove_records([record])
+            self.insert_record(updated)
+        else:
+            self._rows[pos] = updated
+            if pos < self._visible:
+                self.dataChanged.emit(self.index(pos, 0), self.index(pos, self.columnCount() - 1))
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._visible < len(self._rows) or not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        if self._visible >= len(self._rows) and not self._exhausted:
+            if not self._pending:
+                self._pending = True
+                after = self.sort_key(self._rows[-1]) if self._rows else None
+                generation = self._generation
+                self._fetcher(after, self.page_size, lambda page: self._on_page(generation, page))
+            return
+        self._show_more()
+
+    def _on_page(self, generation, page):
+        """后台读取的页到达：追加到已获取的行并展示；读取失败时之后滚动到底部会重试"""
+        if generation != self._generation:
+            return
+        self._pending = False
+        if page is None:
+            return
+        if len(page) < self.page_size:
+            self._exhausted = True
+        self._rows.extend(page)
+        self._show_more()
+
+    def _show_more(self):
+        end = min(len(self._rows), self._visible + self.page_size)
+        if end > self._visible:
+            self.beginInsertRows(QModelIndex(), self._visible, end - 1)
+            self._visible = end
+            self.endInsertRows()
+
+
+# 启用性能分析时为表格的重建和分页计时
+profiler.register(PasswordTableModel, "table",
+                  ("set_fetcher", "set_rows", "fetchMore", "_on_page", "insert_record", "remove_records",
+                   "replace_record"))
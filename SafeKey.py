@@ -4,27 +4,56 @@ from qfluentwidgets import (NavigationItemPosition, setTheme, Theme, MSFluentWin
                             NavigationAvatarWidget, SubtitleLabel, setFont, FlyoutView,
                             FlyoutAnimationType, HyperlinkButton, Flyout, SplashScreen)
 from qfluentwidgets import FluentIcon as FIF
-from PyQt5.QtCore import Qt, QUrl, QPoint, QSize
+from PyQt5.QtCore import Qt, QUrl, QPoint, QSize, pyqtSignal
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QApplication
-from SettingInterface import SettingInterface
 from HomeInterface import HomeInterface
-from ToolInterface import ToolInterface
+from LazyInterface import LazyInterface, build_when_idle
 from config import cfg
+from safekey.keymanager import key_manager
+from safekey.profiling import profiler
 
 myappid = 'SafeKey'
-ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
+if sys.platform == "win32":
+    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
 class MainWindow(MSFluentWindow):
+    # 主页第一屏数据加载完成、启动画面关闭后发出
+    ready = pyqtSignal()
 
     def __init__(self):
         super().__init__()
         self.initWindow()
+        key_manager.set_idle_timeout(cfg.get(cfg.keyCacheTimeout))
+        if cfg.get(cfg.profiling):
+            profiler.enable()
+
+        # 先显示启动画面，主页的第一屏数据在后台读取，读取完成后关闭启动画面
+        self.splashScreen = SplashScreen(self.windowIcon(), self)
+        self.splashScreen.setIconSize(QSize(102, 102))
+        self.show()
+        QApplication.processEvents()
+
         self.homeInterface = HomeInterface('密码管理', self)
-        self.settingInterface = SettingInterface('设置', self)
-        self.toolInterface = ToolInterface('随机密码生成器', self)
+        # 工具页和设置页在第一次打开时或启动后空闲时才构造
+        self.toolInterface = LazyInterface(self.createToolInterface, '随机密码生成器', self)
+        self.settingInterface = LazyInterface(self.createSettingInterface, '设置', self)
         self.initNavigation()
-        
+        self.homeInterface.loaded.connect(self.onHomeLoaded)
+
+    def createToolInterface(self):
+        from ToolInterface import ToolInterface
+        return ToolInterface('随机密码生成器', self)
+
+    def createSettingInterface(self):
+        from SettingInterface import SettingInterface
+        return SettingInterface('设置', self)
+
+    def onHomeLoaded(self):
+        self.homeInterface.loaded.disconnect(self.onHomeLoaded)
+        self.splashScreen.finish()
+        self.ready.emit()
+        build_when_idle([self.toolInterface, self.settingInterface])
 
     def initNavigation(self):
         self.addSubInterface(self.homeInterface, FIF.HOME, '主页', FIF.HOME_FILL)
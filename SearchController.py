@@ -0,0 +1,96 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from safekey.database import DatabaseManager
+
+
+class SearchController(QObject):
+    """
+    实时搜索控制器：
+    对输入进行防抖，通过 DatabaseController 在工作线程中执行查询，并取消或丢弃被新查询取代的过期请求；
+    当新关键词包含上一次的关键词时，直接在上一次的结果中筛选，不再查询数据库。
+    """
+    resultsReady = pyqtSignal(object)
+    searchFailed = pyqtSignal(str)
+    cleared = pyqtSignal()
+
+    def __init__(self, database, parent=None, delay=250):
+        super().__init__(parent)
+        self.database = database  # DatabaseController，查询在其工作线程中执行
+        self.generation = 0
+        self._pending = ("", ("website",))
+        self._last = None  # 最近一次完整结果 (keyword, fields, rows)
+        self._task = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self._dispatch)
+
+    def search(self, keyword, fields, immediate=False):
+        """提交一次搜索，immediate 为 True 时跳过防抖"""
+        self._pending = (keyword, tuple(fields))
+        # 任何新输入都会让进行中的查询失效
+        self._cancel_task()
+        self.generation += 1
+        if immediate:
+            self._timer.stop()
+            self._dispatch()
+        else:
+            self._timer.start()
+
+    def cancel(self):
+        """取消尚未完成的搜索，之后到达的结果会被丢弃"""
+        self._timer.stop()
+        self._cancel_task()
+        self.generation += 1
+
+    def _cancel_task(self):
+        # 仍在队列中的查询不再执行
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def invalidate(self):
+        """数据发生变化后调用，使缓存的结果集失效"""
+        self._last = None
+
+    def _dispatch(self):
+        keyword, fields = self._pending
+        if not keyword:
+            self._last = None
+            self.cleared.emit()
+            return
+
+        if self._last is not None:
+            last_keyword, last_fields, last_rows = self._last
+            if last_fields == fields and last_keyword in keyword:
+                rows = self._refine(last_rows, keyword, fields)
+                self._last = (keyword, fields, rows)
+                self.resultsReady.emit(rows)
+                return
+
+        generation = self.generation
+        self._task = self.database.submit("search_passwords", keyword, fields)
+        self._task.finished.connect(lambda rows: self._on_finished(generation, keyword, fields, rows))
+        self._task.failed.connect(lambda error: self._on_failed(generation, str(error)))
+
+    def _refine(self, rows, keyword, fields):
+        """在已有结果中按新关键词筛选，保持原有顺序"""
+        columns = [DatabaseManager.COLUMNS.index(field) for field in fields]
+        needle = keyword.lower()
+        return [
+            row for row in rows
+            if any(row[col] is not None and needle in str(row[col]).lower() for col in columns)
+        ]
+
+    def _on_finished(self, generation, keyword, fields, rows):
+        if generation != self.generation:
+            return
+        self._task = None
+        self._last = (keyword, fields, rows)
+        self.resultsReady.emit(rows)
+
+    def _on_failed(self, generation, message):
+        if generation != self.generation:
+            return
+        self._task = None
+        self.searchFailed.emit(message)
@@ -1,14 +1,45 @@
 from PyQt5.QtWidgets import (QFrame, QWidget, QApplication, QVBoxLayout, QSizePolicy, QFileDialog, 
-                            QHBoxLayout)
+                            QHBoxLayout, QTableWidgetItem)
 from PyQt5.QtGui import QColor, QDesktopServices
 from qfluentwidgets import FluentIcon as FIF
-from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtCore import Qt, QUrl, QObject, pyqtSignal
 from qfluentwidgets import (
     SubtitleLabel, setFont, OptionsSettingCard, setTheme, Theme, PushSettingCard,
     HyperlinkCard, FluentIcon, PrimaryPushSettingCard, ScrollArea, SettingCardGroup,
-    ExpandGroupSettingCard, BodyLabel, PushButton, setThemeColor, ColorDialog,
+    ExpandGroupSettingCard, BodyLabel, PushButton, setThemeColor, ColorDialog, RangeSettingCard,
+    InfoBar, InfoBarPosition, MessageBoxBase, PasswordLineEdit, CaptionLabel, SwitchSettingCard, TableWidget,
 )
 from config import cfg
+from safekey.keymanager import key_manager, calibrate
+from safekey.breach import BreachIndex, INDEX_SUFFIX
+from safekey.profiling import profiler, PERCENTILES
+from safekey.querylog import top_offenders
+import os
+import threading
+
+
+class CalibrationTask(QObject):
+    """在后台线程中测量 scrypt 耗时，完成后 finished(log2_n)，失败时 failed(异常)，都在 GUI 线程中处理"""
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(object)
+
+    def __init__(self, target_seconds=0.5, parent=None):
+        super().__init__(parent)
+        self.target_seconds = target_seconds
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            log2_n = calibrate(target_seconds=self.target_seconds)
+        except Exception as e:
+            self.failed.emit(e)
+            return
+        self.finished.emit(log2_n)
+
 
 class SettingInterface(ScrollArea):
     def __init__(self, text: str, parent=None):
@@ -67,6 +98,123 @@ class SettingInterface(ScrollArea):
         )
         self.importSettingcard.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
         self.importSettingcard.optionChanged.connect(self.import_option_changed)
+        self.searchScopeCard = OptionsSettingCard(
+            cfg.searchScope,
+            FIF.SEARCH,
+            "搜索范围",
+            "选择搜索时匹配的字段",
+            texts=["仅网站", "网站、用户名及备注"]
+        )
+        self.searchScopeCard.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
+
+        # 安全相关
+        self.securityGroup = SettingCardGroup(self.tr('安全'), self.scrollWidget)
+        self.keyCacheCard = RangeSettingCard(
+            cfg.keyCacheTimeout,
+            FIF.STOP_WATCH,
+            "密钥缓存时间（秒）",
+            "备份口令派生的密钥在空闲多久后从内存中清除，0 表示不缓存"
+        )
+        self.keyCacheCard.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
+        self.keyCacheCard.valueChanged.connect(key_manager.set_idle_timeout)
+        self.kdfCard = PushSettingCard(
+            text="校准",
+            icon=FIF.SPEED_HIGH,
+            title="口令派生强度",
+            content=self._kdf_content()
+        )
+        self.kdfCard.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
+        self.kdfCard.clicked.connect(self.calibrate_kdf)
+        self.encryptionCard = PushSettingCard(
+            text="启用",
+            icon=FIF.FINGERPRINT,
+            title="加密存储",
+            content=self._encryption_content(False)
+        )
+        self.encryptionCard.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
+        # 是否已加密由后台线程读取，读取完成前按钮不可用
+        self.encryptionCard.button.setEnabled(False)
+        self.encryptionCard.clicked.connect(self.enable_encryption)
+        task = self.mainWindow.homeInterface.database.submit("is_encrypted")
+        task.finished.connect(self._show_encryption_state)
+        self.breachIndexCard = PushSettingCard(
+            text="选择文件",
+            icon=FIF.CERTIFICATE,
+            title="泄露密码索引",
+            content=self._breach_index_content()
+        )
+        self.breachIndexCard.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
+        self.breachIndexCard.clicked.connect(self.choose_breach_index)
+
+        # 数据库存储参数，重启后生效
+        self.storageGroup = SettingCardGroup(self.tr('数据库'), self.scrollWidget)
+        self.journalModeCard = OptionsSettingCard(
+            cfg.journalMode,
+            FIF.HISTORY,
+            "日志模式",
+            "WAL 模式下读写互不阻塞，写入更快（重启后生效）",
+            texts=["WAL", "DELETE"]
+        )
+        self.synchronousCard = OptionsSettingCard(
+            cfg.synchronous,
+            FIF.SYNC,
+            "同步级别",
+            "NORMAL 减少磁盘同步次数，FULL 每次提交都同步（重启后生效）",
+            texts=["NORMAL", "FULL"]
+        )
+        self.mmapCard = RangeSettingCard(
+            cfg.mmapSizeMB,
+            FIF.SPEED_HIGH,
+            "内存映射大小（MB）",
+            "通过内存映射读取数据库文件，0 表示不使用（重启后生效）"
+        )
+        self.cacheCard = RangeSettingCard(
+            cfg.cacheSizeMB,
+            FIF.SAVE,
+            "页缓存大小（MB）",
+            "SQLite 页缓存的上限（重启后生效）"
+        )
+        self.tempStoreCard = OptionsSettingCard(
+            cfg.tempStore,
+            FIF.DOCUMENT,
+            "临时数据位置",
+            "导入暂存表和排序使用的临时数据存放位置（重启后生效）",
+            texts=["内存", "文件", "默认"]
+        )
+        for card in (self.journalModeCard, self.synchronousCard, self.mmapCard, self.cacheCard, self.tempStoreCard):
+            card.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
+
+        # 诊断相关
+        self.diagnosticsGroup = SettingCardGroup(self.tr('诊断'), self.scrollWidget)
+        self.profilingCard = SwitchSettingCard(
+            FIF.STOP_WATCH,
+            "性能分析",
+            "记录数据库操作、表格刷新、加密和密码生成的耗时，关闭时没有额外开销",
+            configItem=cfg.profiling
+        )
+        self.profilingCard.checkedChanged.connect(self.profiling_changed)
+        self.diagnosticsCard = PushSettingCard(
+            text="查看",
+            icon=FIF.HISTORY,
+            title="性能数据",
+            content="按操作汇总的次数和耗时分位数，可导出为 JSON 或 Chrome 跟踪格式"
+        )
+        self.diagnosticsCard.clicked.connect(lambda: DiagnosticsMessageBox(self.mainWindow).exec_())
+        self.slowQueryMsCard = RangeSettingCard(
+            cfg.slowQueryMs,
+            FIF.STOP_WATCH,
+            "慢查询阈值（毫秒）",
+            "超过该耗时的数据库语句连同查询计划记入慢查询日志，0 表示不记录"
+        )
+        self.slowQueryCard = PushSettingCard(
+            text="查看",
+            icon=FIF.SEARCH,
+            title="慢查询",
+            content="按总耗时列出最慢的语句及其查询计划"
+        )
+        self.slowQueryCard.clicked.connect(lambda: SlowQueryMessageBox(self.mainWindow).exec_())
+        for card in (self.profilingCard, self.diagnosticsCard, self.slowQueryMsCard, self.slowQueryCard):
+            card.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
 
         # 关于相关
         self.aboutGroup = SettingCardGroup(self.tr('关于'), self.scrollWidget)
@@ -93,11 +241,28 @@ class SettingInterface(ScrollArea):
         self.visualGroup.addSettingCard(self.colorCard)
         self.customizationGroup.addSettingCard(self.directoryCard)
         self.customizationGroup.addSettingCard(self.importSettingcard)
+        self.customizationGroup.addSettingCard(self.searchScopeCard)
+        self.securityGroup.addSettingCard(self.keyCacheCard)
+        self.securityGroup.addSettingCard(self.kdfCard)
+        self.securityGroup.addSettingCard(self.encryptionCard)
+        self.securityGroup.addSettingCard(self.breachIndexCard)
+        self.storageGroup.addSettingCard(self.journalModeCard)
+        self.storageGroup.addSettingCard(self.synchronousCard)
+        self.storageGroup.addSettingCard(self.mmapCard)
+        self.storageGroup.addSettingCard(self.cacheCard)
+        self.storageGroup.addSettingCard(self.tempStoreCard)
+        self.diagnosticsGroup.addSettingCard(self.profilingCard)
+        self.diagnosticsGroup.addSettingCard(self.diagnosticsCard)
+        self.diagnosticsGroup.addSettingCard(self.slowQueryMsCard)
+        self.diagnosticsGroup.addSettingCard(self.slowQueryCard)
         self.aboutGroup.addSettingCard(self.helpCard)
         self.aboutGroup.addSettingCard(self.aboutCard)
         self.vBoxLayout.addWidget(self.label, 0, Qt.AlignLeft | Qt.AlignTop)
         self.vBoxLayout.addWidget(self.visualGroup)
         self.vBoxLayout.addWidget(self.customizationGroup)
+        self.vBoxLayout.addWidget(self.securityGroup)
+        self.vBoxLayout.addWidget(self.storageGroup)
+        self.vBoxLayout.addWidget(self.diagnosticsGroup)
         self.vBoxLayout.addWidget(self.aboutGroup)
         self.vBoxLayout.addStretch(1)
         self.vBoxLayout.setContentsMargins(20, 20, 20, 20)
@@ -126,6 +291,305 @@ class SettingInterface(ScrollArea):
         selected_option = item.value
         cfg.set(cfg.importSetting, selected_option)
 
+    def _kdf_content(self):
+        log2_n = cfg.get(cfg.kdfLog2N)
+        return f"当前 scrypt 参数 N = 2^{log2_n}（约 {2 ** log2_n * 8 * 128 // 1024 // 1024} MB 内存），点击校准以适配本机性能"
+
+    def calibrate_kdf(self):
+        """在后台测量本机 scrypt 耗时，选择解锁时间不超过 0.5 秒的最高强度，测量期间按钮不可用"""
+        self.kdfCard.button.setEnabled(False)
+        self.kdfCard.setContent("正在测量本机 scrypt 耗时…")
+        # 保存引用，避免测量完成前任务对象被回收
+        self._calibration = CalibrationTask(0.5, self)
+        self._calibration.finished.connect(self._on_calibrated)
+        self._calibration.failed.connect(self._on_calibration_failed)
+        self._calibration.start()
+
+    def _on_calibrated(self, log2_n):
+        self._calibration = None
+        self.kdfCard.button.setEnabled(True)
+        cfg.set(cfg.kdfLog2N, log2_n)
+        self.kdfCard.setContent(self._kdf_content())
+        InfoBar.success(
+            title="校准完成",
+            content=f"已将 scrypt 参数设置为 N = 2^{log2_n}",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+
+    def _on_calibration_failed(self, error):
+        self._calibration = None
+        self.kdfCard.button.setEnabled(True)
+        self.kdfCard.setContent(self._kdf_content())
+        InfoBar.error(
+            title="错误",
+            content=f"校准失败: {str(error)}",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+
+    def _show_encryption_state(self, encrypted):
+        self.encryptionCard.button.setEnabled(not encrypted)
+        self.encryptionCard.setContent(self._encryption_content(encrypted))
+
+    def _encryption_content(self, encrypted):
+        if encrypted:
+            return "密码和备注已加密保存，仅在显示或复制时解密"
+        return "使用主口令加密数据库中的密码和备注，已有记录将就地迁移"
+
+    def enable_encryption(self):
+        """将当前密码库迁移为加密存储"""
+        box = EncryptionMessageBox(self.mainWindow)
+        if not box.exec_():
+            return
+        home = self.mainWindow.homeInterface
+        self.encryptionCard.button.setEnabled(False)
+        task = home.database.submit("enable_encryption", box.passphraseLineEdit.text())
+        home.track_task(task, "正在加密密码库")
+        task.finished.connect(lambda _: self._on_encryption_enabled())
+        task.failed.connect(self._on_encryption_failed)
+
+    def _on_encryption_enabled(self):
+        home = self.mainWindow.homeInterface
+        home.load_data()
+        self.encryptionCard.setContent(self._encryption_content(True))
+        InfoBar.success(
+            title="成功",
+            content="密码库已启用加密存储",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+
+    def _on_encryption_failed(self, error):
+        self.encryptionCard.button.setEnabled(True)
+        InfoBar.error(
+            title="错误",
+            content=f"迁移失败: {str(error)}",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+
+    def _breach_index_content(self):
+        path = cfg.get(cfg.breachIndex)
+        if path:
+            return path
+        return "用 python -m safekey breach-index 将 HIBP 语料转换为索引，添加密码和生成密码时离线检查是否已泄露"
+
+    def choose_breach_index(self):
+        """选择泄露密码索引文件，打开一次以确认格式有效"""
+        path, _ = QFileDialog.getOpenFileName(self, "选择泄露密码索引", "", f"泄露密码索引 (*{INDEX_SUFFIX})")
+        if not path:
+            return
+        try:
+            with BreachIndex(path) as index:
+                count = index.count
+        except (OSError, ValueError) as e:
+            InfoBar.error(
+                title="错误",
+                content=f"无法打开泄露密码索引: {str(e)}",
+                orient=Qt.Vertical,
+                isClosable=True,
+                position=InfoBarPosition.BOTTOM_RIGHT,
+                duration=2000,
+                parent=self.mainWindow
+            )
+            return
+        cfg.set(cfg.breachIndex, path)
+        self.breachIndexCard.setContent(self._breach_index_content())
+        InfoBar.success(
+            title="成功",
+            content=f"已选择包含 {count} 条哈希的泄露密码索引",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+
+    def profiling_changed(self, checked):
+        if checked:
+            profiler.enable()
+        else:
+            profiler.disable()
+
+class DiagnosticsMessageBox(MessageBoxBase):
+    """性能数据：各计时区间的次数、总耗时和分位数，按总耗时从高到低排列"""
+    HEADERS = ["操作", "次数", "总计 (ms)"] + [f"p{p} (ms)" for p in PERCENTILES] + ["最大 (ms)"]
+    KEYS = ["count", "total_ms"] + [f"p{p}_ms" for p in PERCENTILES] + ["max_ms"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mainWindow = parent
+        self.titleLabel = SubtitleLabel('性能数据', self)
+        self.hintLabel = CaptionLabel("", self)
+        self.table = TableWidget(self)
+        self.table.setColumnCount(len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(TableWidget.NoEditTriggers)
+        self.table.setMinimumSize(760, 360)
+        self.refreshButton = PushButton("刷新", self)
+        self.resetButton = PushButton("清空", self)
+        self.jsonButton = PushButton("导出 JSON", self)
+        self.traceButton = PushButton("导出 Chrome 跟踪", self)
+        self.refreshButton.clicked.connect(self.refresh)
+        self.resetButton.clicked.connect(lambda: (profiler.reset(), self.refresh()))
+        self.jsonButton.clicked.connect(lambda: self.export("json", "safekey-profile.json"))
+        self.traceButton.clicked.connect(lambda: self.export("chrome", "safekey-trace.json"))
+        self.buttonLayout = QHBoxLayout()
+        for button in (self.refreshButton, self.resetButton, self.jsonButton, self.traceButton):
+            self.buttonLayout.addWidget(button)
+        self.buttonLayout.addStretch(1)
+        self.yesButton.setText('关闭')
+        self.cancelButton.hide()
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.hintLabel)
+        self.viewLayout.addWidget(self.table)
+        self.viewLayout.addLayout(self.buttonLayout)
+        self.refresh()
+
+    def refresh(self):
+        spans = profiler.summary()
+        if not profiler.enabled:
+            self.hintLabel.setText("性能分析未开启，以下为开启期间记录的数据")
+        else:
+            self.hintLabel.setText(f"共 {len(spans)} 种操作")
+        self.table.setRowCount(len(spans))
+        for row, span in enumerate(spans):
+            self.table.setItem(row, 0, QTableWidgetItem(span["name"]))
+            for column, key in enumerate(self.KEYS, 1):
+                value = span[key]
+                item = QTableWidgetItem(str(value) if key == "count" else f"{value:.3f}")
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.table.resizeColumnsToContents()
+
+    def export(self, fmt, default_name):
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能数据", os.path.join(cfg.get(cfg.exportDir), default_name),
+                                              "JSON 文件 (*.json)")
+        if not path:
+            return
+        try:
+            profiler.export(path, fmt)
+        except OSError as e:
+            InfoBar.error(
+                title="错误",
+                content=f"导出失败: {str(e)}",
+                orient=Qt.Vertical,
+                isClosable=True,
+                position=InfoBarPosition.BOTTOM_RIGHT,
+                duration=2000,
+                parent=self.mainWindow
+            )
+            return
+        InfoBar.success(
+            title="成功",
+            content=f"已导出到 {path}",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+
+class SlowQueryMessageBox(MessageBoxBase):
+    """慢查询：按语句汇总慢查询日志（包括轮转文件），按总耗时从高到低排列"""
+    HEADERS = ["语句", "次数", "总计 (ms)", "最大 (ms)", "行数", "查询计划"]
+    LIMIT = 50
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.titleLabel = SubtitleLabel('慢查询', self)
+        self.hintLabel = CaptionLabel("", self)
+        self.table = TableWidget(self)
+        self.table.setColumnCount(len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(TableWidget.NoEditTriggers)
+        self.table.setWordWrap(False)
+        self.table.setMinimumSize(760, 360)
+        self.refreshButton = PushButton("刷新", self)
+        self.refreshButton.clicked.connect(self.refresh)
+        self.buttonLayout = QHBoxLayout()
+        self.buttonLayout.addWidget(self.refreshButton)
+        self.buttonLayout.addStretch(1)
+        self.yesButton.setText('关闭')
+        self.cancelButton.hide()
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.hintLabel)
+        self.viewLayout.addWidget(self.table)
+        self.viewLayout.addLayout(self.buttonLayout)
+        self.refresh()
+
+    def refresh(self):
+        path = cfg.get(cfg.slowQueryLog)
+        try:
+            items = top_offenders(path, self.LIMIT)
+        except OSError as e:
+            items = []
+            self.hintLabel.setText(f"无法读取慢查询日志: {str(e)}")
+        else:
+            if cfg.get(cfg.slowQueryMs) == 0:
+                self.hintLabel.setText("慢查询日志未开启，以下为之前记录的语句")
+            else:
+                self.hintLabel.setText(f"{os.path.abspath(path)} 中共 {len(items)} 种语句")
+        self.table.setRowCount(len(items))
+        for row, entry in enumerate(items):
+            sql = QTableWidgetItem(entry["sql"])
+            sql.setToolTip(f"{entry['sql']}\n参数 {entry['params']}")
+            self.table.setItem(row, 0, sql)
+            values = (str(entry["count"]), f"{entry['total_ms']:.1f}", f"{entry['max_ms']:.1f}", str(entry["rows"]))
+            for column, value in enumerate(values, 1):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+            plan = QTableWidgetItem(" / ".join(line.strip() for line in entry["plan"]))
+            plan.setToolTip("\n".join(entry["plan"]))
+            self.table.setItem(row, 5, plan)
+        self.table.resizeColumnsToContents()
+        self.table.setColumnWidth(0, min(self.table.columnWidth(0), 320))
+
+class EncryptionMessageBox(MessageBoxBase):
+    """设置密码库主口令的对话框"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.titleLabel = SubtitleLabel('启用加密存储', self)
+        self.passphraseLineEdit = PasswordLineEdit(self)
+        self.passphraseLineEdit.setPlaceholderText('设置主口令')
+        self.confirmLineEdit = PasswordLineEdit(self)
+        self.confirmLineEdit.setPlaceholderText('再次输入主口令')
+        self.warningLabel = CaptionLabel("主口令遗忘后无法恢复数据")
+        self.warningLabel.setTextColor("#cf1010", QColor(255, 28, 32))
+        self.widget.setMinimumWidth(350)
+        self.yesButton.setText('加密')
+        self.cancelButton.setText('取消')
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.passphraseLineEdit)
+        self.viewLayout.addWidget(self.confirmLineEdit)
+        self.viewLayout.addWidget(self.warningLabel)
+
+    def validate(self):
+        passphrase = self.passphraseLineEdit.text()
+        if not passphrase:
+            self.warningLabel.setText("主口令不能为空")
+            return False
+        if passphrase != self.confirmLineEdit.text():
+            self.warningLabel.setText("两次输入的口令不一致")
+            return False
+        return True
+
 class ColorCard(ExpandGroupSettingCard):
     def __init__(self, parent=None, mainWindow=None):
         super().__init__(FluentIcon.VIEW, "主题颜色", "修改主题颜色", parent)
@@ -1,12 +1,34 @@
-from PyQt5.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QWidget
+from PyQt5.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QWidget, QApplication, QFileDialog
 from qfluentwidgets import (SubtitleLabel, setFont, HeaderCardWidget, ComboBox, StrongBodyLabel, CaptionLabel,
-                            PrimaryPushButton, InfoBar ,HorizontalSeparator, LineEdit, InfoBarPosition,
+                            PrimaryPushButton, PushButton, InfoBar ,HorizontalSeparator, LineEdit, InfoBarPosition,
                             ProgressBar, SingleDirectionScrollArea, CheckBox, SpinBox, CompactSpinBox,
-                            SwitchButton, TextBrowser)
+                            SwitchButton, TextBrowser, StateToolTip)
 from qfluentwidgets import FluentIcon as FIF
 from PyQt5.QtCore import Qt
+from safekey.generator import PasswordGenerator, build_charset
+from safekey.strength import LEVEL_COLORS, LEVEL_NAMES, entropy, level, percent
+from GeneratorWorker import GeneratorTask
+from config import cfg
 import string
-import random
+import secrets
+
+# 系统 CSPRNG
+_random = secrets.SystemRandom()
+# 生成结果中最多显示的密码数，完整结果可以复制或生成到文件
+MAX_PREVIEW = 1000
+# 生成到界面（可复制）的最大数量，更多的密码只能生成到文件
+MAX_IN_MEMORY = 100000
+# 生成到文件的最大数量
+MAX_COUNT = 10000000
+
+
+def show_strength(bar, label, bits, text=None):
+    """按熵（比特）设置强度条的长度和颜色，text 默认为强度等级"""
+    level_ = level(bits)
+    bar.setValue(percent(bits))
+    bar.setCustomBarColor(LEVEL_COLORS[level_], LEVEL_COLORS[level_])
+    label.setText(text or f"{LEVEL_NAMES[level_]}（约 {bits:.0f} 比特）")
+    label.show()
 
 class ToolInterface(SingleDirectionScrollArea):
     def __init__(self, text : str, parent = None):
@@ -115,18 +137,10 @@ class EasyPassGenerator(HeaderCardWidget):
         """简易密码生成器的处理逻辑"""
         if self.comboBox.currentText() == "高强度":
             password = self.generate_strong()
-            self.resultLineEdit.setText("".join(password))
-            self.strengthBar.setValue(100)
-            self.strengthBar.setCustomBarColor("#00FF00", "#00FF00")
-            self.strengthBarLabel.setText("强")
-            self.strengthBarLabel.show()
         else:
             password = self.generate_memorable()
-            self.resultLineEdit.setText("".join(password))
-            self.strengthBar.setValue(33)
-            self.strengthBar.setCustomBarColor("#FF0000", "#FF0000")
-            self.strengthBarLabel.setText("弱")
-            self.strengthBarLabel.show()
+        self.resultLineEdit.setText(password)
+        show_strength(self.strengthBar, self.strengthBarLabel, entropy(password))
 
     def generate_strong(self, length=16):
         """生成高强度密码（默认16位）"""
@@ -138,22 +152,22 @@ class EasyPassGenerator(HeaderCardWidget):
         
         # 确保每个字符集至少包含一个字符
         password = [
-            random.choice(uppercase),
-            random.choice(lowercase),
-            random.choice(digits),
-            random.choice(symbols)
+            _random.choice(uppercase),
+            _random.choice(lowercase),
+            _random.choice(digits),
+            _random.choice(symbols)
         ]
         
         # 填充剩余长度
         all_chars = uppercase + lowercase + digits + symbols
-        password += random.choices(all_chars, k=length-4)
-        random.shuffle(password)
+        password += _random.choices(all_chars, k=length-4)
+        _random.shuffle(password)
         return ''.join(password)
     
     def generate_memorable(self, words=2, digits=2):
         """生成易记密码（默认2个单词+2个数字）"""
-        selected = random.sample(self.word_list, words)
-        numbers = str(random.randint(10**(digits-1), 10**digits-1))
+        selected = _random.sample(self.word_list, words)
+        numbers = str(_random.randint(10**(digits-1), 10**digits-1))
         return ''.join(selected) + numbers
 
     def copy_password(self):
@@ -188,7 +202,7 @@ class ComplexPassGenerator(HeaderCardWidget):
         self.excludeContainer = QHBoxLayout()
         self.excludeLineEdit = LineEdit()
         self.excludeSwitchButton = SwitchButton()
-        self.countLabel = StrongBodyLabel("生成数量（1-20）", self)
+        self.countLabel = StrongBodyLabel(f"生成数量（超过 {MAX_IN_MEMORY} 个时请生成到文件）", self)
         self.lenLabel = StrongBodyLabel("密码长度范围（6-50）", self)
         self.countSpinBox = SpinBox()
         self.lenLowerBoundSpinBox = CompactSpinBox()
@@ -202,9 +216,12 @@ class ComplexPassGenerator(HeaderCardWidget):
         self.resultLabel = StrongBodyLabel("生成结果", self)
         self.resultBrowser = TextBrowser()
         self.copyButton = PrimaryPushButton(FIF.COPY, "复制")
+        self.saveButton = PushButton(FIF.SAVE, "生成到文件")
         self.strengthLabel = StrongBodyLabel("密码强度", self)
         self.strengthBarLabel = StrongBodyLabel("", self)
         self.strengthBar = ProgressBar(self)
+        self.passwords = []
+        self.task = None
         self.vBoxLayout = QVBoxLayout()
         self.hBoxLayout = QHBoxLayout()
         self.hBoxLayout2 = QHBoxLayout()
@@ -217,6 +234,7 @@ class ComplexPassGenerator(HeaderCardWidget):
         # 信号连接
         self.generateButton.clicked.connect(self.generate_password)
         self.copyButton.clicked.connect(self.copy_password)
+        self.saveButton.clicked.connect(self.generate_to_file)
 
         self.__initWidget()
         self.__initLayout()
@@ -232,7 +250,7 @@ class ComplexPassGenerator(HeaderCardWidget):
         self.excludeSwitchButton.setOffText("禁用")
         self.excludeContainer.addWidget(self.excludeLineEdit)
         self.excludeContainer.addWidget(self.excludeSwitchButton)
-        self.countSpinBox.setRange(1, 20)
+        self.countSpinBox.setRange(1, MAX_COUNT)
         self.countSpinBox.setValue(1)
         self.lenLowerBoundSpinBox.setRange(6, 50)
         self.lenLowerBoundSpinBox.setValue(8)
@@ -278,167 +296,109 @@ class ComplexPassGenerator(HeaderCardWidget):
         self.hBoxLayout7.addWidget(self.strengthBar)
         self.hBoxLayout7.addWidget(self.strengthBarLabel)
         self.hBoxLayout7.addStretch(1)
+        self.hBoxLayout7.addWidget(self.saveButton, 0, Qt.AlignRight)
         self.hBoxLayout7.addWidget(self.copyButton, 0, Qt.AlignRight)
         self.vBoxLayout.addLayout(self.hBoxLayout7)
         
         self.viewLayout.addLayout(self.vBoxLayout)
 
+    def create_generator(self):
+        """根据界面选项创建 PasswordGenerator，选项无效时抛出 ValueError"""
+        exclude = self.excludeLineEdit.text() if self.excludeSwitchButton.isChecked() else ""
+        charset = build_charset(self.charCheckBox1.isChecked(), self.charCheckBox2.isChecked(),
+                                self.charCheckBox3.isChecked(), self.charCheckBox4.isChecked(), exclude)
+        return PasswordGenerator(charset, self.lenLowerBoundSpinBox.value(), self.lenUpperBoundSpinBox.value(),
+                                 self.includeLineEdit.text().split())
+
     def generate_password(self):
-        """高级密码生成器的封装函数"""
-        useABC = self.charCheckBox1.isChecked()
-        useabc = self.charCheckBox2.isChecked()
-        use123 = self.charCheckBox3.isChecked()
-        useSymbols = self.charCheckBox4.isChecked()
-        excludeText = self.excludeLineEdit.text()
-        isWithExclude = self.excludeSwitchButton.isChecked()
-        excludeChars = set(excludeText)
-        generateCount = self.countSpinBox.value()
-        lowerBound = self.lenLowerBoundSpinBox.value()
-        upperBound = self.lenUpperBoundSpinBox.value()
-        includeText = self.includeLineEdit.text().split()
-        try:
-            resultPass = self.__generate_password(useABC, useabc, use123, useSymbols, excludeChars, 
-                                            isWithExclude, generateCount, lowerBound, upperBound, 
-                                            includeText)
-            self.resultBrowser.clear()
-            for i, p in enumerate(resultPass):
-                self.resultBrowser.append(f"{p}")
-            passStrength = self.check_pass_strength(resultPass)
-            if passStrength == 2:
-                self.strengthBar.setValue(100)
-                self.strengthBar.setCustomBarColor("#00FF00", "#00FF00")
-                self.strengthBarLabel.setText("强")
-                self.strengthBarLabel.show()
-            elif passStrength == 1:
-                self.strengthBar.setValue(66)
-                self.strengthBar.setCustomBarColor("#FFA500", "#FFA500")
-                self.strengthBarLabel.setText("中")
-                self.strengthBarLabel.show()
-            elif passStrength == 0:
-                self.strengthBar.setValue(33)
-                self.strengthBar.setCustomBarColor("#FF0000", "#FF0000")
-                self.strengthBarLabel.setText("弱")
-                self.strengthBarLabel.show()
+        """高级密码生成器的封装函数：在后台多进程生成互不相同的密码，完成后显示"""
+        count = self.countSpinBox.value()
+        if count > MAX_IN_MEMORY:
+            self.show_error(f"一次最多生成 {MAX_IN_MEMORY} 个密码，更多的密码请生成到文件")
+            return
+        self.start_task(count, None)
 
-        except ValueError as e:
-            if str(e) == "没有有效字符可供生成密码":
-                w = InfoBar.error(
-                    title="生成失败",
-                    content="没有有效字符可供生成密码",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.mainWindow
-                )
-                w.show()
-            elif str(e) == "密码长度过小，无法包含给定的字符串":
-                w = InfoBar.error(
-                    title="生成失败",
-                    content="密码长度过小，无法包含给定的字符串",
-                    orient=Qt.Vertical,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=2000,
-                    parent=self.mainWindow
-                )
-                w.show()
-        
-    def __generate_password(self, useABC, useabc, use123, useSymbols, excludeChars, 
-                            isWithExclude, generateCount, lowerBound, upperBound, includeText):
-        """高级密码生成器的处理逻辑"""
+    def generate_to_file(self):
+        """按当前选项生成密码并逐批写入文件，每行一个，不在界面中保留"""
+        path, _ = QFileDialog.getSaveFileName(self, "生成到文件", "passwords.txt", "文本文件 (*.txt)")
+        if path:
+            self.start_task(self.countSpinBox.value(), path)
 
-        # 定义字符集，根据用户选择的选项确定使用哪些字符
-        all_chars = []
-        if useABC:
-            all_chars += list(string.ascii_uppercase)
-        if useabc:
-            all_chars += list(string.ascii_lowercase)
-        if use123:
-            all_chars += list(string.digits)
-        if useSymbols:
-            all_chars += ['@', '#', '$', '%', '&', '*', '+', '-', '=']
-        if (isWithExclude):
-            all_chars = [c for c in all_chars if c not in excludeChars]
-        if not all_chars:
-            raise ValueError("没有有效字符可供生成密码")
+    def start_task(self, count, path):
+        try:
+            generator = self.create_generator()
+        except ValueError as e:
+            self.show_error(str(e))
             return
-        
-        if lowerBound > upperBound:
-            lowerBound, upperBound = upperBound, lowerBound
-        
-        # 调整密码长度范围，确保至少包含指定字符串
-        result = []
-        totalLen = sum(len(s) for s in includeText)
-        lowerBound = max(lowerBound - totalLen, 1)
-        upperBound = upperBound - totalLen
-        print(lowerBound, upperBound)
+        # 设置了泄露密码索引时丢弃出现在其中的密码
+        self.task = GeneratorTask(generator, count, path, breach_index=cfg.get(cfg.breachIndex) or None, parent=self)
+        self.set_running(True)
+        self.track_task(self.task)
+        self.task.finished.connect(self.on_generated)
+        self.task.failed.connect(lambda e: self.show_error(str(e)))
+        for signal in (self.task.finished, self.task.failed, self.task.cancelled):
+            signal.connect(lambda *_: self.set_running(False))
+        self.task.start()
 
-        for i in range(generateCount):
-            if upperBound < 1:
-                raise ValueError("密码长度过小，无法包含给定的字符串")
-                return
-            base_length = random.randint(lowerBound, upperBound)
-            random_length = base_length  
+    def set_running(self, running):
+        self.generateButton.setEnabled(not running)
+        self.saveButton.setEnabled(not running)
 
-            # 生成随机字符组成的基本密码
-            password_chars = random.choices(all_chars, k=random_length)
-            generated = "".join(password_chars)
-            
-            # 如果需要包含指定字符串，则为每个字符串分别随机生成一个插入位置，并按降序插入
-            if includeText:
-                insertion_points = []
-                for s in includeText:
-                    pos = random.randint(0, len(generated))
-                    insertion_points.append((pos, s))
-                insertion_points.sort(key=lambda x: x[0], reverse=True)
-                for pos, s in insertion_points:
-                    generated = generated[:pos] + s + generated[pos:]
-            result.append(generated)
-        return result
+    def track_task(self, task):
+        """在右上角显示生成进度，点击关闭按钮可取消"""
+        tooltip = StateToolTip("正在生成密码", "正在准备...", self.mainWindow)
+        tooltip.move(tooltip.getSuitablePos())
+        tooltip.show()
+        tooltip.closedSignal.connect(task.cancel)
 
-    def check_pass_strength(self, passwords):
-        """
-        根据每个密码的长度和包含的字符种类判断密码强度，
-        然后统计所有密码中出现最多的强度类别：
-            2 代表 "强"  -> 长度>=12 且至少包含3种字符类别
-            1 代表 "中"  -> 长度>=8 且至少包含2种字符类别
-            0 代表 "弱"  -> 其他情况
-        如果没有密码，返回 -1
-        """
-        if not passwords:
-            return -1
+        def on_done(text):
+            tooltip.setContent(text)
+            tooltip.setState(True)
 
-        ratings = []
-        for password in passwords:
-            length = len(password)
-            categories = 0
-            if any(c.isupper() for c in password):
-                categories += 1
-            if any(c.islower() for c in password):
-                categories += 1
-            if any(c.isdigit() for c in password):
-                categories += 1
-            if any(c in "@#$%&*+-=" for c in password):
-                categories += 1
+        task.progress.connect(lambda done, total: tooltip.setContent(f"已生成 {done} / {total} 个"))
+        task.finished.connect(lambda _: on_done("已完成"))
+        task.failed.connect(lambda _: on_done("已失败"))
+        task.cancelled.connect(lambda: on_done("已取消"))
 
-            if length >= 12 and categories >= 3:
-                ratings.append(2)
-            elif length >= 8 and categories >= 2:
-                ratings.append(1)
-            else:
-                ratings.append(0)
+    def on_generated(self, result):
+        distribution = self.task.distribution
+        if distribution is not None:
+            # 强度条按平均熵显示，文字显示各强度等级的比例
+            show_strength(self.strengthBar, self.strengthBarLabel, distribution.mean_bits,
+                          f"{distribution.summary()}（平均 {distribution.mean_bits:.0f} 比特）")
+        if self.task.path is not None:
+            w = InfoBar.success(
+                title="生成成功",
+                content=f"已将 {result} 个密码写入 {self.task.path}",
+                orient=Qt.Vertical,
+                isClosable=True,
+                position=InfoBarPosition.BOTTOM_RIGHT,
+                duration=2000,
+                parent=self.mainWindow
+            )
+            w.show()
+            return
+        self.passwords = result
+        preview = self.passwords[:MAX_PREVIEW]
+        if len(self.passwords) > MAX_PREVIEW:
+            preview.append(f"……（共 {len(self.passwords)} 个，只显示前 {MAX_PREVIEW} 个，复制时包含全部密码）")
+        self.resultBrowser.setPlainText("\n".join(preview))
+
+    def show_error(self, message):
+        w = InfoBar.error(
+            title="生成失败",
+            content=message,
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.mainWindow
+        )
+        w.show()
 
-        # 统计哪个评分出现次数最多
-        majority_rating = max(set(ratings), key=ratings.count)
-        return majority_rating
-        
     def copy_password(self):
-        self.resultBrowser.selectAll()
-        self.resultBrowser.copy()
-        cursor = self.resultBrowser.textCursor()
-        cursor.clearSelection()
-        self.resultBrowser.setTextCursor(cursor)
+        # 结果框中可能只显示了一部分，直接复制全部密码
+        QApplication.clipboard().setText("\n".join(self.passwords))
         w = InfoBar.success(
             title = "复制成功",
             content="密码已成功复制到剪贴板",
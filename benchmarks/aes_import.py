@@ -0,0 +1,107 @@
+"""
+对比 AES 备份的几种导入方式，输出吞吐量（条/秒）与峰值内存：
+    legacy     旧版文件，一次性读取、解密并解析
+    streaming  旧版文件，分块解密并增量解析
+    container  新版加密容器，数据块并行解密
+每种方式在独立子进程中运行，峰值内存互不影响。
+
+    python benchmarks/aes_import.py --rows 200000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import Database
+from safekey.database import DatabaseManager
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+from Crypto.Random import get_random_bytes
+
+PASSPHRASE = "benchmark"
+
+
+def legacy_rows(file_path):
+    """旧实现：一次性读取、解密、解码并解析整个文件"""
+    with open(file_path, 'rb') as f:
+        iv = f.read(16)
+        cipherText = f.read()
+    cipher = AES.new(b'Sixteen byte key', AES.MODE_CBC, iv)
+    data = json.loads(unpad(cipher.decrypt(cipherText), AES.block_size).decode('utf-8'))
+    return Database._entries_to_rows(data)
+
+
+def run_import(mode, file_path):
+    db = DatabaseManager(":memory:")
+    # 计时包含读取与解密，旧实现在 bulk_import 之前就已完成这些工作
+    start = time.perf_counter()
+    if mode == "legacy":
+        stats = db.bulk_import(legacy_rows(file_path))
+    else:
+        stats = db.import_passwords(file_path, "aes", PASSPHRASE)
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"]
+    print(json.dumps(stats))
+
+
+def make_backups(legacy_path, container_path, rows):
+    db = DatabaseManager(":memory:")
+    db.bulk_import(
+        (f"site{i}.example.com", f"user{i}", f"P@ss-{i:08d}", "note " * (i % 5))
+        for i in range(rows)
+    )
+    db.export_passwords(container_path, "aes", PASSPHRASE)
+
+    # 旧版格式：IV + 整个 JSON 数组的 CBC 密文
+    plaintext = "".join(Database._iter_json_array(db.iter_passwords())).encode('utf-8')
+    iv = get_random_bytes(AES.block_size)
+    cipher = AES.new(b'Sixteen byte key', AES.MODE_CBC, iv)
+    with open(legacy_path, 'wb') as f:
+        f.write(iv)
+        f.write(cipher.encrypt(pad(plaintext, AES.block_size)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--mode", choices=["make", "legacy", "streaming", "container"])
+    parser.add_argument("--file", nargs="+")
+    args = parser.parse_args()
+
+    if args.mode == "make":
+        make_backups(args.file[0], args.file[1], args.rows)
+        return
+    if args.mode:
+        run_import(args.mode, args.file[0])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.aes")
+        container_path = os.path.join(tmp, "container.aes")
+        # Linux 下子进程会继承父进程的峰值内存，备份文件也在子进程中生成
+        subprocess.run(
+            [sys.executable, __file__, "--mode", "make", "--rows", str(args.rows),
+             "--file", legacy_path, container_path],
+            check=True, capture_output=True
+        )
+        print(f"{'mode':<10} {'rows':>10} {'rows/sec':>12} {'peak RSS (MB)':>14}")
+        for mode in ("legacy", "streaming", "container"):
+            file_path = container_path if mode == "container" else legacy_path
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--file", file_path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            stats = json.loads(out.strip().splitlines()[-1])
+            rss = stats["peak_rss_kb"] / 1024 if stats["peak_rss_kb"] else float("nan")
+            print(f"{mode:<10} {stats['rows']:>10} {stats['rows_per_sec']:>12.0f} {rss:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
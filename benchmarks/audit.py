@@ -0,0 +1,65 @@
+"""
+测量密码健康检查的耗时：
+    full         第一次检查全部记录
+    incremental  修改一条记录的密码后重新检查
+    summary      汇总各类问题的数量
+    page:<问题>  读取存在该问题的第一页记录
+密码库为临时目录中的 --rows 条记录，其中约 1% 重复使用、1% 相似。
+
+    python benchmarks/audit.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from safekey.database import AUDIT_ISSUES, DatabaseManager
+
+
+def build(path, rows):
+    db = DatabaseManager(path)
+
+    def password(i):
+        if i % 100 == 0:
+            return "shared-Password-1"
+        if i % 100 == 1:
+            return f"Summer{i % 7}!"
+        return f"{os.urandom(9).hex()}-{i}"
+
+    db.bulk_import((f"site{i:07d}.example.com", f"user{i}", password(i), "") for i in range(rows))
+    return db
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db = build(os.path.join(workdir, "passwords.db"), args.rows)
+        results = {"full": timed(db.audit_passwords)}
+        record_id = db.get_passwords_page(None, 1)[0][0]
+        db.update_password(record_id, password="changed-Password-2")
+        results["incremental"] = timed(db.audit_passwords)
+        results["summary"] = timed(db.audit_summary)
+        for issue in AUDIT_ISSUES:
+            results[f"page:{issue}"] = timed(db.get_audit_page, issue)
+        db.conn.close()
+
+    print(f"{args.rows} 条记录（ms）")
+    for name, ms in results.items():
+        print(f"{name:<14} {ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
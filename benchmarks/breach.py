@@ -0,0 +1,62 @@
+"""
+测量泄露密码索引的转换和查询耗时：
+    build        将 --entries 条排序好的 SHA-1 语料转换为索引
+    hit          查询索引中存在的密码（每个，µs）
+    miss         查询索引中不存在的密码（每个，µs）
+分别测量不使用和使用布隆过滤器（--bloom-bits）的索引。
+
+    python benchmarks/breach.py --entries 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from safekey.breach import BreachIndex, build_index, password_digest
+
+LOOKUPS = 20000
+
+
+def write_corpus(path, entries):
+    digests = sorted(password_digest(f"leaked-{i}").hex().upper() for i in range(entries))
+    with open(path, 'w', encoding='ascii') as f:
+        f.writelines(f"{d}:{i % 100 + 1}\n" for i, d in enumerate(digests))
+
+
+def per_lookup(index, passwords):
+    start = time.perf_counter()
+    for password in passwords:
+        password in index
+    return (time.perf_counter() - start) * 1e6 / len(passwords)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--bloom-bits", type=int, default=16)
+    args = parser.parse_args()
+
+    hits = [f"leaked-{i}" for i in range(0, args.entries, max(1, args.entries // LOOKUPS))]
+    misses = [f"fresh-{i}" for i in range(LOOKUPS)]
+    print(f"{args.entries} 条哈希")
+    print(f"{'':<14} {'build (s)':>10} {'hit (µs)':>10} {'miss (µs)':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = os.path.join(workdir, "corpus.txt")
+        write_corpus(corpus, args.entries)
+        for bloom_bits in (0, args.bloom_bits):
+            target = os.path.join(workdir, f"index-{bloom_bits}.skbi")
+            start = time.perf_counter()
+            build_index(corpus, target, bloom_bits=bloom_bits)
+            build = time.perf_counter() - start
+            with BreachIndex(target) as index:
+                hit, miss = per_lookup(index, hits), per_lookup(index, misses)
+            name = f"bloom {bloom_bits}" if bloom_bits else "no bloom"
+            print(f"{name:<14} {build:>10.2f} {hit:>10.2f} {miss:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
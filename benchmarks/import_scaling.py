@@ -0,0 +1,65 @@
+"""
+验证导入去重的开销随规模线性增长：
+对每个规模 n，先向空库导入 n 条记录，再导入 n 条其中一半与库中重复的记录（覆盖模式），
+记录第二次导入的耗时，以及库中已有 n 条记录时单条 add_password 的平均耗时。
+去重走 dedup_key 上的唯一索引，条/秒 与单条耗时应基本不随 n 变化。
+
+    python benchmarks/import_scaling.py --sizes 25000 50000 100000 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from safekey.database import DatabaseManager
+
+
+def make_rows(start, count):
+    return (
+        (f"site{i}.example.com", f"user{i}", f"P@ss-{i:08d}", "note")
+        for i in range(start, start + count)
+    )
+
+
+def run(size, adds):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        db.bulk_import(make_rows(0, size))
+        # 一半与库中记录重复，一半为新记录
+        stats = db.bulk_import(make_rows(size // 2, size), override=True)
+
+        start = time.perf_counter()
+        for i in range(adds):
+            db.add_password(f"add{i}.example.com", "user", f"P@ss-{i}", override=True)
+        add_us = (time.perf_counter() - start) / adds * 1e6
+        db.conn.close()
+        db.conn = None
+    return stats, add_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25000, 50000, 100000, 200000])
+    parser.add_argument("--adds", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'inserted':>10} {'seconds':>9} {'rows/sec':>10} {'add (us)':>10}")
+    results = []
+    for size in args.sizes:
+        stats, add_us = run(size, args.adds)
+        results.append(stats)
+        print(f"{size:>10} {stats['inserted']:>10} {stats['seconds']:>9.2f} "
+              f"{stats['rows_per_sec']:>10.0f} {add_us:>10.1f}")
+
+    first, last = results[0], results[-1]
+    ratio = (last["seconds"] / first["seconds"]) / (last["rows"] / first["rows"])
+    print(f"规模扩大 {last['rows'] / first['rows']:.0f} 倍，单条耗时变为 {ratio:.2f} 倍（线性增长时约为 1）")
+
+
+if __name__ == "__main__":
+    main()
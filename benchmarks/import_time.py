@@ -0,0 +1,65 @@
+"""
+检查数据层和命令行的导入开销：在新的解释器中用 -X importtime 导入模块，
+任何 PyQt5 / qfluentwidgets / config 模块被导入，或累计耗时超过预算时以非零状态退出。
+每个模块测量多次取最小值，减少磁盘缓存和系统负载的影响。测量前先编译字节码缓存，
+设置了 PYTHONDONTWRITEBYTECODE 时也只计入导入本身，不计入编译源码的时间。
+
+    python benchmarks/import_time.py --budget-ms 60
+"""
+import argparse
+import compileall
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["safekey.database", "safekey.cli"]
+# 无界面路径中不允许出现的模块
+FORBIDDEN = ("PyQt5", "qfluentwidgets", "config")
+
+
+def measure(module):
+    """返回 (累计导入耗时 ms, 导入的全部模块名)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    total_us = 0
+    imported = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue  # 表头
+        imported.append(name)
+        if name == module:
+            total_us = int(cumulative)
+    return total_us / 1000, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=60.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    compileall.compile_dir(os.path.join(ROOT, "safekey"), quiet=1)
+    failed = False
+    print(f"{'module':<20} {'ms':>8} {'budget':>8}")
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.repeat)]
+        best = min(ms for ms, _ in runs)
+        leaked = sorted({name for name in runs[0][1] if name.split(".")[0] in FORBIDDEN})
+        status = "ok" if best <= args.budget_ms and not leaked else "FAIL"
+        print(f"{module:<20} {best:>8.1f} {args.budget_ms:>8.1f}  {status}")
+        if leaked:
+            print(f"  导入了界面模块: {', '.join(leaked)}")
+        failed = failed or status == "FAIL"
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+比较不同存储参数下大型密码库的读写延迟（毫秒，p50 / p95）：
+    default  SQLite 默认参数：DELETE 日志、synchronous=FULL、不使用内存映射、约 2MB 页缓存
+    tuned    SafeKey 默认参数：WAL、synchronous=NORMAL、256MB 内存映射、64MB 页缓存、临时数据在内存中
+每种参数使用同一份密码库的副本，操作序列相同。
+
+    python benchmarks/pragma_latency.py --rows 500000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from safekey.database import DatabaseManager
+from safekey.migrations import DEFAULT_PROFILE
+
+PROFILES = {
+    "default": {"journal_mode": "DELETE", "synchronous": "FULL", "mmap_size_mb": 0,
+                "cache_size_mb": 2, "temp_store": "DEFAULT"},
+    "tuned": DEFAULT_PROFILE,
+}
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.95)] * 1000
+
+
+def timed(operation, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        operation(*args)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def build(file_path, rows):
+    db = DatabaseManager(file_path, profile=PROFILES["tuned"])
+    db.bulk_import(
+        (f"site{i:07d}.example.com", f"user{i}", f"P@ss-{i:08d}", f"note {i}")
+        for i in range(rows)
+    )
+    db.conn.execute("PRAGMA journal_mode = DELETE")
+    db.conn.close()
+    db.conn = None
+
+
+def run(file_path, profile, rows, ops, seed):
+    rng = random.Random(seed)
+    db = DatabaseManager(file_path, profile=profile)
+    ids = [rng.randrange(1, rows + 1) for _ in range(ops)]
+    after = [(f"site{i:07d}.example.com", i) for i in ids]
+    keywords = [f"{i:07d}"[:5] for i in ids]
+    results = {
+        "page": timed(db.get_passwords_page, [(a,) for a in after]),
+        "search": timed(db.search_passwords, [(k, ("website",)) for k in keywords]),
+        "add": timed(db.add_password, [(f"new{i}.example.com", "user", f"pw{i}") for i in range(ops)]),
+        "update": timed(lambda i: db.update_password(i, notes=f"updated {i}"), [(i,) for i in ids]),
+    }
+    start = time.perf_counter()
+    db.bulk_import((f"bulk{i}.example.com", "user", f"pw{i}", "") for i in range(ops * 20))
+    results["import"] = (time.perf_counter() - start) * 1000, None
+    db.conn.close()
+    db.conn = None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "base.db")
+        build(base, args.rows)
+        print(f"{args.rows} 条记录，每项操作 {args.ops} 次，导入 {args.ops * 20} 条（ms）")
+        print(f"{'profile':<8} {'operation':<8} {'p50':>9} {'p95':>9}")
+        for name, profile in PROFILES.items():
+            copy = os.path.join(tmp, f"{name}.db")
+            shutil.copyfile(base, copy)
+            results = run(copy, profile, args.rows, args.ops, args.seed)
+            for operation, (p50, p95) in results.items():
+                p95 = "" if p95 is None else f"{p95:.3f}"
+                print(f"{name:<8} {operation:<8} {p50:>9.3f} {p95:>9}")
+
+
+if __name__ == "__main__":
+    main()
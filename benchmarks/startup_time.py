@@ -0,0 +1,103 @@
+"""
+测量 SafeKey 的启动耗时（毫秒）：
+    first_paint   第一次绘制（启动画面）
+    interactive   主页第一屏数据显示、启动画面关闭（MainWindow.ready）
+每次在新的进程中启动，从子进程开始导入 PyQt5 计时，不含解释器本身的启动。
+密码库为临时目录中的 --rows 条记录，默认使用 offscreen 平台，不需要显示器。
+
+    python benchmarks/startup_time.py --rows 100000 --runs 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child():
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from PyQt5.QtCore import QObject, QEvent, QTimer
+    from PyQt5.QtWidgets import QApplication
+    import SafeKey
+
+    marks = {"import": time.perf_counter() - start}
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, e):
+            if e.type() == QEvent.Paint and "first_paint" not in marks:
+                marks["first_paint"] = time.perf_counter() - start
+            return False
+
+    app = QApplication(sys.argv[:1])
+    watcher = PaintWatcher()
+    app.installEventFilter(watcher)
+
+    def on_ready():
+        marks["interactive"] = time.perf_counter() - start
+        QTimer.singleShot(0, app.quit)
+
+    window = SafeKey.MainWindow()
+    window.ready.connect(on_ready)
+    window.show()
+    # 防止加载失败时一直等待
+    QTimer.singleShot(60000, app.quit)
+    app.exec_()
+    print(json.dumps({name: seconds * 1000 for name, seconds in marks.items()}))
+
+
+def build(workdir, rows):
+    sys.path.insert(0, ROOT)
+    from safekey.database import DatabaseManager
+
+    shutil.copytree(os.path.join(ROOT, "config"), os.path.join(workdir, "config"))
+    shutil.copytree(os.path.join(ROOT, "resource"), os.path.join(workdir, "resource"))
+    db = DatabaseManager(os.path.join(workdir, "passwords.db"))
+    db.bulk_import(
+        (f"site{i:07d}.example.com", f"user{i}", f"P@ss-{i:08d}", f"note {i}")
+        for i in range(rows)
+    )
+    db.conn.close()
+    db.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--visible", action="store_true", help="使用真实的窗口系统而不是 offscreen")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    env = dict(os.environ)
+    if not args.visible:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        build(workdir, args.rows)
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child"],
+                cwd=workdir, env=env, capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.rows} 条记录，启动 {args.runs} 次（ms）")
+    print(f"{'stage':<12} {'median':>9} {'min':>9}")
+    for stage in ("import", "first_paint", "interactive"):
+        samples = [r[stage] for r in results if stage in r]
+        if samples:
+            print(f"{stage:<12} {statistics.median(samples):>9.1f} {min(samples):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+存储、导入导出和密码生成热点路径的基准测试，不依赖图形界面，可以在没有显示器的环境中运行。
+对每个规模（--sizes，默认 1000 100000 1000000 条记录）生成一个合成密码库，测量：
+    add_password            添加新记录（override=False）
+    add_password_override   重新添加已有记录并修改备注（override=True）
+    search_passwords        全文索引搜索和短关键词的 LIKE 回退
+    get_all_passwords       读取全部记录
+    query_page:<列>[_desc]  query_passwords 从 90% 处按键集读取一页，按各列升序和降序排序
+    export:<格式>           导出为 csv、json、ndjson、aes
+    import:<格式>           将上述文件导入空库
+与规模无关的用例只测量一次：
+    generate                PasswordGenerator 批量生成密码（原高级密码生成器的 __generate_password）
+    entropy                 强度估计（原 check_pass_strength）
+每个用例重复 --repeat 次取最小值，单位为毫秒；单次操作的用例为每次操作的平均耗时。
+结果以 JSON 输出，给出 --baseline 时逐项比较，慢于基线超过 --threshold 的用例视为退化，退出码为 1。
+
+    python benchmarks/suite.py --sizes 1000 100000 --output benchmarks/baseline.json
+    python benchmarks/suite.py --sizes 1000 100000 --baseline benchmarks/baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from safekey.database import EXPORT_FORMATS, PAGE_SIZE, SORT_COLUMNS, DatabaseManager, page_key
+from safekey.generator import PasswordGenerator, build_charset
+from safekey.strength import entropy
+
+PASSPHRASE = "benchmark"
+# 单次操作的用例每轮执行的次数
+ADD_OPS = 200
+SEARCH_OPS = 20
+PAGE_OPS = 50
+# 与规模无关的用例处理的密码数
+GENERATE_COUNT = 100000
+ENTROPY_COUNT = 20000
+# 比较基线时忽略绝对差值小于这个毫秒数的用例，避免极短的用例因计时抖动被误判
+NOISE_FLOOR_MS = 0.05
+DOMAINS = ("example.com", "mail.example.org", "shop.example.net", "bank.example.cn", "forum.example.io")
+WORDS = ("river", "sun", "moon", "tree", "cloud", "happy", "music", "panda", "coffee", "beach")
+
+
+def synthetic_rows(count, seed=0, offset=0):
+    """确定性的合成记录：网站和用户名有一定重复，密码混合随机字符串和易记密码"""
+    rng = random.Random(seed)
+    alphabet = build_charset()
+    for i in range(offset, offset + count):
+        if i % 10 == 0:
+            password = rng.choice(WORDS) + rng.choice(WORDS) + str(rng.randrange(100))
+        else:
+            password = "".join(rng.choices(alphabet, k=rng.randrange(10, 21)))
+        notes = f"note {i}" if i % 3 == 0 else ""
+        yield f"site{i % 50000:05d}.{rng.choice(DOMAINS)}", f"user{i}", password, notes
+
+
+def best_of(repeat, run, ops=1):
+    """执行 repeat 轮 run(轮次)，返回最快一轮中每次操作的毫秒数"""
+    best = None
+    for r in range(repeat):
+        start = time.perf_counter()
+        run(r)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000 / ops
+
+
+def bench_vault(workdir, size, repeat, results):
+    prefix = f"{size}/"
+    path = os.path.join(workdir, f"vault-{size}.db")
+    db = DatabaseManager(path)
+    start = time.perf_counter()
+    db.bulk_import(synthetic_rows(size))
+    results[prefix + "build"] = (time.perf_counter() - start) * 1000
+
+    def add(r):
+        rows = list(synthetic_rows(ADD_OPS, seed=r + 1, offset=size + r * ADD_OPS))
+        for website, username, password, notes in rows:
+            db.add_password(website, username, password, notes, override=False)
+
+    existing = list(synthetic_rows(ADD_OPS))
+
+    def add_override(r):
+        for website, username, password, notes in existing:
+            db.add_password(website, username, password, f"{notes} #{r}", override=True)
+
+    def search(_):
+        for i in range(SEARCH_OPS):
+            db.search_passwords(f"site{i * 997 % 50000:05d}", ("website", "username", "notes"))
+
+    def search_short(_):
+        for i in range(SEARCH_OPS):
+            db.search_passwords(f"u{i}", ("website", "username"))
+
+    results[prefix + "add_password"] = best_of(repeat, add, ADD_OPS)
+    results[prefix + "add_password_override"] = best_of(repeat, add_override, ADD_OPS)
+    results[prefix + "search_passwords"] = best_of(repeat, search, SEARCH_OPS)
+    results[prefix + "search_passwords_short"] = best_of(repeat, search_short, SEARCH_OPS)
+    results[prefix + "get_all_passwords"] = best_of(repeat, lambda _: db.get_all_passwords())
+
+    # 键集分页的耗时应与位置和规模无关：从靠近末尾的记录之后读取一页
+    deep = db.query_passwords("id", after=(size * 9 // 10,) * 2, limit=1)[0]
+    for sort in SORT_COLUMNS:
+        for descending in (False, True):
+            after = page_key(deep, sort)
+            name = f"query_page:{sort}" + ("_desc" if descending else "")
+            results[prefix + name] = best_of(
+                repeat, lambda _: [db.query_passwords(sort, descending, after, PAGE_SIZE) for _ in range(PAGE_OPS)],
+                PAGE_OPS)
+
+    for fmt in EXPORT_FORMATS:
+        target = os.path.join(workdir, f"export-{size}.{fmt}")
+        passphrase = PASSPHRASE if fmt == "aes" else None
+        results[prefix + f"export:{fmt}"] = best_of(
+            repeat, lambda _: db.export_passwords(target, fmt, passphrase))
+
+        def import_(r):
+            fresh = DatabaseManager(os.path.join(workdir, f"import-{size}-{fmt}-{r}.db"))
+            fresh.import_passwords(target, fmt, passphrase, override=True)
+            fresh.conn.close()
+
+        results[prefix + f"import:{fmt}"] = best_of(repeat, import_)
+        os.remove(target)
+        for r in range(repeat):
+            os.remove(os.path.join(workdir, f"import-{size}-{fmt}-{r}.db"))
+    db.conn.close()
+
+
+def bench_generator(repeat, results):
+    generator = PasswordGenerator(build_charset(exclude="il1I0oO"), 12, 16)
+    results["generate"] = best_of(repeat, lambda _: generator.generate(GENERATE_COUNT))
+    passwords = [row[2] for row in synthetic_rows(ENTROPY_COUNT)]
+    results["entropy"] = best_of(repeat, lambda _: [entropy(p) for p in passwords])
+
+
+def compare(results, baseline, threshold):
+    """返回退化的用例列表，每项为 (用例, 基线毫秒, 当前毫秒, 比例)"""
+    regressions = []
+    for name, ms in results.items():
+        base = baseline.get(name)
+        if base is None or ms - base < NOISE_FLOOR_MS:
+            continue
+        if ms > base * (1 + threshold):
+            regressions.append((name, base, ms, ms / base))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", "-o", help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="与之比较的基线 JSON 文件（之前 --output 的结果）")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的变慢比例，默认 0.25 即 25%%")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        # 预热：延迟导入的模块、AES 会话密钥的派生（之后被缓存）等一次性开销不计入第一个规模
+        bench_vault(workdir, 100, 1, {})
+        for size in args.sizes:
+            print(f"测量 {size} 条记录...", file=sys.stderr)
+            bench_vault(workdir, size, args.repeat, results)
+    bench_generator(args.repeat, results)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results_ms": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if not args.baseline:
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("platform") != report["meta"]["platform"]:
+        print("警告：基线来自不同的平台，结果可能不可比", file=sys.stderr)
+    regressions = compare(results, baseline["results_ms"], args.threshold)
+    for name, base, ms, ratio in regressions:
+        print(f"退化 {name}: {base:.3f} ms -> {ms:.3f} ms（{ratio:.2f} 倍）", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+    print(f"与基线相比没有超过 {args.threshold:.0%} 的退化", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
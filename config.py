@@ -1,16 +1,71 @@
 # coding:utf-8
 from enum import Enum
-from qfluentwidgets import QConfig, OptionsConfigItem, OptionsValidator, qconfig, ConfigItem, FolderValidator
+from qfluentwidgets import (QConfig, OptionsConfigItem, OptionsValidator, qconfig, ConfigItem, FolderValidator,
+                            RangeConfigItem, RangeValidator, BoolValidator)
 import os
+from safekey.settings import Settings
 
 class MyConfig(QConfig):
     """应用程序的配置类"""
     exportDir = ConfigItem("MainWindow", "ExportDir", "",validator = FolderValidator(),restart = False)
     importSetting = OptionsConfigItem("MainWindow", "ImportSetting", "Override", OptionsValidator(["Override", "Skip"]),restart = False)
+    searchScope = OptionsConfigItem("MainWindow", "SearchScope", "Website", OptionsValidator(["Website", "All"]),restart = False)
+    keyCacheTimeout = RangeConfigItem("Security", "KeyCacheTimeout", 300, RangeValidator(0, 3600), restart = False)
+    kdfLog2N = RangeConfigItem("Security", "KdfLog2N", 15, RangeValidator(14, 22), restart = False)
+    breachIndex = ConfigItem("Security", "BreachIndex", "", restart = False)
+    # 数据库存储参数，在打开连接时应用
+    journalMode = OptionsConfigItem("Database", "JournalMode", "WAL", OptionsValidator(["WAL", "DELETE"]), restart = True)
+    synchronous = OptionsConfigItem("Database", "Synchronous", "NORMAL", OptionsValidator(["NORMAL", "FULL"]), restart = True)
+    mmapSizeMB = RangeConfigItem("Database", "MmapSizeMB", 256, RangeValidator(0, 2048), restart = True)
+    cacheSizeMB = RangeConfigItem("Database", "CacheSizeMB", 64, RangeValidator(2, 1024), restart = True)
+    tempStore = OptionsConfigItem("Database", "TempStore", "MEMORY", OptionsValidator(["MEMORY", "FILE", "DEFAULT"]), restart = True)
+    # 性能分析，启用时记录数据库、表格、加密和密码生成的耗时
+    profiling = ConfigItem("Diagnostics", "Profiling", False, BoolValidator(), restart = False)
+    # 慢查询日志，超过阈值（毫秒，0 表示不记录）的语句连同查询计划写入日志文件
+    slowQueryMs = RangeConfigItem("Diagnostics", "SlowQueryMs", 100, RangeValidator(0, 5000), restart = False)
+    slowQueryLog = ConfigItem("Diagnostics", "SlowQueryLog", "config/slow_queries.log", restart = True)
 
 cfg = MyConfig()
 qconfig.load('config/config.json', cfg)
 
 if not cfg.get(cfg.exportDir):
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    cfg.set(cfg.exportDir, project_root)
\ No newline at end of file
+    cfg.set(cfg.exportDir, project_root)
+
+
+class ConfigSettings(Settings):
+    """将数据层设置转发到界面配置，设置页中的修改立即生效"""
+
+    @property
+    def import_override(self):
+        return cfg.get(cfg.importSetting) != "Skip"
+
+    @property
+    def export_dir(self):
+        return cfg.get(cfg.exportDir)
+
+    @property
+    def kdf_log2n(self):
+        return cfg.get(cfg.kdfLog2N)
+
+    @property
+    def breach_index(self):
+        return cfg.get(cfg.breachIndex)
+
+    @property
+    def slow_query_ms(self):
+        return cfg.get(cfg.slowQueryMs)
+
+    @property
+    def slow_query_log(self):
+        return cfg.get(cfg.slowQueryLog)
+
+    @property
+    def profile(self):
+        return {
+            "journal_mode": cfg.get(cfg.journalMode),
+            "synchronous": cfg.get(cfg.synchronous),
+            "mmap_size_mb": cfg.get(cfg.mmapSizeMB),
+            "cache_size_mb": cfg.get(cfg.cacheSizeMB),
+            "temp_store": cfg.get(cfg.tempStore),
+        }
@@ -0,0 +1,15 @@
+"""
+SafeKey 的数据层与命令行工具，只依赖标准库和 pycryptodome，不导入 PyQt5 / qfluentwidgets：
+    database         DatabaseManager，密码库的存储、搜索、导入和导出
+    settings         注入数据层的设置和消息钩子
+    migrations       数据库结构迁移与存储参数
+    fieldcrypto      字段级加密
+    keymanager       会话密钥缓存
+    backupcontainer  分块加密备份格式
+    generator        批量密码生成，可多进程并行
+    strength         密码强度（熵）估计和批量评分
+    breach           离线的泄露密码索引（内存映射）
+    profiling        性能分析：计时区间、耗时直方图和 Chrome 跟踪导出
+    querylog         慢查询日志和查询计划捕获
+    cli              命令行入口：python -m safekey --help
+"""
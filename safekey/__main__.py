@@ -0,0 +1,5 @@
+import sys
+
+from safekey.cli import main
+
+sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+SafeKey 加密备份容器（.aes，第 3 版）。
+
+文件结构：
+    文件头    MAGIC | 版本 | KDF 参数 | 盐 | 每块记录数 | 文件 ID(16)
+    数据块    nonce(12) | 密文长度(4) | 密文 | tag(16)，明文为若干行 NDJSON 记录
+    索引块    结构同数据块，明文为每个数据块的 (偏移, 长度, 起始记录号, 记录数)
+    文件尾    索引偏移(8) | 索引长度(4) | INDEX_MAGIC
+
+密钥由口令经 scrypt 派生。每个块使用 AES-GCM 单独加密认证，附加数据包含整个文件头和块序号，
+因此块不能被替换、重排或截断。同一会话的多个备份使用相同的盐和密钥（见 KeyManager.session_salt），
+每个文件随机生成的文件 ID 使各文件的附加数据互不相同，块也不能在这些备份之间互换。
+借助索引可以并行解密，也可以只解密包含所需记录的块。第 2 版文件（没有文件 ID）仍可读取。
+"""
+import hashlib
+import json
+import os
+import struct
+from bisect import bisect_right
+from .profiling import profiler
+
+MAGIC = b"SKBK"
+INDEX_MAGIC = b"SKIX"
+VERSION = 3
+KDF_SCRYPT = 1
+
+# 默认 KDF 参数：n = 2 ** 15, r = 8, p = 1（约 32MB 内存）
+DEFAULT_KDF_PARAMS = {"log2_n": 15, "r": 8, "p": 1}
+# 每个数据块包含的记录数
+DEFAULT_CHUNK_RECORDS = 1000
+
+# 第 2 版的文件头，第 3 版在其后追加文件 ID
+_HEADER_V2 = struct.Struct("<4sHBBBBB16sI")
+_FILE_ID_SIZE = 16
+_CHUNK_HEAD = struct.Struct("<12sI")
+_INDEX_ENTRY = struct.Struct("<QIQI")
+_FOOTER = struct.Struct("<QI4s")
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+_INDEX_SEQ = 0xFFFFFFFFFFFFFFFF
+
+
+class BackupError(ValueError):
+    """备份文件无法读取：格式错误、口令错误或内容被篡改"""
+
+
+def is_container(file_path):
+    """判断文件是否为新版加密备份容器"""
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def derive_key(passphrase, salt, log2_n, r, p):
+    """使用 scrypt 从口令派生 256 位密钥"""
+    n = 1 << log2_n
+    return hashlib.scrypt(
+        passphrase.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * r * n + (1 << 20), dklen=32
+    )
+
+
+def _chunk_aad(header, seq):
+    return header + struct.pack("<Q", seq)
+
+
+def _seal(key, header, seq, plaintext):
+    # pycryptodome 导入较慢，用到时才导入，使不涉及加密的命令行操作启动更快
+    from Crypto.Cipher import AES
+    nonce = os.urandom(_NONCE_SIZE)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(_chunk_aad(header, seq))
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+    return _CHUNK_HEAD.pack(nonce, len(ciphertext)) + ciphertext + tag
+
+
+def _open(key, header, seq, blob):
+    from Crypto.Cipher import AES
+    nonce, length = _CHUNK_HEAD.unpack_from(blob)
+    body = blob[_CHUNK_HEAD.size:]
+    if len(body) != length + _TAG_SIZE:
+        raise BackupError("备份文件已损坏")
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(_chunk_aad(header, seq))
+    try:
+        return cipher.decrypt_and_verify(body[:length], body[length:])
+    except ValueError:
+        raise BackupError("口令错误或备份文件已损坏") from None
+
+
+class BackupWriter:
+    """逐块写入加密备份，内存中最多保留一个数据块"""
+
+    def __init__(self, f, passphrase, kdf_params=None, chunk_records=DEFAULT_CHUNK_RECORDS, salt=None, key=None):
+        params = dict(DEFAULT_KDF_PARAMS, **(kdf_params or {}))
+        salt = salt or os.urandom(16)
+        self.f = f
+        self.chunk_records = chunk_records
+        self.header = _HEADER_V2.pack(MAGIC, VERSION, KDF_SCRYPT, params["log2_n"], params["r"], params["p"],
+                                      len(salt), salt, chunk_records) + os.urandom(_FILE_ID_SIZE)
+        # 复制一份密钥，缓存中的密钥在操作期间被超时清除也不受影响
+        self.key = bytes(key) if key is not None else derive_key(passphrase, salt, params["log2_n"], params["r"], params["p"])
+        self.offset = 0
+        self.records = 0
+        self.index = []
+        self.pending = []
+        self._write(self.header)
+
+    def _write(self, data):
+        self.f.write(data)
+        self.offset += len(data)
+
+    def add(self, entry):
+        self.pending.append(json.dumps(entry))
+        if len(self.pending) >= self.chunk_records:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        plaintext = ("\n".join(self.pending) + "\n").encode('utf-8')
+        blob = _seal(self.key, self.header, len(self.index), plaintext)
+        self.index.append((self.offset, len(blob), self.records, len(self.pending)))
+        self.records += len(self.pending)
+        self.pending = []
+        self._write(blob)
+
+    def close(self):
+        """写入剩余记录、索引和文件尾"""
+        self._flush()
+        index_plain = struct.pack("<I", len(self.index)) + b"".join(_INDEX_ENTRY.pack(*e) for e in self.index)
+        blob = _seal(self.key, self.header, _INDEX_SEQ, index_plain)
+        index_offset = self.offset
+        self._write(blob)
+        self._write(_FOOTER.pack(index_offset, len(blob), INDEX_MAGIC))
+
+
+class BackupReader:
+    """读取加密备份：校验文件头和索引，按需解密数据块"""
+
+    def __init__(self, file_path, passphrase=None, key=None, key_manager=None):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            self.header = f.read(_HEADER_V2.size)
+            if len(self.header) != _HEADER_V2.size:
+                raise BackupError("备份文件已损坏")
+            (magic, version, kdf, log2_n, r, p, salt_len, salt,
+             self.chunk_records) = _HEADER_V2.unpack(self.header)
+            if magic != MAGIC:
+                raise BackupError("不是 SafeKey 加密备份文件")
+            if version not in (2, VERSION) or kdf != KDF_SCRYPT:
+                raise BackupError(f"不支持的备份版本: {version}")
+            if version == VERSION:
+                file_id = f.read(_FILE_ID_SIZE)
+                if len(file_id) != _FILE_ID_SIZE:
+                    raise BackupError("备份文件已损坏")
+                self.header += file_id
+            self.salt = salt[:salt_len]
+            self.kdf_params = {"log2_n": log2_n, "r": r, "p": p}
+            if key is None and key_manager is not None:
+                key = key_manager.derive(passphrase, self.salt, self.kdf_params).key
+            self.key = bytes(key) if key is not None else derive_key(passphrase, self.salt, log2_n, r, p)
+
+            f.seek(-_FOOTER.size, os.SEEK_END)
+            index_offset, index_len, index_magic = _FOOTER.unpack(f.read(_FOOTER.size))
+            if index_magic != INDEX_MAGIC:
+                raise BackupError("备份文件不完整")
+            f.seek(index_offset)
+            index_plain = _open(self.key, self.header, _INDEX_SEQ, f.read(index_len))
+
+        count = struct.unpack_from("<I", index_plain)[0]
+        self.index = [
+            _INDEX_ENTRY.unpack_from(index_plain, 4 + i * _INDEX_ENTRY.size) for i in range(count)
+        ]
+        self._starts = [entry[2] for entry in self.index]
+        self.record_count = self.index[-1][2] + self.index[-1][3] if self.index else 0
+
+    def _read_chunk(self, seq):
+        offset, length, _, _ = self.index[seq]
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            blob = f.read(length)
+        return [json.loads(line) for line in _open(self.key, self.header, seq, blob).splitlines()]
+
+    def iter_entries(self, workers=None):
+        """按顺序产出全部记录，数据块在线程池中并行解密，同时只保留有限个块在内存中"""
+        from concurrent.futures import ThreadPoolExecutor
+        workers = workers or min(4, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            window = []
+            for seq in range(len(self.index)):
+                window.append(executor.submit(self._read_chunk, seq))
+                if len(window) >= workers * 2:
+                    yield from window.pop(0).result()
+            for future in window:
+                yield from future.result()
+
+    def read_records(self, start, count):
+        """只解密包含第 start 到 start+count-1 条记录的数据块"""
+        end = min(start + count, self.record_count)
+        if start >= end:
+            return []
+        result = []
+        seq = bisect_right(self._starts, start) - 1
+        while seq < len(self.index) and self.index[seq][2] < end:
+            first = self.index[seq][2]
+            entries = self._read_chunk(seq)
+            result.extend(entries[max(start - first, 0):end - first])
+            seq += 1
+        return result
+
+
+# 每个数据块的加密和解密
+profiler.register(BackupWriter, "backup", ("_flush",))
+profiler.register(BackupReader, "backup", ("_read_chunk",))
@@ -0,0 +1,260 @@
+"""
+离线的泄露密码检查，不访问网络。
+build_index() 将按哈希排序的 HIBP 格式语料（SHA-1 或 NTLM，每行 HASH:COUNT；或一个目录的范围文件，
+文件名为哈希的前 5 位，每行为其余部分:COUNT）转换为紧凑的二进制索引，BreachIndex 以内存映射方式打开索引并二分查找。
+索引只保存哈希的前 KEY_BYTES 字节：前 prefix_bytes 字节决定所在的桶（桶的起止位置保存在偏移表中），
+桶内按剩余字节排序。数十亿条记录时误判为泄露的概率约为 条数 / 2^64，可以忽略。
+可选的布隆过滤器放在索引末尾，采用分块结构：每个哈希只在一个 64 位的块中置位，
+大多数未泄露的密码只需读取 8 个字节即可排除，不会访问索引的其他部分。
+
+文件结构：头部（HEADER_SIZE 字节）| 偏移表（2^(8*prefix_bytes) + 1 个 uint64）| 条目 | 布隆过滤器
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"SKBREACH"
+FORMAT_VERSION = 1
+# 索引文件的扩展名
+INDEX_SUFFIX = ".skbi"
+ALGORITHMS = ("sha1", "ntlm")
+# 各算法十六进制哈希的长度
+HEX_LENGTHS = {"sha1": 40, "ntlm": 32}
+# 每条记录保存的哈希字节数
+KEY_BYTES = 8
+# 转换语料时读取的哈希字节数：前 KEY_BYTES 字节为索引的键，之后的字节用于布隆过滤器的块内位置
+DIGEST_BYTES = 16
+# 头部：魔数、版本、算法、前缀字节数、布隆过滤器每个哈希置位的个数、条目数、布隆过滤器的位置和块数
+_HEADER = struct.Struct("<8sHBBB3xQQQ")
+HEADER_SIZE = 64
+# 转换语料时每次读取的行数
+READ_LINES = 1 << 16
+# 布隆过滤器中每个哈希在块内置位的个数
+BLOOM_HASHES = 6
+# 12 位的值对应块内 2 个位置的掩码，三次查表得到 6 个位置
+_PAIR_MASKS = [(1 << (i & 63)) | (1 << (i >> 6)) for i in range(1 << 12)]
+
+
+def password_digest(password, algorithm="sha1"):
+    """与 HIBP 语料相同的哈希：SHA-1(UTF-8) 或 NTLM（MD4(UTF-16LE)）"""
+    if algorithm == "sha1":
+        return hashlib.sha1(password.encode('utf-8')).digest()
+    if algorithm == "ntlm":
+        data = password.encode('utf-16-le')
+        try:
+            return hashlib.new("md4", data).digest()
+        except ValueError:
+            # OpenSSL 3 默认不提供 MD4
+            from Crypto.Hash import MD4
+            return MD4.new(data).digest()
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+
+def _prefix_bytes(count):
+    """按条目数选择桶的前缀字节数，每个桶平均不超过几十条"""
+    if count < 1 << 12:
+        return 1
+    if count < 1 << 20:
+        return 2
+    return 3
+
+
+def _bloom_slot(digest, blocks):
+    """
+    返回 (块序号, 块内掩码)。哈希本身是均匀分布的：块由前 8 字节决定，块内的位置由之后 5 字节中的 36 位决定。
+    BreachIndex.contains_digest 中内联了相同的计算。
+    """
+    h = int.from_bytes(digest[:KEY_BYTES + 5], "big")
+    return (h >> 40) % blocks, _PAIR_MASKS[h & 4095] | _PAIR_MASKS[h >> 12 & 4095] | _PAIR_MASKS[h >> 24 & 4095]
+
+
+def _iter_corpus(source):
+    """
+    逐批产出语料中 HASH:COUNT 格式的行。source 为单个文件，或范围文件所在的目录，
+    范围文件中的行补上文件名中的哈希前缀。
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            prefix = os.path.splitext(name)[0].upper()
+            if not all(c in "0123456789ABCDEF" for c in prefix):
+                continue
+            with open(os.path.join(source, name), 'r', encoding='ascii') as f:
+                while True:
+                    lines = f.readlines(READ_LINES * 48)
+                    if not lines:
+                        break
+                    yield [prefix + line for line in lines]
+        return
+    with open(source, 'r', encoding='ascii') as f:
+        while True:
+            lines = f.readlines(READ_LINES * 48)
+            if not lines:
+                return
+            yield lines
+
+
+def _estimate_count(source, algorithm):
+    """按文件大小估计语料的条目数（每行约为哈希长度加上出现次数和换行）"""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+        line = HEX_LENGTHS[algorithm] - 5 + 8
+    else:
+        paths = [source]
+        line = HEX_LENGTHS[algorithm] + 8
+    return max(1, sum(os.path.getsize(p) for p in paths) // line)
+
+
+def build_index(source, target, algorithm="sha1", min_count=1, bloom_bits=0, progress=None):
+    """
+    将排序好的语料转换为索引文件 target，返回写入的条目数。
+    min_count 大于 1 时跳过出现次数较少的哈希以缩小索引；bloom_bits 为布隆过滤器每个条目的位数，0 表示不使用
+    （16 位时约 1% 的未泄露密码需要再二分查找）。progress(已处理行数, None) 每读取一批调用一次。
+    语料未按哈希排序时抛出 ValueError，未完成的索引文件会被删除。
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    hex_length = HEX_LENGTHS[algorithm]
+    estimate = _estimate_count(source, algorithm)
+    prefix_bytes = _prefix_bytes(estimate)
+    buckets = 1 << (8 * prefix_bytes)
+    # offsets[p] 为第一个前缀不小于 p 的条目序号
+    offsets = array('Q', bytes(8 * (buckets + 1)))
+    bloom_blocks = (estimate * bloom_bits + 63) // 64
+    bloom = array('Q', bytes(8 * bloom_blocks))
+    entries_offset = HEADER_SIZE + 8 * (buckets + 1)
+
+    count = done = 0
+    next_bucket = 0
+    previous = b""
+    try:
+        with open(target, 'w+b') as f:
+            f.seek(entries_offset)
+            for lines in _iter_corpus(source):
+                keys = []
+                for line in lines:
+                    digest, _, occurrences = line.partition(":")
+                    if len(digest) != hex_length:
+                        if not line.strip():
+                            continue
+                        raise ValueError(f"无法识别的语料行: {line.strip()[:60]}")
+                    if min_count > 1 and int(occurrences or 0) < min_count:
+                        continue
+                    keys.append(bytes.fromhex(digest[:2 * DIGEST_BYTES]))
+                done += len(lines)
+                if not keys:
+                    continue
+                if keys[0] < previous or any(a > b for a, b in zip(keys, keys[1:])):
+                    raise ValueError("语料必须按哈希排序")
+                previous = keys[-1]
+                for i, key in enumerate(keys):
+                    bucket = int.from_bytes(key[:prefix_bytes], "big")
+                    while next_bucket <= bucket:
+                        offsets[next_bucket] = count + i
+                        next_bucket += 1
+                    if bloom_blocks:
+                        block, mask = _bloom_slot(key, bloom_blocks)
+                        bloom[block] |= mask
+                f.write(b"".join(key[prefix_bytes:KEY_BYTES] for key in keys))
+                count += len(keys)
+                if progress:
+                    progress(done, None)
+            while next_bucket <= buckets:
+                offsets[next_bucket] = count
+                next_bucket += 1
+            if sys.byteorder == "big":
+                offsets.byteswap()
+                bloom.byteswap()
+            bloom_offset = f.tell() if bloom_blocks else 0
+            f.write(bloom.tobytes())
+            f.seek(HEADER_SIZE)
+            f.write(offsets.tobytes())
+            f.seek(0)
+            header = _HEADER.pack(MAGIC, FORMAT_VERSION, ALGORITHMS.index(algorithm), prefix_bytes,
+                                  BLOOM_HASHES if bloom_blocks else 0, count, bloom_offset, bloom_blocks)
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+    except BaseException:
+        if os.path.exists(target):
+            os.remove(target)
+        raise
+    return count
+
+
+class BreachIndex:
+    """
+    以内存映射方式打开 build_index() 生成的索引，只有查询到的页面会被读入内存。
+        with BreachIndex(path) as index:
+            if "P@ssw0rd" in index: ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("不是有效的泄露密码索引") from None
+        if len(self._mm) < HEADER_SIZE:
+            self._mm.close()
+            raise ValueError("不是有效的泄露密码索引")
+        (magic, version, algorithm, self.prefix_bytes, _,
+         self.count, self._bloom_offset, self._bloom_blocks) = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != FORMAT_VERSION or algorithm >= len(ALGORITHMS):
+            self._mm.close()
+            raise ValueError("不是有效的泄露密码索引")
+        self.algorithm = ALGORITHMS[algorithm]
+        self._width = KEY_BYTES - self.prefix_bytes
+        self._entries = HEADER_SIZE + 8 * ((1 << (8 * self.prefix_bytes)) + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mm.close()
+
+    @property
+    def has_bloom(self):
+        return self._bloom_blocks > 0
+
+    def __contains__(self, password):
+        return self.contains_digest(password_digest(password, self.algorithm))
+
+    def contains_digest(self, digest):
+        """digest 为完整的哈希（字节），只比较前 KEY_BYTES 字节"""
+        mm = self._mm
+        key = digest[:KEY_BYTES]
+        if self._bloom_blocks:
+            # 即 _bloom_slot()，内联以减少调用开销
+            h = int.from_bytes(digest[:KEY_BYTES + 5], "big")
+            start = self._bloom_offset + 8 * ((h >> 40) % self._bloom_blocks)
+            mask = _PAIR_MASKS[h & 4095] | _PAIR_MASKS[h >> 12 & 4095] | _PAIR_MASKS[h >> 24 & 4095]
+            if int.from_bytes(mm[start:start + 8], "little") & mask != mask:
+                return False
+        bucket = int.from_bytes(key[:self.prefix_bytes], "big")
+        lo, hi = struct.unpack_from("<QQ", mm, HEADER_SIZE + 8 * bucket)
+        suffix = key[self.prefix_bytes:]
+        width, base = self._width, self._entries
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * width
+            value = mm[start:start + width]
+            if value == suffix:
+                return True
+            if value < suffix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def check(self, passwords):
+        """批量检查，返回与 passwords 对应的布尔值列表，相同的密码只查询一次"""
+        results = {}
+        for password in passwords:
+            if password not in results:
+                results[password] = password in self
+        return [results[password] for password in passwords]
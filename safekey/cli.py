@@ -0,0 +1,490 @@
+"""
+SafeKey 命令行：导入/导出（csv、json、ndjson、aes）、搜索、排序筛选列表、添加、删除、统计、评估密码强度、
+检查泄露的密码和批量生成密码。
+文件参数为 - 时读写标准输入/输出，可以通过管道处理大型数据集，提示和统计信息输出到标准错误。
+口令依次取自环境变量和终端输入：
+    SAFEKEY_PASSPHRASE         加密密码库的口令
+    SAFEKEY_BACKUP_PASSPHRASE  AES 备份的口令
+    SAFEKEY_PASSWORD           add 命令添加的密码
+泄露密码索引由 --index 指定，默认取自环境变量 SAFEKEY_BREACH_INDEX。
+--profile 和 --trace 记录各操作的耗时，分别保存为统计（JSON）和 Chrome 跟踪格式。
+--slow-log 将超过 --slow-ms 毫秒的语句连同查询计划追加到慢查询日志，slow-queries 命令汇总最耗时的语句。
+
+    python -m safekey export - --format ndjson | gzip > backup.ndjson.gz
+    gunzip -c backup.ndjson.gz | python -m safekey import - --format ndjson
+    python -m safekey generate --count 1000000 --unique --length 12 16 --exclude il1I0oO > passwords.txt
+    python -m safekey breach-index pwned-passwords-sha1-ordered-by-hash.txt pwned.skbi --bloom-bits 16
+    python -m safekey breached --index pwned.skbi
+    python -m safekey list --sort username --desc --website example --duplicates --limit 100
+    python -m safekey --trace import.trace.json import big.csv --format csv
+    python -m safekey --slow-log slow.log --slow-ms 20 search example --fields website notes
+    python -m safekey slow-queries slow.log --top 5
+"""
+import argparse
+import contextlib
+import csv
+import getpass
+import json
+import os
+import sqlite3
+import sys
+
+from .database import (DatabaseManager, AUDIT_ISSUES, DEFAULT_DB_NAME, EXPORT_FORMATS, PAGE_SIZE, SEARCH_FIELDS,
+                       SORT_COLUMNS, page_key)
+from .fieldcrypto import MASK, reveal
+from .keymanager import key_manager
+from .profiling import profiler
+from .settings import Settings, stderr_reporter
+
+COLUMNS = ("id", "website", "username", "password", "notes")
+# audit 命令输出中各问题的名称
+AUDIT_ISSUE_LABELS = {"weak": "弱密码", "short": "过短", "reused": "重复使用", "similar": "相似"}
+
+
+def _has_terminal():
+    if os.name != "posix":
+        return sys.stdin.isatty()
+    try:
+        with open("/dev/tty"):
+            return True
+    except OSError:
+        return False
+
+
+def _secret(env, prompt):
+    """从环境变量读取口令，未设置时在终端中输入（不回显，不占用标准输入）"""
+    value = os.environ.get(env)
+    if value is None:
+        if not _has_terminal():
+            # getpass 没有终端时会改为读取标准输入，与管道中的数据冲突
+            raise ValueError(f"无法在终端中输入口令，请设置环境变量 {env}")
+        value = getpass.getpass(prompt)
+    if not value:
+        raise ValueError(f"{prompt.rstrip('：: ')}不能为空")
+    return value
+
+
+def _unlock(db):
+    if not db.is_unlocked():
+        db.unlock(_secret("SAFEKEY_PASSPHRASE", "密码库口令："))
+
+
+def _backup_passphrase(fmt):
+    return _secret("SAFEKEY_BACKUP_PASSPHRASE", "备份口令：") if fmt == 'aes' else None
+
+
+def _progress(verb):
+    """在终端中显示进度，输出被重定向时不显示"""
+    if not sys.stderr.isatty():
+        return None
+
+    def report(done, total=None):
+        suffix = f" / {total}" if total is not None else ""
+        print(f"\r{verb} {done}{suffix}", end="", file=sys.stderr, flush=True)
+    return report
+
+
+def cmd_import(db, args):
+    passphrase = _backup_passphrase(args.format)
+    if args.format != 'aes' or db.is_encrypted():
+        _unlock(db)
+    progress = _progress("已读取")
+    if args.file != "-":
+        stats = db.import_passwords(args.file, args.format, passphrase, progress, override=not args.skip)
+    elif args.format == 'aes':
+        # 新版 AES 备份需要按路径随机访问，先将标准输入写入临时文件
+        import shutil
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix=".aes", delete=False) as spool:
+            shutil.copyfileobj(sys.stdin.buffer, spool)
+        try:
+            stats = db.import_passwords(spool.name, args.format, passphrase, progress, override=not args.skip)
+        finally:
+            os.remove(spool.name)
+    else:
+        stats = db.import_passwords(sys.stdin.buffer, args.format, passphrase, progress, override=not args.skip)
+    if progress:
+        print(file=sys.stderr)
+    print(f"读取 {stats['rows']} 条，新增 {stats['inserted']} 条，"
+          f"用时 {stats['seconds']:.2f} 秒（{stats['rows_per_sec']:.0f} 条/秒）", file=sys.stderr)
+
+
+def cmd_export(db, args):
+    passphrase = _backup_passphrase(args.format)
+    _unlock(db)
+    progress = _progress("已导出")
+    target = sys.stdout.buffer if args.file == "-" else args.file
+    if args.kdf_log2n is not None:
+        db.settings.kdf_log2n = args.kdf_log2n
+    db.export_passwords(target, args.format, passphrase, progress)
+    if target is sys.stdout.buffer:
+        target.flush()
+    if progress:
+        print(file=sys.stderr)
+
+
+def _cell(value, reveal_fields):
+    if value is None:
+        return None
+    if reveal_fields:
+        return reveal(value)
+    return str(value)
+
+
+def _write_records(db, args, rows):
+    """按 --output 输出记录，rows 可以是逐页产出的迭代器；未指定 --reveal 时密码输出为掩码"""
+    reveal_fields = args.reveal and db.is_encrypted()
+    rows = (
+        tuple(_cell(value, reveal_fields) if i else value for i, value in enumerate(row))
+        for row in rows
+    )
+    if not args.reveal:
+        rows = (row[:3] + (MASK,) + row[4:] for row in rows)
+
+    out = sys.stdout
+    count = 0
+    if args.output == "json":
+        rows = list(rows)
+        count = len(rows)
+        json.dump([dict(zip(COLUMNS, row)) for row in rows], out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    elif args.output == "ndjson":
+        for count, row in enumerate(rows, 1):
+            out.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n")
+    elif args.output == "csv":
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+    else:
+        for count, row in enumerate(rows, 1):
+            out.write("\t".join("" if value is None else str(value) for value in row) + "\n")
+        print(f"共 {count} 条", file=sys.stderr)
+    return count
+
+
+def cmd_search(db, args):
+    if args.reveal:
+        _unlock(db)
+    _write_records(db, args, db.search_passwords(args.keyword, tuple(args.fields)))
+
+
+def _iter_query(db, args):
+    """按键集逐页读取 query_passwords 的结果，最多 args.limit 条"""
+    remaining = args.limit
+    after = None
+    while remaining is None or remaining > 0:
+        size = PAGE_SIZE if remaining is None else min(PAGE_SIZE, remaining)
+        page = db.query_passwords(args.sort, args.desc, after, size, website=args.website,
+                                  username=args.username, notes=args.notes, has_notes=args.has_notes,
+                                  duplicates=args.duplicates)
+        yield from page
+        if len(page) < size:
+            return
+        after = page_key(page[-1], args.sort)
+        if remaining is not None:
+            remaining -= len(page)
+
+
+def cmd_list(db, args):
+    if args.reveal:
+        _unlock(db)
+    _write_records(db, args, _iter_query(db, args))
+
+
+def cmd_add(db, args):
+    _unlock(db)
+    password = _secret("SAFEKEY_PASSWORD", "密码：")
+    record, replaced = db.add_password(args.website, args.username, password, args.notes, override=not args.skip)
+    if record is None:
+        print("已存在相同的记录，已跳过", file=sys.stderr)
+    elif replaced:
+        print(f"已更新记录 {record[0]} 的备注", file=sys.stderr)
+    else:
+        print(record[0])
+
+
+def cmd_delete(db, args):
+    deleted = db.delete_passwords(args.ids)
+    print(f"已删除 {len(deleted)} 条记录", file=sys.stderr)
+    missing = sorted(set(args.ids) - set(deleted))
+    if missing:
+        print(f"safekey: 未找到 ID 为 {', '.join(map(str, missing))} 的记录", file=sys.stderr)
+        return 1
+
+
+def cmd_stats(db, args):
+    stats = db.stats()
+    if args.output == "json":
+        print(json.dumps(stats, ensure_ascii=False))
+        return
+    labels = {
+        "records": "记录数", "encrypted": "加密存储", "unlocked": "已解锁", "schema_version": "结构版本",
+        "journal_mode": "日志模式", "fts": "全文索引", "size_bytes": "文件大小（字节）",
+    }
+    for key, label in labels.items():
+        print(f"{label}\t{stats[key]}")
+
+
+def _iter_audit_rows(db, issue):
+    """逐页读取存在某一问题的全部记录"""
+    after = None
+    while True:
+        rows = db.get_audit_page(issue, after)
+        yield from rows
+        if len(rows) < PAGE_SIZE:
+            return
+        after = (rows[-1][1], rows[-1][0])
+
+
+def cmd_audit(db, args):
+    from .strength import HISTOGRAM_STEP, LEVEL_NAMES
+    _unlock(db)
+    progress = _progress("已评估")
+    distribution, weakest = db.audit_strength(args.weakest, progress)
+    if progress:
+        print(file=sys.stderr)
+    if args.list:
+        rows = _iter_audit_rows(db, args.list)
+        if args.output == "json":
+            print(json.dumps([{"id": r[0], "website": r[1], "username": r[2]} for r in rows], ensure_ascii=False))
+        else:
+            for record_id, website, username, *_ in rows:
+                print(f"{record_id}\t{website}\t{username}")
+        return
+    summary = db.audit_summary()
+    if args.output == "json":
+        report = distribution.to_dict()
+        report["issues"] = {issue: summary[issue] for issue in AUDIT_ISSUES}
+        report["weakest"] = [
+            {"bits": bits, "id": id_, "website": website, "username": username}
+            for bits, id_, website, username in weakest
+        ]
+        print(json.dumps(report, ensure_ascii=False))
+        return
+    print(f"密码数\t{distribution.total}")
+    for name, count in zip(LEVEL_NAMES, distribution.counts):
+        print(f"{name}\t{count}")
+    if distribution.total:
+        print(f"平均熵（比特）\t{distribution.mean_bits:.1f}")
+        print(f"最低熵（比特）\t{distribution.min_bits:.1f}")
+    for bucket, count in sorted(distribution.histogram.items()):
+        print(f"{bucket}-{bucket + HISTOGRAM_STEP} 比特\t{count}")
+    print()
+    for issue in AUDIT_ISSUES:
+        print(f"{AUDIT_ISSUE_LABELS[issue]}\t{summary[issue]}")
+    if weakest:
+        print()
+        print("最弱的记录：")
+        for bits, id_, website, username in weakest:
+            print(f"{id_}\t{bits:.1f}\t{website}\t{username}")
+
+
+def _breach_index_path(args):
+    path = args.index or os.environ.get("SAFEKEY_BREACH_INDEX")
+    if not path:
+        raise ValueError("请通过 --index 或环境变量 SAFEKEY_BREACH_INDEX 指定泄露密码索引")
+    return path
+
+
+def cmd_breached(db, args):
+    _unlock(db)
+    rows = db.find_breached(_breach_index_path(args), _progress("已检查"))
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    if args.output == "json":
+        print(json.dumps([{"id": r[0], "website": r[1], "username": r[2]} for r in rows], ensure_ascii=False))
+    else:
+        for record_id, website, username, *_ in rows:
+            print(f"{record_id}\t{website}\t{username}")
+    print(f"共 {len(rows)} 条记录的密码出现在泄露密码库中", file=sys.stderr)
+
+
+def cmd_breach_index(args):
+    from .breach import build_index
+    progress = _progress("已读取")
+    count = build_index(args.source, args.target, args.algorithm, args.min_count, args.bloom_bits, progress)
+    if progress:
+        print(file=sys.stderr)
+    print(f"已写入 {count} 条哈希到 {args.target}", file=sys.stderr)
+
+
+def cmd_slow_queries(args):
+    from .querylog import top_offenders
+    items = top_offenders(args.log, args.top)
+    if args.output == "json":
+        print(json.dumps(items, ensure_ascii=False, indent=2))
+        return
+    for item in items:
+        print(f"{item['total_ms']:.1f} ms 共 {item['count']} 次（平均 {item['mean_ms']:.1f} ms，"
+              f"最长 {item['max_ms']:.1f} ms，最多 {item['rows']} 行）")
+        print(f"  {item['sql']}")
+        print(f"  参数 {item['params']}")
+        for line in item["plan"]:
+            print(f"    {line}")
+    if not items:
+        print("慢查询日志中没有记录", file=sys.stderr)
+
+
+def cmd_generate(args):
+    # 只有这个命令用到，延迟导入以免拖慢其他命令的启动
+    from .generator import PasswordGenerator, build_charset, generate_parallel, write_batches
+    charset = build_charset(not args.no_upper, not args.no_lower, not args.no_digits, not args.no_symbols,
+                            args.exclude)
+    generator = PasswordGenerator(charset, args.length[0], args.length[1], args.include)
+    index = None
+    if args.index or os.environ.get("SAFEKEY_BREACH_INDEX"):
+        from .breach import BreachIndex
+        index = BreachIndex(_breach_index_path(args))
+    progress = _progress("已生成") if args.file != "-" else None
+    # 生成结束后关闭索引的内存映射
+    with index or contextlib.nullcontext():
+        batches = generate_parallel(generator, args.count, args.unique, args.workers,
+                                    reject=index.check if index else None)
+        if args.file == "-":
+            write_batches(sys.stdout, batches)
+            sys.stdout.flush()
+        else:
+            with open(args.file, 'w', encoding='utf-8') as f:
+                write_batches(f, batches, args.count, progress)
+    if progress:
+        print(file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="safekey", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DEFAULT_DB_NAME, help=f"密码库文件（默认 {DEFAULT_DB_NAME}）")
+    parser.add_argument("--profile", metavar="FILE", help="将各操作耗时的统计（次数、p50/p95/p99）保存为 JSON")
+    parser.add_argument("--trace", metavar="FILE", help="将各操作的耗时保存为 Chrome 跟踪格式")
+    parser.add_argument("--slow-log", metavar="FILE", default="", help="慢查询日志文件，记录慢查询及其查询计划")
+    parser.add_argument("--slow-ms", type=float, default=Settings.slow_query_ms, metavar="MS",
+                        help=f"记入慢查询日志的耗时阈值（默认 {Settings.slow_query_ms} 毫秒，0 表示不记录）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import", help="从文件或标准输入导入")
+    p.add_argument("file", help="文件路径，- 表示标准输入")
+    p.add_argument("--format", "-f", choices=EXPORT_FORMATS, required=True)
+    p.add_argument("--skip", action="store_true", help="跳过已存在的记录（默认覆盖备注）")
+    p.set_defaults(handler=cmd_import)
+
+    p = commands.add_parser("export", help="导出到文件或标准输出")
+    p.add_argument("file", help="文件路径，- 表示标准输出")
+    p.add_argument("--format", "-f", choices=EXPORT_FORMATS, required=True)
+    p.add_argument("--kdf-log2n", type=int, help="AES 备份的 KDF 强度（log2 N）")
+    p.set_defaults(handler=cmd_export)
+
+    p = commands.add_parser("search", help="搜索记录")
+    p.add_argument("keyword")
+    p.add_argument("--fields", nargs="+", choices=SEARCH_FIELDS, default=["website"])
+    p.add_argument("--output", "-o", choices=("table", "json", "ndjson", "csv"), default="table")
+    p.add_argument("--reveal", action="store_true", help="输出明文密码")
+    p.set_defaults(handler=cmd_search)
+
+    p = commands.add_parser("list", help="排序、筛选并列出记录，按键集逐页读取")
+    p.add_argument("--sort", choices=SORT_COLUMNS, default="website")
+    p.add_argument("--desc", action="store_true", help="降序排列")
+    p.add_argument("--website", help="网站包含该子串")
+    p.add_argument("--username", help="用户名包含该子串")
+    p.add_argument("--notes", help="备注包含该子串")
+    p.add_argument("--has-notes", dest="has_notes", action="store_const", const=True, help="只列出有备注的记录")
+    p.add_argument("--no-notes", dest="has_notes", action="store_const", const=False, help="只列出没有备注的记录")
+    p.add_argument("--duplicates", action="store_true", help="只列出同一网站和用户名下保存了多个密码的记录")
+    p.add_argument("--limit", "-n", type=int, help="最多列出的记录数，默认全部")
+    p.add_argument("--output", "-o", choices=("table", "json", "ndjson", "csv"), default="table")
+    p.add_argument("--reveal", action="store_true", help="输出明文密码")
+    p.set_defaults(handler=cmd_list)
+
+    p = commands.add_parser("add", help="添加一条记录，密码在终端中输入")
+    p.add_argument("website")
+    p.add_argument("username")
+    p.add_argument("--notes", default="")
+    p.add_argument("--skip", action="store_true", help="已存在相同记录时跳过（默认覆盖备注）")
+    p.set_defaults(handler=cmd_add)
+
+    p = commands.add_parser("delete", help="按 ID 删除记录")
+    p.add_argument("ids", nargs="+", type=int)
+    p.set_defaults(handler=cmd_delete)
+
+    p = commands.add_parser("stats", help="显示密码库概况")
+    p.add_argument("--output", "-o", choices=("table", "json"), default="table")
+    p.set_defaults(handler=cmd_stats)
+
+    p = commands.add_parser("audit", help="评估密码库中全部密码的强度")
+    p.add_argument("--weakest", type=int, default=10, help="列出最弱的记录数（默认 10）")
+    p.add_argument("--list", choices=AUDIT_ISSUES, help="只列出存在该问题的记录（id、网站、用户名）")
+    p.add_argument("--output", "-o", choices=("table", "json"), default="table")
+    p.set_defaults(handler=cmd_audit)
+
+    # 生成密码不需要打开密码库
+    p = commands.add_parser("generate", help="批量生成随机密码，每行一个")
+    p.add_argument("--count", "-n", type=int, default=1)
+    p.add_argument("--length", type=int, nargs=2, metavar=("MIN", "MAX"), default=[12, 16])
+    p.add_argument("--no-upper", action="store_true", help="不使用大写字母")
+    p.add_argument("--no-lower", action="store_true", help="不使用小写字母")
+    p.add_argument("--no-digits", action="store_true", help="不使用数字")
+    p.add_argument("--no-symbols", action="store_true", help="不使用符号")
+    p.add_argument("--exclude", default="", help="排除的字符")
+    p.add_argument("--include", action="append", default=[], help="每个密码都包含的字符串，可重复指定")
+    p.add_argument("--unique", action="store_true", help="生成的密码互不相同")
+    p.add_argument("--workers", type=int, help="生成进程数，默认为 CPU 核数")
+    p.add_argument("--index", help="丢弃出现在该泄露密码索引中的密码")
+    p.add_argument("--output", "-o", dest="file", default="-", help="输出文件，默认标准输出")
+    p.set_defaults(command_handler=cmd_generate)
+
+    p = commands.add_parser("breached", help="列出密码出现在泄露密码索引中的记录")
+    p.add_argument("--index", help="泄露密码索引文件")
+    p.add_argument("--output", "-o", choices=("table", "json"), default="table")
+    p.set_defaults(handler=cmd_breached)
+
+    p = commands.add_parser("breach-index", help="将按哈希排序的 HIBP 格式语料转换为泄露密码索引")
+    p.add_argument("source", help="语料文件（每行 HASH:COUNT），或范围文件所在的目录")
+    p.add_argument("target", help="输出的索引文件")
+    p.add_argument("--algorithm", choices=("sha1", "ntlm"), default="sha1")
+    p.add_argument("--min-count", type=int, default=1, help="跳过出现次数少于该值的哈希")
+    p.add_argument("--bloom-bits", type=int, default=0, help="布隆过滤器每条哈希的位数，0 表示不使用")
+    p.set_defaults(command_handler=cmd_breach_index)
+
+    p = commands.add_parser("slow-queries", help="按总耗时列出慢查询日志中最耗时的语句及其查询计划")
+    p.add_argument("log", help="慢查询日志文件（--slow-log 指定的文件），包括其轮转文件")
+    p.add_argument("--top", type=int, default=10, help="列出的语句数（默认 10）")
+    p.add_argument("--output", "-o", choices=("table", "json"), default="table")
+    p.set_defaults(command_handler=cmd_slow_queries)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = None
+    if args.profile or args.trace:
+        profiler.enable()
+    status = 0
+    try:
+        if hasattr(args, "command_handler"):
+            args.command_handler(args)
+        else:
+            # 命令行不读取界面设置，除慢查询日志外使用默认设置
+            settings = Settings(slow_query_ms=args.slow_ms, slow_query_log=args.slow_log)
+            db = DatabaseManager(args.db, settings=settings, reporter=stderr_reporter)
+            # 处理函数可以返回非零的退出码（如部分记录不存在）
+            status = args.handler(db, args) or 0
+    except KeyboardInterrupt:
+        print("已取消", file=sys.stderr)
+        return 130
+    except BrokenPipeError:
+        # 下游命令（如 head）提前退出
+        sys.stderr.close()
+        return 1
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"safekey: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if db is not None and db.conn is not None:
+            db.conn.close()
+            db.conn = None
+        key_manager.evict()
+        if args.profile:
+            profiler.export(args.profile, "json")
+        if args.trace:
+            profiler.export(args.trace, "chrome")
+    return status
@@ -0,0 +1,1049 @@
+import sqlite3
+import csv
+import json
+import time
+import sys
+import codecs
+import contextlib
+import io
+import re
+import os
+from itertools import islice
+from .backupcontainer import BackupReader, BackupWriter, is_container
+from .keymanager import key_manager
+from .fieldcrypto import VaultCipher, SealedField, VaultLockedError, VERIFIER_TEXT, reveal, fingerprint
+from .migrations import migrate, apply_profile, schema_version, SCHEMA_VERSION
+from .settings import Settings, silent, INFO, WARNING
+from .profiling import profiler
+# 健康检查、泄露密码检查和慢查询日志的模块在用到时才导入，无需这些功能的命令行操作启动更快（见 benchmarks/import_time.py）
+
+# 批量导入时每批写入的行数
+IMPORT_BATCH_SIZE = 5000
+# 流式导入时每次读取的字节数（AES 分组大小的整数倍）
+READ_CHUNK_SIZE = 64 * 1024
+# 流式导出时每批读取的行数
+EXPORT_CHUNK_SIZE = 2000
+# 支持的导入/导出格式
+EXPORT_FORMATS = ('csv', 'json', 'ndjson', 'aes')
+# 默认的密码库文件
+DEFAULT_DB_NAME = "passwords.db"
+# 表格分页获取时每页的行数
+PAGE_SIZE = 256
+# 可参与搜索的字段
+SEARCH_FIELDS = ("website", "username", "notes")
+# query_passwords 可排序的列，及其在 passwords（别名 p）上的排序表达式，与 migrations 中的索引一致。
+# 备注为 NULL 时视为空字符串
+SORT_COLUMNS = ("website", "username", "id", "notes")
+_SORT_EXPRESSIONS = {"website": "p.website", "username": "p.username", "id": "p.id", "notes": "IFNULL(p.notes, '')"}
+# 全文索引同步触发器
+FTS_TRIGGERS = ("passwords_fts_ai", "passwords_fts_ad", "passwords_fts_au")
+# 读取记录时选择的列，与 DatabaseManager.COLUMNS 一致
+SELECT_COLUMNS = "id, website, username, password, notes"
+# 全文索引的数据源视图：加密后的备注为密文，不参与索引
+FTS_SOURCE = "passwords_fts_source"
+# 健康检查可筛选的问题：弱密码、过短、重复使用、与其他密码相似
+AUDIT_ISSUES = ("weak", "short", "reused", "similar")
+
+
+def _audit_condition(issue):
+    """问题 issue 在 password_audit（别名 a）上的筛选条件"""
+    from .strength import MEDIUM_BITS, SHORT_LENGTH
+    return {
+        "weak": f"a.bits < {MEDIUM_BITS}",
+        "short": f"a.length < {SHORT_LENGTH}",
+        "reused": "a.content_hash IN (SELECT content_hash FROM password_audit GROUP BY content_hash HAVING COUNT(*) > 1)",
+        "similar": """a.similar_hash IN (
+            SELECT similar_hash FROM password_audit GROUP BY similar_hash HAVING COUNT(DISTINCT content_hash) > 1
+        )""",
+    }[issue]
+
+
+def page_key(row, sort="website"):
+    """记录在 query_passwords 中的键集分页键 (排序值, id)，作为下一页的 after 参数"""
+    if sort == "notes":
+        return (row[4] or "", row[0])
+    return (row[DatabaseManager.COLUMNS.index(sort)], row[0])
+
+
+def _merge_notes(kept, other):
+    """合并重复记录的备注：other 中不在 kept 里的内容另起一行追加"""
+    if not other or other == kept or other in (kept or "").split("\n"):
+        return kept
+    return f"{kept}\n{other}" if kept else other
+
+
+def _like_pattern(text):
+    """子串匹配的 LIKE 模式，转义 % 和 _（配合 ESCAPE '\\'）"""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class OperationCancelled(Exception):
+    """长时间操作被取消：进度回调抛出此异常即可中止导入或导出"""
+
+
+def _with_progress(rows, progress, total=None, every=EXPORT_CHUNK_SIZE):
+    """逐行转发 rows，每 every 行调用一次 progress(已处理行数, 总行数)"""
+    if progress is None:
+        yield from rows
+        return
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % every == 0:
+            progress(done, total)
+    progress(done, total)
+
+
+def _batched(iterable, size):
+    """将可迭代对象按固定大小切分为列表"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _row_to_entry(row):
+    return {
+        'id': row[0],
+        'website': row[1],
+        'username': row[2],
+        'password': row[3],
+        'notes': row[4]
+    }
+
+
+def _iter_json_array(rows):
+    """逐批生成 JSON 数组文本，输出与 json.dump(entries, f, indent=4) 一致"""
+    first = True
+    for batch in _batched(rows, EXPORT_CHUNK_SIZE):
+        parts = []
+        for row in batch:
+            entry = json.dumps(_row_to_entry(row), indent=4).replace("\n", "\n    ")
+            parts.append(("[\n    " if first else ",\n    ") + entry)
+            first = False
+        yield "".join(parts)
+    yield "[]" if first else "\n]"
+
+
+_JSON_WHITESPACE = re.compile(r'\s*')
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def _iter_json_entries(chunks):
+    """
+    增量解析 JSON：chunks 为文本片段的迭代器，内容可以是对象数组，也可以是逐个排列的对象（NDJSON）。
+    每解析出一个对象就立即产出，缓冲区只保留尚未解析的部分。
+    """
+    decoder = json.JSONDecoder()
+    scan_once = decoder.scan_once
+    buffer = ""
+    pos = 0
+    in_array = None
+    eof = False
+    while True:
+        # 跳过空白、数组分隔符
+        pos = (_JSON_SEPARATORS if in_array else _JSON_WHITESPACE).match(buffer, pos).end()
+        if pos < len(buffer):
+            if in_array is None:
+                in_array = buffer[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == ']':
+                return
+            try:
+                entry, end = scan_once(buffer, pos)
+            except StopIteration:
+                if eof:
+                    # 数据已读完仍无法解析，交给 raw_decode 生成详细的错误信息
+                    decoder.raw_decode(buffer, pos)
+                    raise
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                if not isinstance(entry, dict):
+                    raise ValueError("JSON 条目必须为对象")
+                pos = end
+                yield entry
+                continue
+        elif eof:
+            if in_array:
+                raise ValueError("JSON 数组不完整")
+            return
+
+        # 数据不足，读取下一段
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+        else:
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def _peak_rss_kb():
+    """当前进程的峰值常驻内存（KB），平台不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _open_source(source):
+    """source 为文件路径时打开文件，为二进制文件对象时直接使用（由调用方负责关闭）"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb')
+    return contextlib.nullcontext(source)
+
+
+@contextlib.contextmanager
+def _text_stream(raw, newline=None):
+    """在二进制流上按 UTF-8 读写文本，结束时分离包装，不关闭底层的流"""
+    f = io.TextIOWrapper(raw, encoding='utf-8', newline=newline)
+    try:
+        yield f
+    finally:
+        if f.writable():
+            f.flush()
+        f.detach()
+
+
+def _entries_to_rows(entries):
+    """将 JSON 条目转换为 (website, username, password, notes) 元组"""
+    for entry in entries:
+        yield (
+            entry.get('website', ""),
+            entry.get('username', ""),
+            entry.get('password', ""),
+            entry.get('notes', "")
+        )
+
+class DatabaseManager:
+    # 读取记录时返回的元组中各列的顺序
+    COLUMNS = ("id", "website", "username", "password", "notes")
+
+    def __init__(self, db_name=DEFAULT_DB_NAME, keys=None, profile=None, settings=None, reporter=None):
+        """
+        settings 为 Settings 对象，默认使用内置默认值；profile 可以单独覆盖 settings.profile。
+        reporter(level, message) 接收非致命的事件通知，默认忽略。
+        """
+        self.db_name = db_name
+        self.keys = keys or key_manager
+        self.settings = settings or Settings()
+        self.report = reporter or silent
+        from .querylog import open_log
+        self.query_log = open_log(self.settings.slow_query_log)
+        self.conn = sqlite3.connect(db_name)
+        apply_profile(self.conn, profile or self.settings.profile)
+        self.last_import_stats = None
+        previous = schema_version(self.conn)
+        with profiler.span("db.migrate"):
+            migrate(self.conn)
+        if 0 < previous < SCHEMA_VERSION:
+            self.report(INFO, f"数据库结构已从版本 {previous} 升级到版本 {SCHEMA_VERSION}")
+        self.fts_enabled = self.create_fts_index()
+        if not self.fts_enabled:
+            self.report(WARNING, "全文索引不可用，搜索将逐条匹配")
+        self.load_vault_meta()
+        # 升级前的记录没有去重键，加密库未解锁时推迟到解锁后补算
+        self._backfill_dedup_keys()
+
+    def _backfill_dedup_keys(self):
+        """
+        为缺少去重键的记录补算去重键，从最新的记录开始。网站、用户名和密码都相同的旧记录合并到保留的记录中：
+        旧记录的备注追加到保留记录的备注之后（相同的备注只保留一份），不会丢失任何内容。
+        """
+        vault = self.vault
+        if self.is_encrypted() and vault is None:
+            return
+        rows = self.conn.execute(
+            "SELECT id, website, username, password, notes FROM passwords WHERE dedup_key IS NULL ORDER BY id DESC"
+        ).fetchall()
+        if not rows:
+            return
+        fp = vault.fingerprint if vault else fingerprint
+
+        def plaintext(value, column):
+            return vault.open(value, column) if vault is not None and isinstance(value, bytes) else value
+
+        merged = 0
+        with self.conn:
+            for record_id, website, username, password, notes in rows:
+                dedup_key = fp((website, username, plaintext(password, "password")))
+                cursor = self.conn.execute(
+                    "UPDATE OR IGNORE passwords SET dedup_key=? WHERE id=?", (dedup_key, record_id)
+                )
+                if cursor.rowcount:
+                    continue
+                survivor_id, survivor_notes = self.conn.execute(
+                    "SELECT id, notes FROM passwords WHERE dedup_key=?", (dedup_key,)
+                ).fetchone()
+                combined = _merge_notes(plaintext(survivor_notes, "notes"), plaintext(notes, "notes"))
+                if combined != plaintext(survivor_notes, "notes"):
+                    self.conn.execute("UPDATE passwords SET notes=? WHERE id=?",
+                                      (self._seal_value(combined, "notes"), survivor_id))
+                self.conn.execute("DELETE FROM passwords WHERE id=?", (record_id,))
+                merged += 1
+        if merged:
+            self.report(INFO, f"已合并 {merged} 条重复的记录，其备注已并入保留的记录")
+
+    def create_fts_index(self):
+        """
+        创建基于 FTS5（trigram 分词）的全文索引，并通过触发器与 passwords 表保持同步。
+        已有数据库首次创建索引时会回填全部记录。SQLite 未编译 FTS5 时返回 False，搜索回退为 LIKE。
+        """
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts_probe USING fts5(x, tokenize='trigram')")
+            self.conn.execute("DROP TABLE temp.fts_probe")
+        except sqlite3.OperationalError:
+            # 不支持 FTS5 时移除旧触发器，否则每次写入都会失败
+            for trigger in FTS_TRIGGERS:
+                self.conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self.conn.commit()
+            return False
+
+        objects = FTS_TRIGGERS + (FTS_SOURCE,)
+        installed = self.conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name IN (?, ?, ?, ?)", objects
+        ).fetchone()[0]
+        if installed == len(objects):
+            return True
+
+        # 触发器缺失说明索引不存在或已过期，重新建立并回填
+        try:
+            self.conn.execute("BEGIN")
+            for trigger in FTS_TRIGGERS:
+                self.conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self.conn.execute("DROP TABLE IF EXISTS passwords_fts")
+            self.conn.execute(f"DROP VIEW IF EXISTS {FTS_SOURCE}")
+            self.conn.execute(f"""
+            CREATE VIEW {FTS_SOURCE} AS
+            SELECT id, website, username, CASE WHEN typeof(notes) = 'text' THEN notes END AS notes
+            FROM passwords
+            """)
+            self.conn.execute(f"""
+            CREATE VIRTUAL TABLE passwords_fts USING fts5(
+                website, username, notes,
+                content='{FTS_SOURCE}', content_rowid='id', tokenize='trigram'
+            )
+            """)
+            self.conn.execute("""
+            CREATE TRIGGER passwords_fts_ai AFTER INSERT ON passwords BEGIN
+                INSERT INTO passwords_fts (rowid, website, username, notes)
+                VALUES (new.id, new.website, new.username,
+                        CASE WHEN typeof(new.notes) = 'text' THEN new.notes END);
+            END
+            """)
+            self.conn.execute("""
+            CREATE TRIGGER passwords_fts_ad AFTER DELETE ON passwords BEGIN
+                INSERT INTO passwords_fts (passwords_fts, rowid, website, username, notes)
+                VALUES ('delete', old.id, old.website, old.username,
+                        CASE WHEN typeof(old.notes) = 'text' THEN old.notes END);
+            END
+            """)
+            self.conn.execute("""
+            CREATE TRIGGER passwords_fts_au AFTER UPDATE OF website, username, notes ON passwords BEGIN
+                INSERT INTO passwords_fts (passwords_fts, rowid, website, username, notes)
+                VALUES ('delete', old.id, old.website, old.username,
+                        CASE WHEN typeof(old.notes) = 'text' THEN old.notes END);
+                INSERT INTO passwords_fts (rowid, website, username, notes)
+                VALUES (new.id, new.website, new.username,
+                        CASE WHEN typeof(new.notes) = 'text' THEN new.notes END);
+            END
+            """)
+            self.conn.execute("INSERT INTO passwords_fts (passwords_fts) VALUES ('rebuild')")
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            return False
+        return True
+
+    def load_vault_meta(self):
+        """读取加密存储的元数据，其他连接启用加密后需要重新读取"""
+        meta = dict(self.conn.execute("SELECT key, value FROM vault_meta").fetchall())
+        self.vault_salt = meta.get("salt")
+        self.vault_params = json.loads(meta["kdf"]) if "kdf" in meta else None
+        self.vault_verifier = meta.get("verifier")
+
+    def is_encrypted(self):
+        """密码库是否启用了加密存储"""
+        return self.vault_salt is not None
+
+    @property
+    def vault(self):
+        """当前可用的字段加解密器；未加密、未解锁或密钥已超时清除时为 None"""
+        if not self.is_encrypted():
+            return None
+        buffer = self.keys.get(self.vault_salt, self.vault_params)
+        return VaultCipher(buffer, touch=self.keys.touch) if buffer else None
+
+    def is_unlocked(self):
+        """明文密码库，或加密密码库的主密钥仍在缓存中"""
+        return not self.is_encrypted() or self.keys.has(self.vault_salt, self.vault_params)
+
+    def _require_vault(self):
+        vault = self.vault
+        if vault is None and self.is_encrypted():
+            raise VaultLockedError("密码库已锁定，请先解锁")
+        return vault
+
+    def unlock(self, passphrase):
+        """用口令解锁加密的密码库，主密钥在本次会话中一直保留"""
+        if not self.is_encrypted():
+            return
+        buffer = self.keys.derive(passphrase, self.vault_salt, self.vault_params, persist=True)
+        try:
+            VaultCipher(buffer).open(self.vault_verifier, "verifier")
+        except VaultLockedError:
+            self.keys.forget(self.vault_salt, self.vault_params)
+            raise VaultLockedError("口令错误") from None
+        self._backfill_dedup_keys()
+
+    def enable_encryption(self, passphrase, kdf_params=None):
+        """
+        将明文密码库就地迁移为加密存储：password 和 notes 列改为保存 AES-OCB 密文，去重键改为带密钥的摘要，
+        健康检查结果（明文的无密钥摘要）被删除。
+        整个迁移在一个事务中完成，中途失败不会留下半加密的数据。迁移期间开启 secure_delete，被覆盖的内容清零；
+        完成后 VACUUM 重建数据库文件，再以 TRUNCATE 模式执行检查点，把 WAL 中的页写回并清空日志，
+        其中旧的明文页随之清除。其他连接正在读取时检查点无法完成，通过 reporter 发出警告。
+        """
+        if self.is_encrypted():
+            raise ValueError("密码库已启用加密存储")
+        salt = os.urandom(16)
+        params = kdf_params or self.settings.kdf_params
+        vault = VaultCipher(self.keys.derive(passphrase, salt, params, persist=True), touch=self.keys.touch)
+        self._register_vault_functions(vault)
+        secure_delete = self.conn.execute("PRAGMA secure_delete").fetchone()[0]
+        self.conn.execute("PRAGMA secure_delete = ON")
+        try:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO vault_meta (key, value) VALUES (?, ?)", [
+                    ("salt", salt),
+                    ("kdf", json.dumps(params)),
+                    ("verifier", vault.seal(VERIFIER_TEXT, "verifier")),
+                ])
+                # 备注改为密文后，触发器会将其从全文索引中移除
+                self.conn.execute("""
+                UPDATE passwords
+                SET password = vault_seal(password, 'password'), notes = vault_seal(notes, 'notes'),
+                    dedup_key = vault_fingerprint(website, username, password)
+                WHERE typeof(password) = 'text'
+                """)
+                # 明文库的健康检查结果是密码明文的无密钥摘要，可以离线破解，与加密在同一事务中删除；
+                # 之后的健康检查用带密钥的摘要重新评分
+                self.conn.execute("DELETE FROM password_audit")
+            self.conn.execute("VACUUM")
+            busy = self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+        finally:
+            self.conn.execute(f"PRAGMA secure_delete = {int(secure_delete)}")
+        self.load_vault_meta()
+        if busy:
+            self.report(WARNING, "其他连接正在读取密码库，预写日志中可能仍残留明文，关闭所有连接后会被清除")
+
+    def _register_vault_functions(self, vault):
+        """注册 SQL 函数 vault_seal/vault_fingerprint，供批量语句在 SQLite 内部加密和计算去重键"""
+        def seal(value, column):
+            return None if value is None else vault.seal(str(value), column)
+
+        def fingerprint_(website, username, password):
+            return vault.fingerprint((website, username, password))
+
+        self.conn.create_function("vault_seal", 2, seal)
+        self.conn.create_function("vault_fingerprint", 3, fingerprint_)
+
+    def _fingerprinter(self):
+        """返回计算去重键的函数：明文库使用 BLAKE2b，加密库使用主密钥做带密钥的摘要"""
+        vault = self._require_vault()
+        return vault.fingerprint if vault else fingerprint
+
+    def _seal_value(self, value, column):
+        if value is None or not self.is_encrypted():
+            return value
+        return self._require_vault().seal(str(value), column)
+
+    def _wrap_rows(self, rows):
+        """加密存储时将密文替换为 SealedField 句柄，不做任何解密"""
+        if not self.is_encrypted():
+            return rows
+        return [self._wrap_row(row) for row in rows]
+
+    def _wrap_row(self, row):
+        if row is None or not self.is_encrypted():
+            return row
+        password, notes = row[3], row[4]
+        return (
+            row[0], row[1], row[2],
+            SealedField(password, "password", self) if isinstance(password, bytes) else password,
+            SealedField(notes, "notes", self) if isinstance(notes, bytes) else notes,
+        )
+
+    # 查询
+    def execute_query(self, query, params=(), commit=False, fetch=None):
+        """
+        执行单条语句，出错时抛出 sqlite3.Error，由调用方决定如何提示。
+        fetch 为 "one" 或 "all" 时读取并返回结果（计时包含读取结果的时间），否则返回游标。
+        耗时超过 settings.slow_query_ms 的语句连同查询计划记入慢查询日志（self.query_log）。
+        """
+        start = time.perf_counter()
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        if fetch == "all":
+            result = cursor.fetchall()
+            rows = len(result)
+        elif fetch == "one":
+            result = cursor.fetchone()
+            rows = 0 if result is None else 1
+        else:
+            # SELECT 的结果由调用方读取，rowcount 为 -1；写操作为影响的行数
+            result = cursor
+            rows = max(cursor.rowcount, 0)
+        if commit:
+            self.conn.commit()
+        elapsed = time.perf_counter() - start
+        threshold = self.settings.slow_query_ms
+        if threshold and elapsed * 1000 >= threshold:
+            self.query_log.record(self.conn, query, params, elapsed, rows)
+        return result
+
+    def slow_queries(self, limit=10):
+        """本进程中记录的慢查询，按总耗时从高到低排列（见 querylog.SlowQueryLog.top）"""
+        return self.query_log.top(limit)
+
+    def add_password(self, website, username, password, notes="", override=True):
+        """
+        添加密码记录，通过去重键上的唯一索引完成去重：
+            override=True  -> 已存在相同的网站、用户名和密码时更新其备注
+            override=False -> 已存在时跳过
+        返回 (记录, 被替换的记录 ID 列表)，调用方据此只更新受影响的行；跳过时记录为 None。
+        """
+        dedup_key = self._fingerprinter()((website, username, password))
+        on_conflict = ("DO UPDATE SET notes = excluded.notes WHERE notes IS NOT excluded.notes"
+                       if override else "DO NOTHING")
+        with self.conn:
+            existing = self.execute_query("SELECT id FROM passwords WHERE dedup_key=?", (dedup_key,), fetch="one")
+            if existing and not override:
+                return None, []
+            self.execute_query(f"""
+            INSERT INTO passwords (website, username, password, notes, dedup_key)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (dedup_key) {on_conflict}
+            """, (website, username, self._seal_value(password, "password"), self._seal_value(notes, "notes"), dedup_key))
+            record = self.execute_query(
+                f"SELECT {SELECT_COLUMNS} FROM passwords WHERE dedup_key=?", (dedup_key,), fetch="one"
+            )
+        return self._wrap_row(record), [existing[0]] if existing else []
+
+    def delete_passwords(self, password_ids):
+        """批量删除密码记录，返回实际删除的 ID 列表"""
+        if not password_ids:
+            return []
+
+        deleted = []
+        with self.conn:
+            for record_id in password_ids:
+                if self.execute_query("DELETE FROM passwords WHERE id=?", (record_id,)).rowcount:
+                    deleted.append(record_id)
+        return deleted
+
+    def get_all_passwords(self):
+        return self._wrap_rows(
+            self.execute_query(f"SELECT {SELECT_COLUMNS} FROM passwords ORDER BY website ASC", fetch="all"))
+
+    def get_passwords_page(self, after=None, limit=PAGE_SIZE):
+        """按 (website, id) 键集分页获取密码记录，after 为上一页最后一行的 (website, id)"""
+        return self.query_passwords(after=after, limit=limit)
+
+    def query_passwords(self, sort="website", descending=False, after=None, limit=PAGE_SIZE,
+                        website=None, username=None, notes=None, has_notes=None, duplicates=False):
+        """
+        排序、筛选并按键集分页获取密码记录。
+        sort 为 SORT_COLUMNS 之一，相同值按 id 排序；after 为上一页最后一行的 page_key(行, sort)，不使用 OFFSET。
+        每种排序都有对应的索引，翻页时从索引中 after 的位置开始读取，耗时与页码和记录总数无关。
+        筛选条件同时满足：
+            website、username、notes  包含该子串（不区分 ASCII 大小写）
+            has_notes                 True 只要有备注的记录，False 只要没有备注的记录
+            duplicates                只要同一网站和用户名下保存了多个密码的记录
+        筛选在沿索引读取时逐行判断，条件很少满足时需要读取更多的行才能凑满一页。
+        加密存储时备注为密文，不能按备注排序或筛选，抛出 ValueError。
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort}")
+        if self.is_encrypted() and (sort == "notes" or notes or has_notes is not None):
+            raise ValueError("加密存储时备注为密文，不能按备注排序或筛选")
+        conditions, params = [], []
+        for column, text in (("website", website), ("username", username), ("notes", notes)):
+            if text:
+                conditions.append(f"p.{column} LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(text))
+        if has_notes is not None:
+            conditions.append("IFNULL(p.notes, '') <> ''" if has_notes else "IFNULL(p.notes, '') = ''")
+        if duplicates:
+            conditions.append("""EXISTS (
+                SELECT 1 FROM passwords d WHERE d.website = p.website AND d.username = p.username AND d.id <> p.id
+            )""")
+        key = _SORT_EXPRESSIONS[sort]
+        op, direction = ("<", "DESC") if descending else (">", "ASC")
+        if after is not None:
+            if sort == "id":
+                conditions.append(f"p.id {op} ?")
+                params.append(after[1])
+            else:
+                # 与 (key, id) > (?, ?) 等价；写成这样索引可以直接定位到 after，排序表达式为函数时也是如此
+                conditions.append(f"{key} {op}= ? AND ({key} {op} ? OR p.id {op} ?)")
+                params += [after[0], after[0], after[1]]
+        order = f"p.id {direction}" if sort == "id" else f"{key} {direction}, p.id {direction}"
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return self._wrap_rows(self.execute_query(f"""
+        SELECT p.id, p.website, p.username, p.password, p.notes FROM passwords p
+        {where}
+        ORDER BY {order} LIMIT ?
+        """, tuple(params) + (limit,), fetch="all"))
+
+    def update_password(self, record_id, **kwargs):
+        """更新密码记录，返回更新后的记录。修改后与已有记录重复时抛出 ValueError"""
+        if not kwargs:
+            return None
+
+        if kwargs.keys() & {"website", "username", "password"}:
+            # 去重键由三个字段共同决定，需要用未修改的字段补全
+            current = self._wrap_row(self.execute_query(
+                f"SELECT {SELECT_COLUMNS} FROM passwords WHERE id=?", (record_id,), fetch="one"
+            ))
+            if current is None:
+                return None
+            values = tuple(kwargs.get(column, reveal(current[i])) for i, column in
+                           ((1, "website"), (2, "username"), (3, "password")))
+            kwargs["dedup_key"] = self._fingerprinter()(values)
+
+        set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
+        values = [self._seal_value(value, key) if key in ("password", "notes") else value
+                  for key, value in kwargs.items()]
+        values.append(record_id)
+        
+        query = f"""
+        UPDATE passwords 
+        SET {set_clause}
+        WHERE id = ?
+        """
+        try:
+            with self.conn:
+                self.execute_query(query, values)
+        except sqlite3.IntegrityError:
+            raise ValueError("已存在网站、用户名和密码都相同的记录") from None
+        return self._wrap_row(
+            self.execute_query(f"SELECT {SELECT_COLUMNS} FROM passwords WHERE id=?", (record_id,), fetch="one"))
+
+    def search_passwords(self, keyword, fields=("website",)):
+        """
+        根据关键词模糊搜索，fields 可包含 website、username、notes。
+        启用全文索引且关键词不少于 3 个字符时按相关度排序，否则回退为 LIKE 扫描。
+        """
+        fields = [f for f in fields if f in SEARCH_FIELDS]
+        if self.is_encrypted():
+            # 加密存储时备注为密文，不参与搜索
+            fields = [f for f in fields if f != "notes"]
+        fields = fields or ["website"]
+        if self.fts_enabled and len(keyword) >= 3:
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            query = """
+            SELECT p.id, p.website, p.username, p.password, p.notes FROM passwords_fts
+            JOIN passwords p ON p.id = passwords_fts.rowid
+            WHERE passwords_fts MATCH ?
+            ORDER BY passwords_fts.rank, p.website ASC
+            """
+            params = ("{" + " ".join(fields) + "}: " + phrase,)
+        else:
+            where = " OR ".join(f"{field} LIKE ?" for field in fields)
+            query = f"""
+            SELECT {SELECT_COLUMNS} FROM passwords 
+            WHERE {where}
+            ORDER BY website ASC
+            """
+            params = (f"%{keyword}%",) * len(fields)
+        return self._wrap_rows(self.execute_query(query, params, fetch="all"))
+    
+    def stats(self):
+        """密码库概况：记录数、加密状态、结构版本、日志模式、全文索引和文件大小"""
+        count = self.execute_query("SELECT COUNT(*) FROM passwords", fetch="one")[0]
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        return {
+            "records": count,
+            "encrypted": self.is_encrypted(),
+            "unlocked": self.is_unlocked(),
+            "schema_version": schema_version(self.conn),
+            "journal_mode": self.conn.execute("PRAGMA journal_mode").fetchone()[0],
+            "fts": self.fts_enabled,
+            "size_bytes": page_size * page_count,
+        }
+
+    def iter_passwords(self, chunk_size=EXPORT_CHUNK_SIZE, reveal_fields=False):
+        """按网站排序逐批读取全部记录，避免一次性载入内存。reveal_fields 为 True 时返回解密后的明文"""
+        if reveal_fields:
+            self._require_vault()
+        cursor = self.conn.execute(f"SELECT {SELECT_COLUMNS} FROM passwords ORDER BY website ASC")
+        while True:
+            with profiler.span("export.fetch"):
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                rows = self._wrap_rows(rows)
+                if reveal_fields and self.is_encrypted():
+                    rows = [tuple(reveal(value) for value in row) for row in rows]
+            yield from rows
+
+    # 健康检查
+    def audit_passwords(self, progress=None):
+        """
+        增量健康检查：只为新增和修改过密码的记录重新评分，结果保存在 password_audit 表中，返回重新评分的记录数。
+        密文改变而明文不变的记录（content_hash 相同）只清除过期标记。
+        progress(已检查条数, 待检查条数) 定期被调用，抛出 OperationCancelled 可中止，已完成的批次会保留。
+        """
+        from .strength import entropy, skeleton
+        vault = self._require_vault()
+        fp = self._fingerprinter()
+        audited = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM password_audit").fetchone()[0]
+        # 修改过密码的记录，以及 id 大于已检查的最大 id 的新记录；新记录按 id 顺序检查，中止后仍满足这个条件
+        rows = self.conn.execute("""
+        SELECT p.id, p.password, a.content_hash FROM password_audit a JOIN passwords p ON p.id = a.id
+        WHERE a.stale
+        """).fetchall()
+        rows += self.conn.execute(
+            "SELECT id, password, NULL FROM passwords WHERE id > ? ORDER BY id", (audited,)
+        ).fetchall()
+        rescored = 0
+        for batch in _batched(_with_progress(rows, progress, len(rows)), IMPORT_BATCH_SIZE):
+            results, unchanged, scores = [], [], {}
+            for record_id, password, previous in batch:
+                if vault is not None and isinstance(password, bytes):
+                    password = vault.open(password, "password")
+                content_hash = fp((password,))
+                if content_hash == previous:
+                    unchanged.append((record_id,))
+                    continue
+                # 同一批中重复使用的密码只评分一次
+                if password not in scores:
+                    scores[password] = (fp(("similar", skeleton(password))), entropy(password), len(password))
+                results.append((record_id, content_hash) + scores[password])
+            with self.conn:
+                self.conn.executemany("""
+                INSERT OR REPLACE INTO password_audit (id, content_hash, similar_hash, bits, length, stale)
+                VALUES (?, ?, ?, ?, ?, 0)
+                """, results)
+                self.conn.executemany("UPDATE password_audit SET stale = 0 WHERE id = ?", unchanged)
+            rescored += len(results)
+        return rescored
+
+    def audit_summary(self):
+        """健康检查结果的汇总：已检查和待检查的记录数，以及各类问题的记录数"""
+        from .strength import MEDIUM_BITS, SHORT_LENGTH
+        audited, stale, weak, short = self.conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(stale), 0), COALESCE(SUM(bits < {MEDIUM_BITS}), 0),
+               COALESCE(SUM(length < {SHORT_LENGTH}), 0)
+        FROM password_audit
+        """).fetchone()
+        high = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM password_audit").fetchone()[0]
+        new = self.conn.execute("SELECT COUNT(*) FROM passwords WHERE id > ?", (high,)).fetchone()[0]
+        counts = {
+            issue: self.conn.execute(
+                f"SELECT COUNT(*) FROM password_audit a WHERE {_audit_condition(issue)}"
+            ).fetchone()[0]
+            for issue in ("reused", "similar")
+        }
+        return {"audited": audited, "pending": stale + new, "weak": weak, "short": short, **counts}
+
+    def get_audit_page(self, issue, after=None, limit=PAGE_SIZE):
+        """
+        按 (website, id) 键集分页获取存在某一问题的记录，issue 为 AUDIT_ISSUES 之一，
+        after 与 get_passwords_page 相同。只包含已检查的记录，需要先执行 audit_passwords()。
+        """
+        if issue not in AUDIT_ISSUES:
+            raise ValueError(f"Unsupported audit issue: {issue}")
+        where = _audit_condition(issue)
+        params = ()
+        if after is not None:
+            where += " AND (p.website, p.id) > (?, ?)"
+            params = (after[0], after[1])
+        return self._wrap_rows(self.execute_query(f"""
+        SELECT p.id, p.website, p.username, p.password, p.notes
+        FROM passwords p JOIN password_audit a ON a.id = p.id
+        WHERE {where}
+        ORDER BY p.website ASC, p.id ASC LIMIT ?
+        """, params + (limit,), fetch="all"))
+
+    def find_breached(self, index=None, progress=None):
+        """
+        用离线的泄露密码索引检查全部密码，返回密码出现在索引中的记录。
+        index 为 BreachIndex 或索引文件路径，默认为 settings.breach_index；每批中相同的密码只查询一次。
+        progress(已检查条数, 总条数) 定期被调用，抛出 OperationCancelled 可中止。
+        """
+        index = index or self.settings.breach_index
+        if not index:
+            raise ValueError("未设置泄露密码索引")
+        from .breach import BreachIndex
+        owned = not isinstance(index, BreachIndex)
+        if owned:
+            index = BreachIndex(index)
+        try:
+            self._require_vault()
+            total = self.conn.execute("SELECT COUNT(*) FROM passwords").fetchone()[0] if progress else None
+            rows = _with_progress(self.iter_passwords(reveal_fields=True), progress, total)
+            breached = []
+            for batch in _batched(rows, EXPORT_CHUNK_SIZE):
+                hits = index.check([row[3] for row in batch])
+                breached.extend(row[0] for row, hit in zip(batch, hits) if hit)
+        finally:
+            if owned:
+                index.close()
+        # 返回与其他查询相同的记录格式（加密字段为 SealedField）
+        records = []
+        for ids in _batched(breached, 500):
+            records += self.conn.execute(
+                f"SELECT {SELECT_COLUMNS} FROM passwords WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()
+        records.sort(key=lambda row: (row[1], row[0]))
+        return self._wrap_rows(records)
+
+    def audit_strength(self, weakest_count=10, progress=None):
+        """
+        先执行增量健康检查，再汇总全部密码的强度，返回 (StrengthDistribution, 最弱的记录)。
+        最弱的记录按熵从低到高排列，每项为 (比特数, id, website, username)，不包含密码本身。
+        """
+        from .strength import StrengthDistribution
+        self.audit_passwords(progress)
+        distribution = StrengthDistribution()
+        for bits, times in self.conn.execute("SELECT bits, COUNT(*) FROM password_audit GROUP BY bits"):
+            distribution.add(bits, times)
+        weakest = self.conn.execute("""
+        SELECT a.bits, p.id, p.website, p.username FROM password_audit a JOIN passwords p ON p.id = a.id
+        ORDER BY a.bits ASC, p.id ASC LIMIT ?
+        """, (weakest_count,)).fetchall()
+        return distribution, weakest
+
+    def export_passwords(self, target, fmt, passphrase=None, progress=None, kdf_params=None):
+        """
+        流式导出全部密码，内存占用与密码库大小无关。target 为文件路径或可写的二进制流（如标准输出），
+        相对路径相对于 settings.export_dir。AES 格式需要提供口令，kdf_params 默认取自设置。
+        progress(已导出条数, 总条数) 定期被调用，抛出 OperationCancelled 可中止导出，未完成的文件会被删除。
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        if fmt == 'aes' and not passphrase:
+            raise ValueError("导出加密备份需要设置口令")
+        self._require_vault()
+        total = self.conn.execute("SELECT COUNT(*) FROM passwords").fetchone()[0] if progress else None
+        rows = _with_progress(self.iter_passwords(reveal_fields=True), progress, total)
+        if not isinstance(target, (str, os.PathLike)):
+            self._export_to_stream(target, fmt, rows, passphrase, kdf_params)
+            return
+        target = os.path.join(self.settings.export_dir, target)
+        try:
+            with open(target, 'wb') as f:
+                self._export_to_stream(f, fmt, rows, passphrase, kdf_params)
+        except BaseException:
+            if os.path.exists(target):
+                os.remove(target)
+            raise
+
+    def _export_to_stream(self, f, fmt, rows, passphrase, kdf_params):
+        if fmt == 'aes':
+            self._export_to_aes(f, rows, passphrase, kdf_params)
+            return
+        with _text_stream(f, newline='' if fmt == 'csv' else None) as text:
+            if fmt == 'csv':
+                self._export_to_csv(text, rows)
+            elif fmt == 'json':
+                self._export_to_json(text, rows)
+            else:
+                self._export_to_ndjson(text, rows)
+
+    def _export_to_csv(self, f, rows):
+        writer = csv.writer(f)
+        writer.writerow(['ID', 'Website', 'Username', 'Password', 'Notes'])
+        for batch in _batched(rows, EXPORT_CHUNK_SIZE):
+            writer.writerows(batch)
+
+    def _export_to_json(self, f, rows):
+        for chunk in _iter_json_array(rows):
+            f.write(chunk)
+
+    def _export_to_ndjson(self, f, rows):
+        for batch in _batched(rows, EXPORT_CHUNK_SIZE):
+            f.write("".join(json.dumps(_row_to_entry(row)) + "\n" for row in batch))
+    
+    def _export_to_aes(self, f, rows, passphrase, kdf_params=None):
+        # 使用会话盐，多次导出时只需运行一次 KDF
+        params = kdf_params or self.settings.kdf_params
+        salt = self.keys.session_salt
+        key = self.keys.derive(passphrase, salt, params)
+        writer = BackupWriter(f, None, kdf_params=params, salt=salt, key=key.key)
+        for row in rows:
+            writer.add(_row_to_entry(row))
+        writer.close()
+    
+    def import_passwords(self, source, fmt, passphrase=None, progress=None, override=None):
+        """
+        从文件导入密码，返回导入统计信息。source 为文件路径或可读的二进制流（如标准输入），
+        新版 AES 备份需要随机访问，只能从文件路径导入且需要提供口令。
+        override 默认取自设置，progress 见 bulk_import。
+        """
+        if fmt == 'csv':
+            rows = self._iter_csv_rows(source)
+        elif fmt == 'json':
+            rows = self._iter_json_rows(source)
+        elif fmt == 'ndjson':
+            rows = self._iter_ndjson_rows(source)
+        elif fmt == 'aes':
+            rows = self._iter_aes_rows(source, passphrase)
+        else:
+            raise ValueError(f"Unsupported format: {fmt}")
+        if override is None:
+            override = self.settings.import_override
+        return self.bulk_import(rows, override, progress=progress)
+
+    def bulk_import(self, rows, override=True, batch_size=IMPORT_BATCH_SIZE, progress=None):
+        """
+        批量导入记录：先分批写入临时暂存表（同时计算去重键），再用一条 INSERT ... SELECT ... ON CONFLICT
+        按集合完成去重和插入，重复判断走去重键上的唯一索引，开销随记录数线性增长。整个过程只提交一次事务。
+            override=True  -> 与库中条目（或文件中更早的条目）重复时更新其备注（覆盖）
+            override=False -> 跳过库中已存在的条目（保留原条目）
+        每写入一批调用一次 progress(已读取条数, None)，抛出 OperationCancelled 可中止导入，已写入的部分全部回滚。
+        返回 {"rows", "inserted", "seconds", "rows_per_sec", "peak_rss_kb"}
+        """
+        fp = self._fingerprinter()
+        seal = self._seal_value
+        on_conflict = ("DO UPDATE SET notes = excluded.notes WHERE notes IS NOT excluded.notes"
+                       if override else "DO NOTHING")
+        start = time.perf_counter()
+        total = 0
+        cursor = self.conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS temp.import_staging")
+        cursor.execute("""
+        CREATE TEMP TABLE import_staging (
+            seq INTEGER PRIMARY KEY,
+            website TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password NOT NULL,
+            notes,
+            dedup_key BLOB NOT NULL
+        )
+        """)
+        try:
+            with self.conn:
+                # AUTOINCREMENT 保证新记录的 ID 大于导入前的最大 ID
+                last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM passwords").fetchone()[0]
+                for batch in _batched(rows, batch_size):
+                    with profiler.span("import.stage"):
+                        cursor.executemany(
+                            "INSERT INTO temp.import_staging (website, username, password, notes, dedup_key) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            [(website, username, seal(password, "password"), seal(notes, "notes"),
+                              fp((website, username, password)))
+                             for website, username, password, notes in batch]
+                        )
+                    total += len(batch)
+                    if progress:
+                        progress(total, None)
+
+                # 单条语句写入全部记录，全文索引只在语句结束时刷新一次
+                with profiler.span("import.merge"):
+                    cursor.execute(f"""
+                    INSERT INTO passwords (website, username, password, notes, dedup_key)
+                    SELECT website, username, password, notes, dedup_key FROM temp.import_staging
+                    WHERE true ORDER BY seq
+                    ON CONFLICT (dedup_key) {on_conflict}
+                    """)
+                inserted = cursor.execute("SELECT COUNT(*) FROM passwords WHERE id > ?", (last_id,)).fetchone()[0]
+        finally:
+            cursor.execute("DROP TABLE IF EXISTS temp.import_staging")
+
+        seconds = time.perf_counter() - start
+        self.last_import_stats = {
+            "rows": total,
+            "inserted": inserted,
+            "seconds": seconds,
+            "rows_per_sec": total / seconds if seconds > 0 else 0.0,
+            "peak_rss_kb": _peak_rss_kb()
+        }
+        return self.last_import_stats
+
+    def _iter_csv_rows(self, source):
+        with _open_source(source) as raw, _text_stream(raw, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)  # 跳过表头
+            skipped = 0
+            for row in reader:
+                if len(row) < 4:
+                    skipped += 1
+                    continue
+                notes = row[4] if len(row) >= 5 else ""
+                yield (row[1], row[2], row[3], notes)
+            if skipped:
+                self.report(WARNING, f"跳过了 {skipped} 行列数不足的 CSV 数据")
+
+    def _iter_json_rows(self, source):
+        with _open_source(source) as raw, _text_stream(raw) as f:
+            chunks = iter(lambda: f.read(READ_CHUNK_SIZE), "")
+            yield from _entries_to_rows(_iter_json_entries(chunks))
+
+    def _iter_ndjson_rows(self, source):
+        with _open_source(source) as raw, _text_stream(raw) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield from _entries_to_rows([json.loads(line)])
+
+    def _iter_aes_rows(self, source, passphrase=None):
+        """读取 AES 备份：新版容器并行解密各数据块，旧版文件走 _iter_legacy_aes_rows"""
+        if not isinstance(source, (str, os.PathLike)):
+            # 流无法随机访问，只支持旧版格式
+            yield from self._iter_legacy_aes_rows(source)
+            return
+        if not is_container(source):
+            yield from self._iter_legacy_aes_rows(source)
+            return
+        if not passphrase:
+            raise ValueError("该备份文件需要口令才能导入")
+        reader = BackupReader(source, passphrase, key_manager=self.keys)
+        yield from _entries_to_rows(reader.iter_entries())
+
+    def _iter_legacy_aes_rows(self, source):
+        """旧版 AES 文件（IV + CBC 密文）：按固定大小分块解密，解密结果直接交给增量 JSON 解析器"""
+        from Crypto.Cipher import AES
+        from Crypto.Util.Padding import unpad
+        with _open_source(source) as f:
+            # 读取前16字节作为 IV
+            iv = f.read(16)  
+            key = b'Sixteen byte key'
+            cipher = AES.new(key, AES.MODE_CBC, iv)
+            decoder = codecs.getincrementaldecoder('utf-8')()
+
+            def plaintext_chunks():
+                # 始终保留最后一个分组，读到文件末尾后再去除填充
+                held = b""
+                while True:
+                    block = f.read(READ_CHUNK_SIZE)
+                    if not block:
+                        break
+                    data = held + cipher.decrypt(block)
+                    held = data[-AES.block_size:]
+                    text = decoder.decode(data[:-AES.block_size])
+                    if text:
+                        yield text
+                yield decoder.decode(unpad(held, AES.block_size), final=True)
+
+            yield from _entries_to_rows(_iter_json_entries(plaintext_chunks()))
+
+    def __del__(self):
+        if self.conn:
+            self.conn.close()
+
+
+# 启用性能分析时为公开方法计时，逐条记录调用的简单判断除外，以免事件被它们占满
+profiler.register(DatabaseManager, "db", exclude=("is_encrypted", "is_unlocked"))
@@ -0,0 +1,113 @@
+"""
+字段级加密：启用加密存储后，password 和 notes 列保存 AES-OCB 密文，
+读取时返回 SealedField 句柄，只有在显示或复制时才解密。
+字段很短，每个字段单独创建加密器的开销占主导，OCB 的初始化开销远小于 GCM。
+"""
+import hashlib
+import os
+from .profiling import profiler
+
+# 加密字段在表格中的显示内容
+MASK = "••••••"
+# 加密的列
+SEALED_COLUMNS = ("password", "notes")
+# 用于校验口令的已知明文
+VERIFIER_TEXT = "SafeKey vault"
+
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+
+
+def fingerprint(values, key=None):
+    """
+    计算 (网站, 用户名, 密码) 等字段组合的摘要，作为去重键。
+    加密存储时使用主密钥做带密钥的 BLAKE2b，摘要不会泄露明文。
+    """
+    data = "\x1f".join(map(str, values)).encode('utf-8')
+    if key is None:
+        return hashlib.blake2b(data, digest_size=16).digest()
+    return hashlib.blake2b(data, key=key, digest_size=16, person=b"SafeKey dedup").digest()
+
+
+class VaultLockedError(ValueError):
+    """密码库已加密，但尚未解锁或密钥已超时清除"""
+
+
+class VaultCipher:
+    """使用密码库主密钥加解密单个字段，密文格式为 nonce | 密文 | tag，列名作为附加数据"""
+
+    def __init__(self, key_buffer, touch=None):
+        self.key_buffer = key_buffer
+        self.touch = touch
+
+    def is_alive(self):
+        try:
+            self.key_buffer.key
+        except ValueError:
+            return False
+        return True
+
+    def _key(self):
+        try:
+            key = self.key_buffer.key
+        except ValueError:
+            raise VaultLockedError("密码库已锁定，请先解锁") from None
+        if self.touch:
+            self.touch()
+        return key
+
+    def fingerprint(self, values):
+        return fingerprint(values, self._key())
+
+    def seal(self, text, column):
+        # pycryptodome 导入较慢，用到时才导入（已导入后开销可忽略）
+        from Crypto.Cipher import AES
+        nonce = os.urandom(_NONCE_SIZE)
+        cipher = AES.new(self._key(), AES.MODE_OCB, nonce=nonce)
+        cipher.update(column.encode('ascii'))
+        ciphertext, tag = cipher.encrypt_and_digest(text.encode('utf-8'))
+        return nonce + ciphertext + tag
+
+    def open(self, blob, column):
+        from Crypto.Cipher import AES
+        blob = bytes(blob)
+        cipher = AES.new(self._key(), AES.MODE_OCB, nonce=blob[:_NONCE_SIZE])
+        cipher.update(column.encode('ascii'))
+        try:
+            plaintext = cipher.decrypt_and_verify(blob[_NONCE_SIZE:-_TAG_SIZE], blob[-_TAG_SIZE:])
+        except ValueError:
+            raise VaultLockedError("口令错误或数据已损坏") from None
+        return plaintext.decode('utf-8')
+
+
+class SealedField:
+    """
+    加密字段的句柄。str() 只返回掩码，reveal() 时才通过所属数据库当前的密钥解密，
+    因此锁定期间读出的句柄在解锁后依然可用。
+    """
+    __slots__ = ("blob", "column", "owner")
+
+    def __init__(self, blob, column, owner):
+        self.blob = blob
+        self.column = column
+        self.owner = owner
+
+    def reveal(self):
+        vault = self.owner.vault
+        if vault is None:
+            raise VaultLockedError("密码库已锁定，请先解锁")
+        return vault.open(self.blob, self.column)
+
+    def __str__(self):
+        return MASK
+
+    def __repr__(self):
+        return f"SealedField({self.column})"
+
+
+def reveal(value):
+    """将可能是 SealedField 的值转换为明文"""
+    return value.reveal() if isinstance(value, SealedField) else value
+
+
+profiler.register(VaultCipher, "crypto", ("seal", "open", "fingerprint"))
@@ -0,0 +1,211 @@
+"""
+批量密码生成：随机数全部来自 os.urandom，每批只读取一次随机字节。
+字节到字符的映射使用拒绝采样：字符集大小为 n 时，只保留小于 256 - 256 % n 的字节并对 n 取模，
+每个字符的概率完全相同，没有取模偏差。映射和丢弃都由 bytes.translate 在 C 中完成，不需要逐字节的 Python 循环。
+"""
+import os
+import secrets
+import string
+from collections import deque
+from itertools import accumulate
+from .profiling import profiler
+
+SYMBOLS = "@#$%&*+-="
+# 每批生成的密码数，决定一次读取的随机字节数和写文件的粒度
+GENERATE_BATCH_SIZE = 4096
+# 多进程生成时每个分片的密码数
+SHARD_SIZE = 50000
+# generate_parallel 中连续多少个分片的密码全部被 reject 丢弃时放弃
+REJECT_LIMIT = 10
+
+
+def build_charset(upper=True, lower=True, digits=True, symbols=True, exclude=""):
+    """按选择的字符类别组成字符集，去掉 exclude 中的字符"""
+    chars = ""
+    if upper:
+        chars += string.ascii_uppercase
+    if lower:
+        chars += string.ascii_lowercase
+    if digits:
+        chars += string.digits
+    if symbols:
+        chars += SYMBOLS
+    chars = "".join(c for c in chars if c not in set(exclude))
+    if not chars:
+        raise ValueError("没有有效字符可供生成密码")
+    return chars
+
+
+class UniformBytes:
+    """从 os.urandom 批量产生 [0, n) 内均匀分布的值，值映射为 alphabet 中的字节"""
+
+    def __init__(self, alphabet):
+        if not 0 < len(alphabet) <= 256:
+            raise ValueError("字符集大小必须在 1 到 256 之间")
+        n = len(alphabet)
+        self.limit = 256 - 256 % n
+        self.table = bytes(alphabet[b % n] for b in range(256))
+        self.rejected = bytes(range(self.limit, 256))
+
+    def draw(self, count):
+        """返回 count 个字节，每个字节都是 alphabet 中等概率选出的一个"""
+        chunks = []
+        have = 0
+        while have < count:
+            need = count - have
+            # 按接受率多读一些，通常一次就够
+            chunk = os.urandom(need * 256 // self.limit + 64).translate(self.table, self.rejected)
+            chunks.append(chunk)
+            have += len(chunk)
+        return b"".join(chunks)[:count]
+
+
+class PasswordGenerator:
+    """
+    按字符集和长度范围批量生成密码。
+    include 中的每个字符串插入到随机位置，长度范围包含这些字符串，与原高级密码生成器的规则一致。
+    """
+
+    def __init__(self, charset, min_length, max_length, include=(), batch_size=GENERATE_BATCH_SIZE):
+        try:
+            alphabet = charset.encode('ascii')
+        except UnicodeEncodeError:
+            raise ValueError("字符集只能包含 ASCII 字符") from None
+        if not alphabet:
+            raise ValueError("没有有效字符可供生成密码")
+        if min_length > max_length:
+            min_length, max_length = max_length, min_length
+        self.charset = charset
+        self.include = [s for s in include if s]
+        included = sum(len(s) for s in self.include)
+        self.min_length = max(min_length - included, 1)
+        self.max_length = max_length - included
+        if self.max_length < 1:
+            raise ValueError("密码长度过小，无法包含给定的字符串")
+        if self.max_length - self.min_length + 1 > 256:
+            raise ValueError("密码长度范围过大")
+        self.batch_size = batch_size
+        self._chars = UniformBytes(alphabet)
+        self._lengths = UniformBytes(bytes(range(self.min_length, self.max_length + 1)))
+
+    def space(self):
+        """不同随机部分的数量，即最多能生成多少个互不相同的密码（不计插入位置的变化）"""
+        n = len(self.charset)
+        return sum(n ** length for length in range(self.min_length, self.max_length + 1))
+
+    def batch(self, count):
+        """生成 count 个密码：长度和全部字符各只读取一次随机字节"""
+        lengths = self._lengths.draw(count)
+        text = self._chars.draw(sum(lengths)).decode('ascii')
+        ends = accumulate(lengths)
+        passwords = [text[end - length:end] for length, end in zip(lengths, ends)]
+        if self.include:
+            passwords = [self._insert(p) for p in passwords]
+        return passwords
+
+    def _insert(self, password):
+        # 为每个字符串在随机字符部分中分别选择插入位置，从后往前插入
+        points = sorted(((secrets.randbelow(len(password) + 1), s) for s in self.include),
+                        key=lambda x: x[0], reverse=True)
+        for pos, s in points:
+            password = password[:pos] + s + password[pos:]
+        return password
+
+    def iter_batches(self, count):
+        """按批产出共 count 个密码"""
+        while count > 0:
+            size = min(count, self.batch_size)
+            yield self.batch(size)
+            count -= size
+
+    def generate(self, count):
+        return [p for batch in self.iter_batches(count) for p in batch]
+
+    def write(self, f, count, progress=None):
+        """将 count 个密码逐批写入文本文件 f，见 write_batches"""
+        return write_batches(f, self.iter_batches(count), count, progress)
+
+
+def write_batches(f, batches, total=None, progress=None):
+    """
+    将逐批产出的密码写入文本文件 f，每行一个，内存占用与总数无关。
+    每写入一批调用一次 progress(已写入数, 总数)，返回写入的密码数。
+    """
+    done = 0
+    for batch in batches:
+        f.write("\n".join(batch))
+        f.write("\n")
+        done += len(batch)
+        if progress:
+            progress(done, total)
+    return done
+
+
+def _drop_seen(batch, seen):
+    """去掉 batch 中已出现过的密码并记录新密码的哈希值。通常没有重复，用集合运算整体判断，不逐个检查"""
+    hashes = list(map(hash, batch))
+    fresh = set(hashes)
+    if len(fresh) == len(hashes) and seen.isdisjoint(fresh):
+        seen |= fresh
+        return batch
+    result = []
+    for password, h in zip(batch, hashes):
+        if h not in seen:
+            seen.add(h)
+            result.append(password)
+    return result
+
+
+def generate_parallel(generator, count, unique=True, workers=None, shard_size=SHARD_SIZE, reject=None):
+    """
+    将 count 个密码分成若干分片在进程池中生成，按分片顺序逐批产出（每批一个列表）。
+    每个进程直接读取系统 CSPRNG（os.urandom），进程之间没有共享的随机数状态，fork 出的进程也不会产生相同的序列。
+    unique 为 True 时在主进程中跨分片去重，丢弃的重复密码由追加的分片补足。
+    reject(批) 返回与批中密码对应的布尔值，为 True 的密码（如出现在泄露密码库中）同样被丢弃并补足；
+    连续 REJECT_LIMIT 个分片全部被丢弃时抛出 ValueError。
+    同时只有 2 倍进程数的分片在途，提前结束迭代（如取消）时尚未开始的分片被取消。
+    数量不超过一个分片或只有一个进程时直接在当前进程中生成。
+    """
+    if unique and count > generator.space():
+        raise ValueError("当前选项下可生成的不同密码数量不足")
+    workers = workers or os.cpu_count() or 1
+    executor = None
+    if workers > 1 and count > shard_size:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # 在多线程的进程（如界面）中 fork 可能死锁，工作进程由 forkserver 或 spawn 启动
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+    # 只保存密码的哈希值：哈希碰撞只会多丢弃一个实际不重复的密码，不会放过重复的密码
+    seen = set()
+    window = deque()
+    pending = done = rejected_shards = 0
+    try:
+        while done < count:
+            while done + pending < count and len(window) < workers * 2:
+                size = min(shard_size, count - done - pending)
+                future = executor.submit(generator.generate, size) if executor else None
+                window.append((size, future))
+                pending += size
+            size, future = window.popleft()
+            pending -= size
+            # 多进程生成时子进程中的区间不被记录，这里记录主进程等待每个分片的时间
+            with profiler.span("generator.shard"):
+                batch = future.result() if future else generator.generate(size)
+            if reject is not None:
+                batch = [p for p, hit in zip(batch, reject(batch)) if not hit]
+                rejected_shards = 0 if batch else rejected_shards + 1
+                if rejected_shards >= REJECT_LIMIT:
+                    raise ValueError("当前选项下生成的密码都出现在泄露密码库中，请增加长度或字符种类")
+            if unique:
+                batch = _drop_seen(batch, seen)
+            batch = batch[:count - done]
+            done += len(batch)
+            if batch:
+                yield batch
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+profiler.register(PasswordGenerator, "generator", ("batch", "generate"))
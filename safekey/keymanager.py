@@ -0,0 +1,217 @@
+"""
+密钥管理：口令派生的密钥在本次会话中只计算一次，缓存在锁定内存中，空闲超时后清零并移除。
+"""
+import ctypes
+import functools
+import hashlib
+import hmac
+import os
+import sys
+import threading
+import time
+from .backupcontainer import DEFAULT_KDF_PARAMS, derive_key
+from .profiling import profiler
+
+# 默认空闲超时（秒），0 表示不缓存
+DEFAULT_IDLE_TIMEOUT = 300
+
+
+@functools.lru_cache(maxsize=None)
+def _libc():
+    # ctypes.util 会导入 subprocess 等模块，第一次锁定内存时才查找 libc
+    import ctypes.util
+    name = ctypes.util.find_library("c")
+    return ctypes.CDLL(name, use_errno=True) if name else None
+
+
+class SecureBuffer:
+    """
+    存放密钥的可变缓冲区：尽量锁定在物理内存中（mlock/VirtualLock，防止被换出），释放时清零。
+    注意 hashlib 等接口返回的 bytes 无法清零，调用方应尽快丢弃这些中间结果。
+    """
+
+    def __init__(self, data):
+        self._buf = bytearray(data)
+        self._size = len(self._buf)
+        self._view = (ctypes.c_char * self._size).from_buffer(self._buf)
+        self._address = ctypes.addressof(self._view)
+        self.locked = self._lock()
+
+    def _lock(self):
+        try:
+            if sys.platform == "win32":
+                return bool(ctypes.windll.kernel32.VirtualLock(
+                    ctypes.c_void_p(self._address), ctypes.c_size_t(self._size)))
+            libc = _libc()
+            return bool(libc) and libc.mlock(ctypes.c_void_p(self._address), ctypes.c_size_t(self._size)) == 0
+        except (OSError, AttributeError):
+            return False
+
+    def _unlock(self):
+        try:
+            if sys.platform == "win32":
+                ctypes.windll.kernel32.VirtualUnlock(ctypes.c_void_p(self._address), ctypes.c_size_t(self._size))
+            else:
+                libc = _libc()
+                if libc:
+                    libc.munlock(ctypes.c_void_p(self._address), ctypes.c_size_t(self._size))
+        except (OSError, AttributeError):
+            pass
+
+    @property
+    def key(self):
+        """供加密接口使用的只读视图"""
+        if self._buf is None:
+            raise ValueError("密钥已被清除")
+        return memoryview(self._buf).toreadonly()
+
+    def wipe(self):
+        if self._buf is None:
+            return
+        ctypes.memset(self._address, 0, self._size)
+        if self.locked:
+            self._unlock()
+        del self._view
+        self._buf = None
+
+    def __del__(self):
+        self.wipe()
+
+
+class KeyManager:
+    """
+    会话级密钥缓存。
+    以 (盐, KDF 参数) 为键缓存派生出的密钥，同时保存口令校验值：同一口令再次使用时直接返回缓存，
+    换了口令则重新派生。每次使用都会刷新空闲时间，超过空闲超时后全部密钥被清零。
+    """
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        # 本次会话导出备份时统一使用的盐，使多次导出可以复用同一个密钥；各备份由文件头中随机的文件 ID 区分
+        self.session_salt = os.urandom(16)
+        self._entries = {}
+        self._lock = threading.RLock()
+        self._timer = None
+        self._last_used = time.monotonic()
+
+    def set_idle_timeout(self, seconds):
+        with self._lock:
+            self.idle_timeout = seconds
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if seconds <= 0:
+                # 不再缓存备份密钥，只保留密码库主密钥
+                for cache_key, (_, buffer, persist) in list(self._entries.items()):
+                    if not persist:
+                        buffer.wipe()
+                        del self._entries[cache_key]
+            self._schedule(seconds)
+
+    @staticmethod
+    def _cache_key(salt, kdf_params):
+        params = dict(DEFAULT_KDF_PARAMS, **(kdf_params or {}))
+        return (bytes(salt), params["log2_n"], params["r"], params["p"]), params
+
+    def derive(self, passphrase, salt, kdf_params=None, persist=False):
+        """
+        返回口令在给定盐和参数下派生的密钥（SecureBuffer），命中缓存时不再运行 KDF。
+        空闲超时为 0 时默认不缓存；persist 为 True 时（如密码库主密钥）总是缓存。
+        """
+        cache_key, params = self._cache_key(salt, kdf_params)
+        check = hmac.new(bytes(salt), passphrase.encode('utf-8'), hashlib.sha256).digest()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and hmac.compare_digest(entry[0], check):
+                self.touch()
+                return entry[1]
+
+        buffer = SecureBuffer(derive_key(passphrase, salt, params["log2_n"], params["r"], params["p"]))
+        with self._lock:
+            if persist or self.idle_timeout > 0:
+                old = self._entries.pop(cache_key, None)
+                if old:
+                    old[1].wipe()
+                self._entries[cache_key] = (check, buffer, persist)
+                self.touch()
+                self._schedule(self.idle_timeout)
+        return buffer
+
+    def get(self, salt, kdf_params=None):
+        """返回已缓存的密钥，不存在（未解锁或已超时清除）时返回 None"""
+        cache_key, _ = self._cache_key(salt, kdf_params)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        self.touch()
+        return entry[1]
+
+    def has(self, salt, kdf_params=None):
+        """是否缓存了指定的密钥，不刷新空闲时间"""
+        cache_key, _ = self._cache_key(salt, kdf_params)
+        return cache_key in self._entries
+
+    def forget(self, salt, kdf_params=None):
+        """清零并移除指定的密钥，如口令校验失败时"""
+        cache_key, _ = self._cache_key(salt, kdf_params)
+        with self._lock:
+            entry = self._entries.pop(cache_key, None)
+        if entry:
+            entry[1].wipe()
+
+    def touch(self):
+        """记录一次密钥使用，只更新时间戳，开销可忽略"""
+        self._last_used = time.monotonic()
+
+    def evict(self):
+        """清零并移除全部缓存的密钥"""
+        with self._lock:
+            for _, buffer, _ in self._entries.values():
+                buffer.wipe()
+            self._entries.clear()
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _schedule(self, delay):
+        if self._timer or not self._entries or self.idle_timeout <= 0:
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            idle = time.monotonic() - self._last_used
+            if idle >= self.idle_timeout:
+                self.evict()
+            else:
+                # 期间有过使用，按剩余时间重新计时
+                self._schedule(self.idle_timeout - idle)
+
+
+def calibrate(target_seconds=0.5, r=8, p=1, min_log2_n=14, max_log2_n=22):
+    """
+    在当前机器上测量 scrypt 耗时，返回耗时不超过 target_seconds 的最大 log2_n。
+    每次 n 翻倍耗时也近似翻倍，超过目标后即停止测量。
+    """
+    best = min_log2_n
+    salt = os.urandom(16)
+    for log2_n in range(min_log2_n, max_log2_n + 1):
+        start = time.perf_counter()
+        derive_key("calibration", salt, log2_n, r, p)
+        elapsed = time.perf_counter() - start
+        if elapsed > target_seconds:
+            break
+        best = log2_n
+        # 下一级的预计耗时已超过目标
+        if elapsed * 2 > target_seconds:
+            break
+    return best
+
+
+# 应用内共享的密钥管理器
+key_manager = KeyManager()
+profiler.register(KeyManager, "keys", ("derive",))
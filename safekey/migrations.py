@@ -0,0 +1,140 @@
+"""
+数据库结构迁移与存储参数。
+结构版本记录在 PRAGMA user_version 中，打开数据库时按顺序执行尚未执行的迁移，
+每个迁移与版本号的更新在同一个事务中完成。新增迁移只需在 MIGRATIONS 末尾追加函数，不要修改已发布的迁移。
+"""
+import sqlite3
+
+
+def _create_passwords(conn):
+    """密码表，以及键集分页使用的网站索引"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS passwords (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        website TEXT NOT NULL,
+        username TEXT NOT NULL,
+        password TEXT NOT NULL,
+        notes TEXT
+    )
+    """)
+    # 分页按 (website, id) 排序，索引中隐含 rowid
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_website ON passwords (website)")
+
+
+def _create_vault_meta(conn):
+    """加密存储的元数据：盐、KDF 参数和口令校验值"""
+    conn.execute("CREATE TABLE IF NOT EXISTS vault_meta (key TEXT PRIMARY KEY, value BLOB)")
+
+
+def _add_dedup_key(conn):
+    """去重键列及其唯一索引，已有记录的去重键由 DatabaseManager 补算"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(passwords)")]
+    if "dedup_key" not in columns:
+        conn.execute("ALTER TABLE passwords ADD COLUMN dedup_key BLOB")
+    # 去重键为 NULL 的记录不受唯一约束限制
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_passwords_dedup ON passwords (dedup_key)")
+
+
+def _create_password_audit(conn):
+    """
+    密码健康检查的结果，每条记录一行，以记录 id 为键。
+    content_hash 为密码明文的摘要（加密库为带密钥的摘要），相同的密码摘要相同，用于发现重复使用的密码，
+    密码的密文改变而明文不变时（如重新加密）据此跳过重新评分；similar_hash 为去掉大小写、常见替换和首尾数字符号后的摘要，
+    用于发现相似的密码。修改密码时触发器将结果标记为过期，删除记录时删除结果；
+    新增的记录 id 总是大于已检查过的 id（AUTOINCREMENT），不需要触发器。
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS password_audit (
+        id INTEGER PRIMARY KEY,
+        content_hash BLOB NOT NULL,
+        similar_hash BLOB NOT NULL,
+        bits REAL NOT NULL,
+        length INTEGER NOT NULL,
+        stale INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_content ON password_audit (content_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_similar ON password_audit (similar_hash, content_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_stale ON password_audit (id) WHERE stale")
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS password_audit_au AFTER UPDATE OF password ON passwords
+    WHEN old.password IS NOT new.password BEGIN
+        UPDATE password_audit SET stale = 1 WHERE id = old.id;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS password_audit_ad AFTER DELETE ON passwords BEGIN
+        DELETE FROM password_audit WHERE id = old.id;
+    END
+    """)
+
+
+def _create_sort_indexes(conn):
+    """
+    DatabaseManager.query_passwords 排序和筛选使用的索引：按用户名、备注排序的键集分页，
+    以及查找同一网站和用户名下的其他记录（筛选保存了多个密码的账号）。按网站和 id 排序已有索引。
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_username ON passwords (username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_notes ON passwords (IFNULL(notes, ''))")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_account ON passwords (website, username)")
+
+
+# 第 i 个迁移将数据库升级到版本 i + 1。早期数据库没有记录版本号，因此迁移需要能在已有结构上重复执行
+MIGRATIONS = [
+    _create_passwords,
+    _create_vault_meta,
+    _add_dedup_key,
+    _create_password_audit,
+    _create_sort_indexes,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """将数据库升级到最新结构，返回执行的迁移数"""
+    current = schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise ValueError(f"数据库版本 ({current}) 高于当前程序支持的版本 ({SCHEMA_VERSION})，请升级 SafeKey")
+    for version in range(current + 1, SCHEMA_VERSION + 1):
+        # sqlite3 模块不会为 DDL 自动开启事务，这里显式开启
+        conn.execute("BEGIN")
+        try:
+            MIGRATIONS[version - 1](conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    return SCHEMA_VERSION - current
+
+
+# 默认存储参数，与 MyConfig 中 Database 分组的默认值一致
+DEFAULT_PROFILE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size_mb": 256,
+    "cache_size_mb": 64,
+    "temp_store": "MEMORY",
+}
+
+
+def apply_profile(conn, profile=None):
+    """
+    在新打开的连接上应用存储参数：
+        journal_mode  WAL 下读写互不阻塞，提交只追加日志
+        synchronous   WAL 模式下 NORMAL 只在检查点时同步磁盘，断电最多丢失最近的事务，不会损坏数据库
+        mmap_size     通过内存映射读取数据页，减少系统调用和复制
+        cache_size    页缓存大小，负数表示以 KiB 为单位
+        temp_store    临时表（如导入暂存表）和排序放在内存中
+    journal_mode 会持久保存在数据库文件中，其余参数只对当前连接有效。
+    """
+    profile = dict(DEFAULT_PROFILE, **(profile or {}))
+    conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size_mb']) * 1024 * 1024}")
+    conn.execute(f"PRAGMA cache_size = {-int(profile['cache_size_mb']) * 1024}")
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
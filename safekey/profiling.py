@@ -0,0 +1,207 @@
+"""
+性能分析：计时区间（span）按名称聚合为直方图（次数、总耗时、p50/p95/p99、最大值），
+可以导出为 JSON 或 Chrome 跟踪格式（chrome://tracing 或 Perfetto 可直接打开）。
+未启用时没有额外开销：注册的类只在 enable() 时才把方法替换为计时的包装，disable() 时恢复原方法；
+代码中的 with profiler.span(...) 在未启用时返回同一个空的上下文管理器。
+    profiler.register(DatabaseManager, "db")
+    with profiler.span("import.merge"): ...
+"""
+import functools
+import json
+import os
+import threading
+import time
+import types
+from collections import deque
+
+# 每个名称保留的最近耗时样本数，用于计算分位数
+SAMPLE_LIMIT = 10000
+# Chrome 跟踪中保留的最近事件数
+EVENT_LIMIT = 200000
+PERCENTILES = (50, 95, 99)
+# 代码对象的生成器标志（inspect.CO_GENERATOR），不为此导入 inspect
+_CO_GENERATOR = 0x20
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_record", "_name", "_start")
+
+    def __init__(self, record, name):
+        self._record = record
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._record(self._name, self._start, time.perf_counter_ns())
+        return False
+
+
+class _Stat:
+    __slots__ = ("count", "total_ns", "max_ns", "samples")
+
+    def __init__(self, sample_limit):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.samples = deque(maxlen=sample_limit)
+
+
+def _percentile(ordered, p):
+    """最近秩法的分位数，ordered 已排序"""
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, max(0, (len(ordered) * p + 99) // 100 - 1))]
+
+
+class Profiler:
+    """
+    计时区间的收集器，线程安全。每个名称保存次数、总耗时、最大值和最近 SAMPLE_LIMIT 个样本（用于分位数），
+    另外保存最近 EVENT_LIMIT 个事件用于导出 Chrome 跟踪。
+    """
+
+    def __init__(self, sample_limit=SAMPLE_LIMIT, event_limit=EVENT_LIMIT):
+        self.enabled = False
+        self.sample_limit = sample_limit
+        self.event_limit = event_limit
+        self._registered = []   # (类, 前缀, 方法名列表)
+        self._originals = []    # (类, 方法名, 原方法)，disable() 时恢复
+        self._lock = threading.Lock()
+        self.reset()
+
+    def register(self, cls, prefix, methods=None, exclude=()):
+        """
+        登记需要计时的类：methods 默认为类中定义的全部公开方法（生成器函数除外，其耗时计入调用方的区间），
+        exclude 中的方法不计时。区间名称为“前缀.方法名”。已启用时立即生效。
+        """
+        if methods is None:
+            methods = [name for name, value in vars(cls).items()
+                       if not name.startswith("_") and isinstance(value, types.FunctionType)
+                       and not value.__code__.co_flags & _CO_GENERATOR]
+        methods = [name for name in methods if name not in exclude]
+        self._registered.append((cls, prefix, list(methods)))
+        if self.enabled:
+            self._patch(cls, prefix, methods)
+        return cls
+
+    def enable(self):
+        if self.enabled:
+            return
+        for cls, prefix, methods in self._registered:
+            self._patch(cls, prefix, methods)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals.clear()
+
+    def reset(self):
+        """清空已收集的数据"""
+        with self._lock:
+            self._stats = {}
+            self._events = deque(maxlen=self.event_limit)
+            self._origin = time.perf_counter_ns()
+
+    def span(self, name):
+        """计时的上下文管理器；未启用时返回空的上下文管理器"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.record, name)
+
+    def record(self, name, start_ns, end_ns):
+        duration = end_ns - start_ns
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = _Stat(self.sample_limit)
+            stat.count += 1
+            stat.total_ns += duration
+            if duration > stat.max_ns:
+                stat.max_ns = duration
+            stat.samples.append(duration)
+            self._events.append((name, start_ns, duration, threading.get_ident()))
+
+    def _patch(self, cls, prefix, methods):
+        for name in methods:
+            original = vars(cls).get(name)
+            if original is None:
+                continue
+            self._originals.append((cls, name, original))
+            setattr(cls, name, self._timed(f"{prefix}.{name}", original))
+
+    def _timed(self, name, func):
+        record = self.record
+        clock = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, start, clock())
+        return wrapper
+
+    def summary(self):
+        """各区间的统计，按总耗时从高到低排列，时间单位为毫秒"""
+        with self._lock:
+            stats = [(name, stat.count, stat.total_ns, stat.max_ns, sorted(stat.samples))
+                     for name, stat in self._stats.items()]
+        result = []
+        for name, count, total_ns, max_ns, ordered in stats:
+            item = {"name": name, "count": count, "total_ms": total_ns / 1e6, "mean_ms": total_ns / count / 1e6}
+            for p in PERCENTILES:
+                item[f"p{p}_ms"] = _percentile(ordered, p) / 1e6
+            item["max_ms"] = max_ns / 1e6
+            result.append(item)
+        result.sort(key=lambda item: item["total_ms"], reverse=True)
+        return result
+
+    def to_chrome_trace(self):
+        """Chrome 跟踪格式（完整事件，时间单位为微秒）"""
+        with self._lock:
+            events = list(self._events)
+            origin = self._origin
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                 "ts": (start - origin) / 1000, "dur": duration / 1000}
+                for name, start, duration, tid in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def export(self, path, fmt="json"):
+        """将统计（json）或跟踪事件（chrome）写入文件"""
+        if fmt == "json":
+            data = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "spans": self.summary()}
+        elif fmt == "chrome":
+            data = self.to_chrome_trace()
+        else:
+            raise ValueError(f"Unsupported format: {fmt}")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+# 进程内共享的实例
+profiler = Profiler()
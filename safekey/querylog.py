@@ -0,0 +1,177 @@
+"""
+慢查询日志：DatabaseManager.execute_query 执行的语句超过阈值时记录 SQL、参数形状（只记录类型，不记录值）、
+耗时和返回的行数，并自动捕获 EXPLAIN QUERY PLAN，全表扫描（SCAN passwords）之类的问题无需手动排查。
+记录追加到 JSON Lines 文件，超过 max_bytes 时轮转为 .1、.2……；同时在内存中按语句汇总，top() 返回最耗时的语句。
+    log = open_log("slow_queries.log")
+    log.top(10)
+"""
+import json
+import os
+import re
+import threading
+import time
+
+# 单个日志文件的最大字节数和保留的轮转文件数
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+# 缓存的查询计划数，超过时清空
+PLAN_CACHE_SIZE = 256
+# 可以 EXPLAIN 的语句
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+_WHITESPACE = re.compile(r"\s+")
+# IN (?, ?, ?) 之类数量不定的占位符列表
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def normalize_sql(query):
+    """合并空白，并把数量不定的占位符列表合并为 ?, ...，同一语句的不同调用汇总在一起"""
+    return _PLACEHOLDER_LIST.sub("?, ...", _WHITESPACE.sub(" ", query).strip())
+
+
+def param_shape(params):
+    """参数的形状：只包含类型（和数量），不包含任何值，日志中不会出现密码等内容"""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    types = [type(value).__name__ for value in params]
+    if len(types) > 8 and len(set(types)) == 1:
+        return f"({len(types)} × {types[0]})"
+    return "(" + ", ".join(types) + ")"
+
+
+def explain(conn, query, params):
+    """返回语句的查询计划，每行一个步骤，子步骤缩进；不能 EXPLAIN 的语句返回空列表"""
+    if not query.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    depth = {0: -1}
+    plan = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node] + detail)
+    return plan
+
+
+class SlowQueryLog:
+    """慢查询的记录和汇总，线程安全；path 为空时只在内存中汇总"""
+
+    def __init__(self, path="", max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._stats = {}
+
+    def record(self, conn, query, params, seconds, rows):
+        """记录一条慢查询，返回写入的条目"""
+        sql = normalize_sql(query)
+        plan = self._plans.get(sql)
+        if plan is None:
+            try:
+                plan = explain(conn, query, params)
+            except Exception as e:
+                plan = [f"无法获取查询计划: {e}"]
+            if len(self._plans) >= PLAN_CACHE_SIZE:
+                self._plans.clear()
+            self._plans[sql] = plan
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "sql": sql,
+            "params": param_shape(params),
+            "plan": plan,
+        }
+        with self._lock:
+            _accumulate(self._stats, entry)
+            if self.path:
+                self._write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def _write(self, line):
+        data = line.encode('utf-8')
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'ab') as f:
+                f.write(data)
+        except OSError:
+            # 日志只用于诊断，写入失败不影响数据库操作
+            pass
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def top(self, limit=10):
+        """本进程中记录的慢查询，按总耗时从高到低排列，见 top_offenders"""
+        with self._lock:
+            return _top(self._stats, limit)
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+
+
+def _accumulate(stats, entry):
+    item = stats.get(entry["sql"])
+    if item is None:
+        item = stats[entry["sql"]] = {"sql": entry["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                      "rows": 0, "params": entry["params"], "plan": entry["plan"]}
+    item["count"] += 1
+    item["total_ms"] += entry["ms"]
+    item["max_ms"] = max(item["max_ms"], entry["ms"])
+    item["rows"] = max(item["rows"], entry["rows"])
+    item["plan"] = entry["plan"]
+
+
+def _top(stats, limit):
+    items = sorted(stats.values(), key=lambda item: item["total_ms"], reverse=True)[:limit]
+    return [dict(item, mean_ms=item["total_ms"] / item["count"]) for item in items]
+
+
+def top_offenders(path, limit=10):
+    """
+    读取日志文件及其轮转文件，按语句汇总，返回总耗时最高的 limit 条。
+    每项包含 sql、count、total_ms、mean_ms、max_ms、rows（最多返回的行数）、params 和最近一次的 plan。
+    """
+    stats = {}
+    directory, base = os.path.split(os.path.abspath(path))
+    rotated = []
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            suffix = name[len(base) + 1:]
+            if name.startswith(base + ".") and suffix.isdigit():
+                rotated.append((int(suffix), os.path.join(directory, name)))
+    # 从最旧的轮转文件读到当前文件，最近一次的查询计划覆盖旧的
+    paths = [name for _, name in sorted(rotated, reverse=True)] + [path]
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    _accumulate(stats, json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+    return _top(stats, limit)
+
+
+def open_log(path=""):
+    """返回 path 对应的共享日志，同一进程中打开同一文件的多个数据库连接共用一个实例（和锁）"""
+    key = os.path.abspath(path) if path else ""
+    with _logs_lock:
+        log = _logs.get(key)
+        if log is None:
+            log = _logs[key] = SlowQueryLog(path)
+        return log
@@ -0,0 +1,54 @@
+"""
+数据层的设置与消息钩子。DatabaseManager 不读取界面配置，也不显示任何界面：
+设置由调用方注入，非致命的事件（如数据库升级、合并重复记录）通过 reporter 回调通知调用方，
+操作失败则直接抛出异常。
+"""
+import sys
+
+from .backupcontainer import DEFAULT_KDF_PARAMS
+from .migrations import DEFAULT_PROFILE
+
+
+class Settings:
+    """
+    数据层使用的设置，默认值与界面设置的默认值一致。
+    属性在每次使用时读取，界面可以用子类把属性转发到自己的配置（见 config.ConfigSettings），修改后无需重新打开数据库。
+        import_override  导入时与已有记录重复：True 覆盖备注，False 跳过
+        export_dir       导出到相对路径时使用的目录，为空时使用当前目录
+        kdf_log2n        加密备份和加密存储的 KDF 强度（log2 N）
+        profile          数据库存储参数，见 migrations.apply_profile
+        breach_index     泄露密码索引文件（见 breach.build_index），为空时不检查
+        slow_query_ms    execute_query 中超过该毫秒数的语句记入慢查询日志，0 表示不记录
+        slow_query_log   慢查询日志文件（见 querylog），为空时只在内存中汇总
+    """
+    import_override = True
+    export_dir = ""
+    kdf_log2n = DEFAULT_KDF_PARAMS["log2_n"]
+    profile = DEFAULT_PROFILE
+    breach_index = ""
+    slow_query_ms = 100
+    slow_query_log = ""
+
+    def __init__(self, **overrides):
+        for name, value in overrides.items():
+            if not hasattr(type(self), name):
+                raise ValueError(f"未知的设置项: {name}")
+            setattr(self, name, value)
+
+    @property
+    def kdf_params(self):
+        return dict(DEFAULT_KDF_PARAMS, log2_n=self.kdf_log2n)
+
+
+# reporter(level, message) 的 level
+INFO = "info"
+WARNING = "warning"
+
+
+def silent(level, message):
+    """默认的 reporter：忽略所有消息"""
+
+
+def stderr_reporter(level, message):
+    """将消息写到标准错误，供命令行等无界面环境使用"""
+    print(f"safekey: {message}", file=sys.stderr)
@@ -0,0 +1,209 @@
+"""
+密码强度估计：按密码中出现的字符类别确定字符集大小，每个字符计 log2(字符集大小) 比特的熵；
+重复字符（aaa）、连续序列（abc、321）、键盘序列（qwe）中可预测的字符只计 PATTERN_BITS，
+常见单词和常见密码（忽略大小写和 @→a 之类的替换）按词典大小整体计算。
+每个密码的字符只扫描一次。score_batch 批量评分并返回强度分布，相同的密码只计算一次。
+"""
+import math
+import string
+from collections import Counter
+from .profiling import profiler
+
+# 小写字母、大写字母、数字、符号（可打印 ASCII 标点和空格）、其他字符
+CLASS_SIZES = (26, 26, 10, 33, 100)
+LEVEL_NAMES = ("弱", "中", "强")
+LEVEL_COLORS = ("#FF0000", "#FFA500", "#00FF00")
+# 达到“中”和“强”所需的比特数
+MEDIUM_BITS = 40
+STRONG_BITS = 60
+# 强度条满格对应的比特数
+FULL_BITS = 80
+# 重复或序列中可预测的字符计入的比特数
+PATTERN_BITS = 1.0
+# 直方图每格的比特数
+HISTOGRAM_STEP = 10
+# 短于这个长度的密码视为过短
+SHORT_LENGTH = 8
+
+# 常见密码和常见单词，按小写存储；包含简易密码生成器的易记单词
+COMMON_WORDS = frozenset("""
+password passwd pass admin administrator root login welcome letmein master secret
+qwerty qwertyuiop asdf asdfgh asdfghjkl zxcvbn iloveyou love monkey dragon shadow
+sunshine princess football baseball soccer hockey superman batman trustno1 whatever
+freedom flower hello charlie michael jordan jennifer hunter ranger buster tigger
+computer internet google apple banana orange cherry summer winter spring autumn
+china beijing shanghai wang zhang wei woaini aini
+river sun moon tree cloud happy music panda coffee beach smile guitar purple cookie
+""".split())
+_WORD_LENGTHS = sorted({len(w) for w in COMMON_WORDS}, reverse=True)
+# 单词的前三个字符，大多数位置只需要查一次这个集合
+_WORD_PREFIXES = frozenset(w[:3] for w in COMMON_WORDS)
+_WORD_BITS = math.log2(len(COMMON_WORDS))
+# 匹配单词前做的替换：转为小写，常见的数字和符号替换还原为字母
+_NORMALIZE = str.maketrans(
+    string.ascii_uppercase + "@4$5301!7",
+    string.ascii_lowercase + "aasseolit",
+)
+
+# skeleton 去掉的首尾字符，@ 和 $ 常用于替换字母，保留
+_AFFIXES = string.digits + string.punctuation.replace("@", "").replace("$", "") + " "
+
+# 键盘上每个键的位置：同一行相邻的键位置相差 1，不同行之间不相邻
+_KEYBOARD = {}
+for _row, _keys in enumerate(("1234567890", "qwertyuiop", "asdfghjkl", "zxcvbnm")):
+    for _col, _key in enumerate(_keys):
+        _KEYBOARD[_key] = _KEYBOARD[_key.upper()] = _row * 16 + _col
+
+# 每个 ASCII 字符的 (类别, 用于判断连续序列的编号, 键盘位置)。
+# 只有字母和数字参与连续序列，不同类别的编号相差很远，不会被当成连续
+_CHARS = {}
+for _i, _chars in enumerate((string.ascii_lowercase, string.ascii_uppercase, string.digits,
+                             string.punctuation + " ")):
+    for _c in _chars:
+        _CHARS[_c] = (_i, _i * 1000 + ord(_c) if _i < 3 else None, _KEYBOARD.get(_c))
+_OTHER = (4, None, None)
+
+
+def _dictionary_spans(password):
+    """从左到右贪心匹配最长的常见单词，返回 (起点, 终点, 是否有变形) 列表"""
+    normalized = password.translate(_NORMALIZE)
+    lowered = password.lower()
+    spans = []
+    i, n = 0, len(password)
+    while i < n - 2:
+        if normalized[i:i + 3] not in _WORD_PREFIXES:
+            i += 1
+            continue
+        for length in _WORD_LENGTHS:
+            if normalized[i:i + length] in COMMON_WORDS:
+                end = i + length
+                spans.append((i, end, lowered[i:end] != normalized[i:end] or password[i:end] != lowered[i:end]))
+                i = end
+                break
+        else:
+            i += 1
+    return spans
+
+
+def entropy(password):
+    """估计单个密码的熵（比特）"""
+    if not password:
+        return 0.0
+    spans = _dictionary_spans(password)
+    in_word = set()
+    for start, end, _ in spans:
+        in_word.update(range(start, end))
+
+    classes = set()
+    predictable = free = 0
+    prev_order = prev_key = None
+    repeat = sequence = keyboard = 1
+    sequence_step = keyboard_step = 0
+    prev = None
+    for i, c in enumerate(password):
+        cls, order, key = _CHARS.get(c, _OTHER)
+        # 分别记录以当前字符结尾的重复、连续序列和键盘序列的长度
+        repeat = repeat + 1 if c == prev else 1
+        step = order - prev_order if order is not None and prev_order is not None else 0
+        if step == 1 or step == -1:
+            sequence = sequence + 1 if step == sequence_step else 2
+            sequence_step = step
+        else:
+            sequence = 1
+        step = key - prev_key if key is not None and prev_key is not None else 0
+        if step == 1 or step == -1:
+            keyboard = keyboard + 1 if step == keyboard_step else 2
+            keyboard_step = step
+        else:
+            keyboard = 1
+        prev, prev_order, prev_key = c, order, key
+        if in_word and i in in_word:
+            continue
+        classes.add(cls)
+        if repeat >= 3 or sequence >= 3 or keyboard >= 3:
+            predictable += 1
+        else:
+            free += 1
+
+    bits = free * math.log2(sum(CLASS_SIZES[cls] for cls in classes)) if free else 0.0
+    bits += predictable * PATTERN_BITS
+    bits += sum(_WORD_BITS + (1 if changed else 0) for _, _, changed in spans)
+    return bits
+
+
+def skeleton(password):
+    """
+    密码的“骨架”：转为小写、还原常见替换，去掉首尾的数字和符号，如 P@ssword1! 和 password2 都为 password。
+    骨架相同而密码不同的两个密码视为相似；剩余部分太短时使用整个密码。
+    """
+    core = password.strip(_AFFIXES)
+    return (core if len(core) >= 4 else password).translate(_NORMALIZE)
+
+
+def level(bits):
+    """将比特数转换为强度等级：0 弱，1 中，2 强"""
+    if bits >= STRONG_BITS:
+        return 2
+    if bits >= MEDIUM_BITS:
+        return 1
+    return 0
+
+
+def percent(bits):
+    """强度条的百分比"""
+    return min(100, round(bits * 100 / FULL_BITS))
+
+
+class StrengthDistribution:
+    """批量评分的结果：各强度等级的数量、熵的直方图（每 HISTOGRAM_STEP 比特一格）、最小值和平均值"""
+
+    def __init__(self):
+        self.counts = [0] * len(LEVEL_NAMES)
+        self.histogram = Counter()
+        self.total = 0
+        self.min_bits = None
+        self.sum_bits = 0.0
+
+    def add(self, bits, times=1):
+        self.counts[level(bits)] += times
+        self.histogram[int(bits // HISTOGRAM_STEP) * HISTOGRAM_STEP] += times
+        self.total += times
+        self.sum_bits += bits * times
+        if self.min_bits is None or bits < self.min_bits:
+            self.min_bits = bits
+
+    @property
+    def mean_bits(self):
+        return self.sum_bits / self.total if self.total else 0.0
+
+    def ratio(self, level_):
+        return self.counts[level_] / self.total if self.total else 0.0
+
+    def summary(self):
+        """如“强 98% · 中 2%”，按强到弱排列，省略数量为 0 的等级"""
+        parts = [f"{LEVEL_NAMES[i]} {self.ratio(i):.0%}" if self.ratio(i) >= 0.01 else f"{LEVEL_NAMES[i]} <1%"
+                 for i in reversed(range(len(LEVEL_NAMES))) if self.counts[i]]
+        return " · ".join(parts)
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "counts": dict(zip(LEVEL_NAMES, self.counts)),
+            "min_bits": self.min_bits,
+            "mean_bits": self.mean_bits,
+            "histogram": dict(sorted(self.histogram.items())),
+        }
+
+
+def score_batch(passwords, distribution=None):
+    """
+    批量评分，返回 StrengthDistribution；传入 distribution 时累加到其中，可以分批评分大量密码。
+    相同的密码只计算一次。
+    """
+    if distribution is None:
+        distribution = StrengthDistribution()
+    with profiler.span("strength.score_batch"):
+        for password, times in Counter(passwords).items():
+            distribution.add(entropy(password), times)
+    return distribution
+
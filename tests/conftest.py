@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from safekey.database import DatabaseManager
+from safekey.keymanager import key_manager
+from safekey.settings import Settings
+
+# 测试中使用的 scrypt 强度，远低于默认值以加快测试
+FAST_LOG2_N = 10
+PASSPHRASE = "vault-passphrase"
+
+
+@pytest.fixture(autouse=True)
+def _evict_keys():
+    """每个测试结束后清除缓存的密钥，测试之间不共享解锁状态"""
+    yield
+    key_manager.evict()
+
+
+@pytest.fixture
+def settings():
+    return Settings(kdf_log2n=FAST_LOG2_N, slow_query_ms=0)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "passwords.db")
+
+
+@pytest.fixture
+def db(db_path, settings):
+    manager = DatabaseManager(db_path, settings=settings)
+    yield manager
+    manager.conn.close()
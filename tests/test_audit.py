@@ -0,0 +1,87 @@
+import pytest
+
+from safekey.fieldcrypto import fingerprint
+from safekey.strength import skeleton
+
+from conftest import PASSPHRASE
+
+
+def test_enable_encryption_drops_unkeyed_audit_digests(db):
+    db.add_password("example.com", "alice", "SuperSecretPw0")
+    db.audit_passwords()
+    digests = {fingerprint(("SuperSecretPw0",)), fingerprint(("similar", skeleton("SuperSecretPw0")))}
+    stored = db.conn.execute("SELECT content_hash, similar_hash FROM password_audit").fetchone()
+    assert set(stored) == digests
+
+    db.enable_encryption(PASSPHRASE)
+    assert db.conn.execute("SELECT COUNT(*) FROM password_audit").fetchone()[0] == 0
+
+    # 重新检查后保存的是带密钥的摘要
+    assert db.audit_passwords() == 1
+    stored = db.conn.execute("SELECT content_hash, similar_hash FROM password_audit").fetchone()
+    assert not digests & set(stored)
+    assert db.audit_summary()["audited"] == 1
+
+
+def test_audit_rescores_only_new_and_changed_records(db):
+    db.bulk_import([("example.com", f"user{i}", f"Unique-Passw0rd-{i}", "") for i in range(10)])
+    assert db.audit_passwords() == 10
+    assert db.audit_passwords() == 0
+    assert db.audit_summary()["pending"] == 0
+
+    ids = [row[0] for row in db.get_all_passwords()]
+    db.update_password(ids[0], password="abc")
+    db.update_password(ids[1], notes="只修改备注")
+    db.add_password("example.com", "new", "abc")
+    db.delete_passwords([ids[2]])
+    summary = db.audit_summary()
+    assert summary["pending"] == 2 and summary["audited"] == 9
+
+    assert db.audit_passwords() == 2
+    summary = db.audit_summary()
+    assert (summary["audited"], summary["pending"]) == (10, 0)
+    assert (summary["weak"], summary["short"], summary["reused"]) == (2, 2, 2)
+    assert {row[2] for row in db.get_audit_page("reused")} == {"user0", "new"}
+
+
+def test_audit_clears_stale_flag_when_plaintext_is_unchanged(db):
+    record, _ = db.add_password("example.com", "alice", "Unique-Passw0rd")
+    # 加密存储时重新保存相同的密码也会得到不同的密文
+    db.enable_encryption(PASSPHRASE)
+    db.audit_passwords()
+    db.update_password(record[0], password="Unique-Passw0rd")
+    assert db.audit_summary()["pending"] == 1
+    assert db.audit_passwords() == 0
+    assert db.audit_summary()["pending"] == 0
+
+
+def test_audit_resumes_after_cancel(db):
+    from safekey.database import IMPORT_BATCH_SIZE, OperationCancelled
+    total = IMPORT_BATCH_SIZE + 10
+    db.bulk_import([("example.com", f"user{i}", f"pw{i}", "") for i in range(total)])
+
+    def cancel(done, pending):
+        if done >= IMPORT_BATCH_SIZE:
+            raise OperationCancelled()
+
+    with pytest.raises(OperationCancelled):
+        db.audit_passwords(progress=cancel)
+    # 已完成的批次会保留，之后只检查剩余的记录
+    audited = db.audit_summary()["audited"]
+    assert 0 < audited < total
+    assert db.audit_passwords() == total - audited
+    assert db.audit_summary()["audited"] == total
+
+
+def test_audit_page_is_keyset_paginated(db):
+    from safekey.database import page_key
+    db.bulk_import([(f"site{i % 7}.com", f"user{i}", "short", "") for i in range(30)])
+    db.audit_passwords()
+    rows, after = [], None
+    while True:
+        page = db.get_audit_page("short", after, 4)
+        rows += page
+        if len(page) < 4:
+            break
+        after = page_key(page[-1])
+    assert rows == sorted(db.get_all_passwords(), key=page_key)
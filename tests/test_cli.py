@@ -0,0 +1,41 @@
+from safekey.cli import main
+from safekey.database import DatabaseManager
+
+
+def test_delete_reports_missing_ids(db_path, capsys):
+    db = DatabaseManager(db_path)
+    first, _ = db.add_password("example.com", "alice", "pw")
+    second, _ = db.add_password("example.com", "bob", "pw")
+    db.conn.close()
+
+    assert main(["--db", db_path, "delete", str(first[0]), "999"]) == 1
+    err = capsys.readouterr().err
+    assert "已删除 1 条记录" in err and "999" in err
+
+    assert main(["--db", db_path, "delete", str(first[0])]) == 1
+    assert "已删除 0 条记录" in capsys.readouterr().err
+
+    assert main(["--db", db_path, "delete", str(second[0])]) == 0
+    assert "已删除 1 条记录" in capsys.readouterr().err
+
+
+def test_generate_closes_breach_index(tmp_path, monkeypatch):
+    import hashlib
+    from safekey import breach
+    corpus = tmp_path / "corpus.txt"
+    hashes = sorted(hashlib.sha1(p.encode()).hexdigest().upper() for p in ("1111", "2222"))
+    corpus.write_text("".join(f"{h}:1\n" for h in hashes))
+    index_path = str(tmp_path / "pwned.skbi")
+    breach.build_index(str(corpus), index_path)
+
+    # 记录打开后尚未关闭的索引
+    opened = []
+    init, close = breach.BreachIndex.__init__, breach.BreachIndex.close
+    monkeypatch.setattr(breach.BreachIndex, "__init__", lambda self, path: (init(self, path), opened.append(self))[0])
+    monkeypatch.setattr(breach.BreachIndex, "close", lambda self: (opened.remove(self), close(self))[1])
+    output = tmp_path / "out.txt"
+    assert main(["generate", "--count", "50", "--length", "4", "4", "--no-upper", "--no-lower", "--no-symbols",
+                 "--workers", "1", "--index", index_path, "--output", str(output)]) == 0
+    passwords = output.read_text().split()
+    assert len(passwords) == 50 and not {"1111", "2222"} & set(passwords)
+    assert opened == []
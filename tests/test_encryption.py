@@ -0,0 +1,57 @@
+import os
+import sqlite3
+
+import pytest
+
+from safekey.database import DatabaseManager
+from safekey.fieldcrypto import SealedField, VaultLockedError, reveal
+
+from conftest import PASSPHRASE
+
+
+def _file_bytes(path):
+    if not os.path.exists(path):
+        return b""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("journal_mode", ["WAL", "DELETE"])
+def test_enable_encryption_leaves_no_plaintext_on_disk(db_path, settings, journal_mode):
+    db = DatabaseManager(db_path, profile={"journal_mode": journal_mode}, settings=settings)
+    # 界面同时打开的另一个（空闲的）连接不应妨碍清除
+    other = sqlite3.connect(db_path)
+    other.execute("SELECT COUNT(*) FROM passwords").fetchone()
+    for i in range(50):
+        db.add_password(f"site{i}.example.com", f"user{i}", f"PlainSecretPw{i:03d}", f"PlainSecretNote{i:03d}")
+    db.audit_passwords()
+    db.enable_encryption(PASSPHRASE)
+
+    for path in (db_path, db_path + "-wal"):
+        data = _file_bytes(path)
+        assert b"PlainSecretPw" not in data
+        assert b"PlainSecretNote" not in data
+    assert len(_file_bytes(db_path + "-wal")) == 0
+    other.close()
+    db.conn.close()
+
+
+def test_encrypted_vault_round_trip(db_path, settings):
+    db = DatabaseManager(db_path, settings=settings)
+    db.add_password("example.com", "alice", "secret", "note")
+    db.enable_encryption(PASSPHRASE)
+    row = db.get_all_passwords()[0]
+    assert isinstance(row[3], SealedField) and isinstance(row[4], SealedField)
+    assert (reveal(row[3]), reveal(row[4])) == ("secret", "note")
+    db.conn.close()
+
+    db.keys.evict()
+    db = DatabaseManager(db_path, settings=settings)
+    assert db.is_encrypted() and not db.is_unlocked()
+    with pytest.raises(VaultLockedError):
+        db.unlock("wrong passphrase")
+    db.unlock(PASSPHRASE)
+    assert reveal(db.get_all_passwords()[0][3]) == "secret"
+    # 去重键为带密钥的摘要，重复的记录仍然被识别
+    assert db.add_password("example.com", "alice", "secret", "note", override=False) == (None, [])
+    db.conn.close()
@@ -0,0 +1,222 @@
+import io
+import json
+import os
+
+import pytest
+
+from safekey.backupcontainer import BackupError, BackupReader, BackupWriter, is_container
+from safekey.database import DatabaseManager, _iter_json_entries
+
+from conftest import FAST_LOG2_N, PASSPHRASE
+
+ROWS = [
+    ("example.com", "alice", "pw1", "first"),
+    ("example.com", "bob", "pw2", ""),
+    ("例子.cn", "张三", "密码\"带引号\"", "多行\n备注"),
+    ("other.org", "alice", "pw1", None),
+]
+
+
+def _plain(rows):
+    """记录按 (网站, 用户名, 密码, 备注) 排序，空备注统一为空字符串"""
+    return sorted((row[-4], row[-3], row[-2], row[-1] or "") for row in rows)
+
+
+def test_add_password_override_updates_notes(db):
+    record, replaced = db.add_password("example.com", "alice", "pw", "old")
+    assert replaced == []
+    updated, replaced = db.add_password("example.com", "alice", "pw", "new")
+    assert replaced == [record[0]]
+    assert updated[0] == record[0] and updated[4] == "new"
+    assert len(db.get_all_passwords()) == 1
+
+
+def test_add_password_skip_keeps_existing(db):
+    record, _ = db.add_password("example.com", "alice", "pw", "old")
+    assert db.add_password("example.com", "alice", "pw", "new", override=False) == (None, [])
+    # 密码不同时不算重复
+    other, replaced = db.add_password("example.com", "alice", "pw2", "new", override=False)
+    assert other is not None and replaced == []
+    assert db.get_all_passwords()[0][4] == "old"
+
+
+@pytest.mark.parametrize("override, notes", [(True, "third"), (False, "first")])
+def test_bulk_import_deduplicates_against_vault_and_file(db, override, notes):
+    db.add_password("example.com", "alice", "pw", "first")
+    stats = db.bulk_import([
+        ("example.com", "alice", "pw", "second"),
+        ("example.com", "bob", "pw", ""),
+        ("example.com", "bob", "pw", ""),
+        ("example.com", "alice", "pw", "third"),
+    ], override=override, batch_size=2)
+    assert stats["rows"] == 4 and stats["inserted"] == 1
+    rows = {row[2]: row[4] for row in db.get_all_passwords()}
+    assert rows == {"alice": notes, "bob": ""}
+
+
+def test_bulk_import_rolls_back_on_error(db):
+    db.add_password("example.com", "alice", "pw")
+
+    def rows():
+        yield ("example.com", "bob", "pw", "")
+        raise RuntimeError("读取中断")
+
+    with pytest.raises(RuntimeError):
+        db.bulk_import(rows(), batch_size=1)
+    assert [row[2] for row in db.get_all_passwords()] == ["alice"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64 * 1024])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_streaming_json_parser_matches_json_loads(chunk_size, indent):
+    entries = [{"website": f"site{i}", "notes": "[{,}]\n\"" * (i % 3)} for i in range(20)]
+    text = json.dumps(entries, indent=indent)
+    chunks = (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+    assert list(_iter_json_entries(chunks)) == entries
+
+    ndjson = "\n".join(json.dumps(entry) for entry in entries) + "\n"
+    chunks = (ndjson[i:i + chunk_size] for i in range(0, len(ndjson), chunk_size))
+    assert list(_iter_json_entries(chunks)) == entries
+
+
+@pytest.mark.parametrize("text", ['[{"website": "a"}', '[{"website": "a"},', '[1]', '{"website": '])
+def test_streaming_json_parser_rejects_malformed_input(text):
+    with pytest.raises(ValueError):
+        list(_iter_json_entries(iter([text])))
+
+
+def test_import_csv_skips_short_rows(tmp_path, db_path, settings):
+    source = tmp_path / "in.csv"
+    source.write_text("ID,Website,Username,Password,Notes\n1,example.com,alice,pw\n2,broken\n", encoding="utf-8")
+    messages = []
+    db = DatabaseManager(db_path, settings=settings, reporter=lambda level, message: messages.append(message))
+    assert db.import_passwords(str(source), "csv")["inserted"] == 1
+    assert _plain(db.get_all_passwords()) == [("example.com", "alice", "pw", "")]
+    assert any("1 行" in message for message in messages)
+    db.conn.close()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "json", "ndjson", "aes"])
+@pytest.mark.parametrize("encrypted", [False, True])
+def test_export_import_round_trip(tmp_path, settings, fmt, encrypted):
+    source = DatabaseManager(str(tmp_path / "source.db"), settings=settings)
+    source.bulk_import(ROWS)
+    if encrypted:
+        source.enable_encryption(PASSPHRASE)
+    target = str(tmp_path / f"export.{fmt}")
+    source.export_passwords(target, fmt, passphrase=PASSPHRASE if fmt == "aes" else None)
+    source.conn.close()
+    assert is_container(target) == (fmt == "aes")
+    if fmt == "aes":
+        with open(target, "rb") as f:
+            assert b"pw1" not in f.read()
+
+    restored = DatabaseManager(str(tmp_path / "restored.db"), settings=settings)
+    stats = restored.import_passwords(target, fmt, passphrase=PASSPHRASE)
+    assert stats["inserted"] == len(ROWS)
+    assert _plain(restored.get_all_passwords()) == _plain(ROWS)
+    restored.conn.close()
+
+
+def test_export_to_stream_matches_file(tmp_path, db):
+    db.bulk_import(ROWS)
+    target = str(tmp_path / "export.json")
+    db.export_passwords(target, "json")
+    stream = io.BytesIO()
+    db.export_passwords(stream, "json")
+    with open(target, "rb") as f:
+        assert f.read() == stream.getvalue()
+    entries = json.loads(stream.getvalue())
+    assert _plain(tuple(entry.values()) for entry in entries) == _plain(ROWS)
+
+
+def test_legacy_aes_import(tmp_path, db):
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import pad
+    entries = [{"id": i, "website": f"site{i}.com", "username": "用户", "password": f"pw{i}", "notes": "n" * i}
+               for i in range(3000)]
+    iv = os.urandom(16)
+    cipher = AES.new(b'Sixteen byte key', AES.MODE_CBC, iv)
+    source = tmp_path / "legacy.aes"
+    source.write_bytes(iv + cipher.encrypt(pad(json.dumps(entries, indent=4).encode("utf-8"), AES.block_size)))
+    assert not is_container(str(source))
+
+    assert db.import_passwords(str(source), "aes")["inserted"] == len(entries)
+    assert _plain(db.get_all_passwords()) == _plain(
+        (e["website"], e["username"], e["password"], e["notes"]) for e in entries)
+    # 旧版文件也可以从流中导入
+    with open(source, "rb") as f:
+        assert db.import_passwords(f, "aes", override=False)["inserted"] == 0
+
+
+def test_container_random_access_and_tampering(tmp_path):
+    path = str(tmp_path / "backup.aes")
+    entries = [{"website": f"site{i}", "password": f"pw{i}"} for i in range(25)]
+    with open(path, "wb") as f:
+        writer = BackupWriter(f, PASSPHRASE, kdf_params={"log2_n": FAST_LOG2_N}, chunk_records=4)
+        for entry in entries:
+            writer.add(entry)
+        writer.close()
+
+    reader = BackupReader(path, PASSPHRASE)
+    assert reader.record_count == len(entries)
+    assert list(reader.iter_entries(workers=2)) == entries
+    assert reader.read_records(3, 10) == entries[3:13]
+    assert reader.read_records(24, 10) == entries[24:]
+    assert reader.read_records(30, 1) == []
+
+    with pytest.raises(BackupError):
+        BackupReader(path, "wrong passphrase")
+
+    # 篡改第一个数据块中的一个字节
+    reader = BackupReader(path, PASSPHRASE)
+    with open(path, "r+b") as f:
+        offset, length = reader.index[0][:2]
+        f.seek(offset + length - 1)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 1]))
+    assert reader.read_records(4, 4) == entries[4:8]
+    with pytest.raises(BackupError):
+        reader.read_records(0, 1)
+
+
+def _write_backup(path, entries, **kwargs):
+    with open(path, "wb") as f:
+        writer = BackupWriter(f, None, chunk_records=2, **kwargs)
+        for entry in entries:
+            writer.add(entry)
+        writer.close()
+    return BackupReader(path, key=kwargs["key"])
+
+
+def test_chunks_cannot_be_swapped_between_backups_of_one_session(tmp_path):
+    # 同一会话的导出使用相同的盐和密钥
+    session = {"salt": os.urandom(16), "key": os.urandom(32), "kdf_params": {"log2_n": FAST_LOG2_N}}
+    first = _write_backup(str(tmp_path / "first.aes"), [{"website": f"a{i}"} for i in range(4)], **session)
+    second = _write_backup(str(tmp_path / "second.aes"), [{"website": f"b{i}"} for i in range(4)], **session)
+    assert first.header != second.header
+
+    with open(second.file_path, "rb") as f:
+        offset, length = second.index[1][:2]
+        f.seek(offset)
+        foreign = f.read(length)
+    assert first.index[1][:2] == (offset, length)
+    with open(first.file_path, "r+b") as f:
+        f.seek(offset)
+        f.write(foreign)
+    assert first.read_records(0, 2) == [{"website": "a0"}, {"website": "a1"}]
+    with pytest.raises(BackupError):
+        first.read_records(2, 1)
+
+
+def test_version_2_backup_is_still_readable(tmp_path):
+    import struct
+    from safekey.backupcontainer import _FOOTER, _HEADER_V2, _INDEX_ENTRY, _INDEX_SEQ, _seal, INDEX_MAGIC, MAGIC
+    key, salt = os.urandom(32), os.urandom(16)
+    header = _HEADER_V2.pack(MAGIC, 2, 1, FAST_LOG2_N, 8, 1, len(salt), salt, 1000)
+    chunk = _seal(key, header, 0, b'{"website": "old"}\n')
+    index = _seal(key, header, _INDEX_SEQ, struct.pack("<I", 1) + _INDEX_ENTRY.pack(len(header), len(chunk), 0, 1))
+    path = tmp_path / "v2.aes"
+    path.write_bytes(header + chunk + index + _FOOTER.pack(len(header) + len(chunk), len(index), INDEX_MAGIC))
+    assert list(BackupReader(str(path), key=key).iter_entries()) == [{"website": "old"}]
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from safekey.database import DatabaseManager
+from safekey.migrations import MIGRATIONS, SCHEMA_VERSION, migrate, schema_version
+
+from conftest import PASSPHRASE
+
+
+def _legacy_database(path, rows):
+    """升级前的数据库：没有记录结构版本，也没有去重键，可能包含重复的记录（旧版“跳过”导入产生）"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+    CREATE TABLE passwords (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        website TEXT NOT NULL,
+        username TEXT NOT NULL,
+        password TEXT NOT NULL,
+        notes TEXT
+    )
+    """)
+    conn.executemany("INSERT INTO passwords (website, username, password, notes) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "db.sqlite"))
+    assert migrate(conn) == SCHEMA_VERSION
+    assert migrate(conn) == 0
+    assert schema_version(conn) == SCHEMA_VERSION
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_passwords_website", "idx_passwords_dedup", "idx_passwords_username",
+            "idx_passwords_notes", "idx_passwords_account"} <= indexes
+
+
+def test_legacy_duplicates_are_merged_without_losing_notes(db_path, settings):
+    _legacy_database(db_path, [
+        ("example.com", "alice", "pw", "first"),
+        ("example.com", "alice", "pw", "second"),
+        ("example.com", "alice", "pw", "second"),
+        ("example.com", "alice", "pw", None),
+        ("example.com", "alice", "other", "kept"),
+    ])
+    messages = []
+    db = DatabaseManager(db_path, settings=settings, reporter=lambda level, message: messages.append(message))
+    rows = db.get_all_passwords()
+    assert sorted((row[3], row[4]) for row in rows) == [("other", "kept"), ("pw", "second\nfirst")]
+    assert schema_version(db.conn) == SCHEMA_VERSION
+    assert any("已合并 3 条" in message for message in messages)
+    db.conn.close()
+
+
+def test_backfill_in_encrypted_vault_waits_for_unlock(db_path, settings):
+    db = DatabaseManager(db_path, settings=settings)
+    db.add_password("example.com", "alice", "pw", "first")
+    db.enable_encryption(PASSPHRASE)
+    # 模拟升级前的加密库：去重键尚未补算的重复记录
+    db.conn.execute("INSERT INTO passwords (website, username, password, notes) "
+                    "SELECT website, username, password, ? FROM passwords", (db.vault.seal("second", "notes"),))
+    db.conn.execute("UPDATE passwords SET dedup_key = NULL")
+    db.conn.commit()
+    db.conn.close()
+    db.keys.evict()
+
+    db = DatabaseManager(db_path, settings=settings)
+    assert db.conn.execute("SELECT COUNT(*) FROM passwords").fetchone()[0] == 2
+    db.unlock(PASSPHRASE)
+    rows = db.get_all_passwords()
+    assert len(rows) == 1
+    assert rows[0][4].reveal() == "second\nfirst"
+    db.conn.close()
+
+
+def _schema(conn):
+    return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+
+
+@pytest.mark.parametrize("version", range(SCHEMA_VERSION))
+def test_upgrade_from_every_version(tmp_path, version):
+    fresh = sqlite3.connect(str(tmp_path / "fresh.sqlite"))
+    migrate(fresh)
+    conn = sqlite3.connect(str(tmp_path / "old.sqlite"))
+    for step in MIGRATIONS[:version]:
+        step(conn)
+    conn.execute(f"PRAGMA user_version = {version}")
+    conn.commit()
+    assert migrate(conn) == SCHEMA_VERSION - version
+    assert _schema(conn) == _schema(fresh)
+
+
+def test_newer_database_is_rejected(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "db.sqlite"))
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    with pytest.raises(ValueError):
+        migrate(conn)
@@ -0,0 +1,85 @@
+import itertools
+import random
+
+import pytest
+
+from safekey.database import SORT_COLUMNS, page_key
+
+from conftest import PASSPHRASE
+
+FILTERS = [
+    {},
+    {"website": "SITE1"},
+    {"username": "_"},
+    {"notes": "50%"},
+    {"has_notes": True},
+    {"has_notes": False},
+    {"duplicates": True},
+    {"website": "site", "username": "user1", "has_notes": True, "duplicates": True},
+]
+
+
+@pytest.fixture
+def vault(db):
+    """取值大量重复的记录，每种排序下都有很多相同的排序值，翻页边界落在相同值中间"""
+    rng = random.Random(20)
+    rows = [(
+        f"site{rng.randrange(15)}.com",
+        rng.choice(["user1", "user2", "user_3", "USER1"]),
+        f"pw{i}",
+        rng.choice([None, "", "note", "50% off", "50_ off", "Note"]),
+    ) for i in range(400)]
+    db.bulk_import(rows)
+    return db
+
+
+def _matches(row, website=None, username=None, notes=None, has_notes=None, duplicates=False, rows=()):
+    """query_passwords 筛选条件的逐行实现：子串匹配不区分 ASCII 大小写"""
+    for index, text in ((1, website), (2, username), (4, notes)):
+        if text and text.lower() not in (row[index] or "").lower():
+            return False
+    if has_notes is not None and bool(row[4]) != has_notes:
+        return False
+    if duplicates and not any(other[1:3] == row[1:3] and other[0] != row[0] for other in rows):
+        return False
+    return True
+
+
+def _paged(db, sort, descending, limit, **filters):
+    rows, after = [], None
+    while True:
+        page = db.query_passwords(sort, descending, after, limit, **filters)
+        rows += page
+        if len(page) < limit:
+            return rows
+        after = page_key(page[-1], sort)
+
+
+@pytest.mark.parametrize("sort, descending", list(itertools.product(SORT_COLUMNS, (False, True))))
+@pytest.mark.parametrize("filters", FILTERS, ids=lambda f: "-".join(f) or "all")
+def test_keyset_paging_matches_brute_force(vault, sort, descending, filters):
+    everything = vault.get_all_passwords()
+    expected = sorted(
+        (row for row in everything if _matches(row, rows=everything, **filters)),
+        key=lambda row: page_key(row, sort),
+        reverse=descending,
+    )
+    assert expected
+    for limit in (1, 7, 256):
+        assert _paged(vault, sort, descending, limit, **filters) == expected
+
+
+def test_unsupported_sort_column(db):
+    with pytest.raises(ValueError):
+        db.query_passwords("password")
+
+
+def test_encrypted_vault_rejects_notes_queries(vault):
+    vault.enable_encryption(PASSPHRASE)
+    for kwargs in ({"sort": "notes"}, {"notes": "note"}, {"has_notes": False}):
+        with pytest.raises(ValueError):
+            vault.query_passwords(**kwargs)
+    # 其他排序和筛选不受影响
+    rows = _paged(vault, "username", True, 50, website="site1")
+    assert [page_key(row, "username") for row in rows] == sorted(
+        (page_key(row, "username") for row in vault.get_all_passwords() if "site1" in row[1]), reverse=True)